@@ -0,0 +1,74 @@
+"""
+Compare two run_benchmarks.py result files and flag regressions.
+
+Throughput metrics regress when they drop, latency metrics when they rise,
+by more than the threshold. Exits with status 1 if any metric regressed.
+
+Usage:
+    python benchmarks/compare.py baseline.json results.json --threshold 10
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+# Metric name suffix -> True if a higher value is better
+METRICS = {
+    'rows_per_sec': True,
+    'mb_per_sec': True,
+    'writes_per_sec': True,
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+}
+
+
+def iter_metrics(results: Dict, prefix: str = '') -> Iterator[Tuple[str, float]]:
+    for key, value in results.items():
+        if key == 'meta':
+            continue
+        if isinstance(value, dict):
+            yield from iter_metrics(value, f"{prefix}{key}.")
+        elif key in METRICS:
+            yield f"{prefix}{key}", value
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> list:
+    """Return (metric, baseline, current, change %, regressed) for metrics in both files."""
+    before = dict(iter_metrics(baseline))
+    rows = []
+    for name, value in iter_metrics(current):
+        if name not in before or not before[name]:
+            continue
+        change = (value - before[name]) / before[name] * 100
+        higher_is_better = METRICS[name.rsplit('.', 1)[-1]]
+        regressed = -change > threshold if higher_is_better else change > threshold
+        rows.append((name, before[name], value, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark result files')
+    parser.add_argument('baseline', type=Path)
+    parser.add_argument('current', type=Path)
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Allowed change in percent before a metric counts as regressed')
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    rows = compare(baseline, current, args.threshold)
+
+    print(f"{baseline['meta']['commit']} -> {current['meta']['commit']}\n")
+    for name, before, after, change, regressed in rows:
+        flag = 'REGRESSED' if regressed else ''
+        print(f"{name:<48} {before:>12.3f} {after:>12.3f} {change:>+8.1f}%  {flag}")
+
+    regressions = sum(row[4] for row in rows)
+    print(f"\n{regressions} regression(s) over {args.threshold:g}%")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
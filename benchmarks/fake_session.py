@@ -0,0 +1,328 @@
+"""
+In-process stand-in for a Cassandra session, for benchmarks without a cluster.
+
+FakeSession understands the statements in src.models: CREATE TABLE, INSERT,
+counter UPDATE and single-partition SELECT. prepare() returns real driver PreparedStatements,
+so binding, batching and value serialization cost the same as against a
+real node. Only the network and the server are replaced, by dictionaries
+and an optional fixed latency. SELECTs are paged when the statement has a
+fetch_size, and results are real driver ResultSets.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from cassandra import cqltypes
+from cassandra.protocol import ColumnMetadata
+from cassandra.cluster import QueryExhausted, ResultSet
+from cassandra.query import BatchStatement, BoundStatement, PreparedStatement
+
+from src.models import TABLE_USERS_BY_SONG_BUCKETED_CQL, get_all_table_create_statements
+
+PROTOCOL_VERSION = 4
+
+CQL_TYPES = {
+    'int': cqltypes.Int32Type,
+    'bigint': cqltypes.LongType,
+    'counter': cqltypes.CounterColumnType,
+    'text': cqltypes.UTF8Type,
+    'decimal': cqltypes.DecimalType,
+    'double': cqltypes.DoubleType,
+    'timestamp': cqltypes.DateType,
+}
+
+CREATE_TABLE_RE = re.compile(r'CREATE TABLE IF NOT EXISTS (\w+)\s*\(', re.I)
+INSERT_RE = re.compile(r'INSERT\s+INTO\s+(\w+)\s*\(([^)]*)\)', re.S | re.I)
+UPDATE_RE = re.compile(r'UPDATE\s+(\w+)\s+SET\s+(\w+)\s*=\s*\2\s*\+\s*\?\s+WHERE (.*?)\s*;?\s*$', re.S | re.I)
+SELECT_RE = re.compile(r'SELECT\s+(.*?)\s+FROM\s+(\w+)(?:\s+WHERE (.*?))?\s*;?\s*$', re.S | re.I)
+
+
+def _parenthesized(text: str, start: int) -> str:
+    """Contents of the balanced parentheses opening at text[start]."""
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == '(':
+            depth += 1
+        elif text[i] == ')':
+            depth -= 1
+            if depth == 0:
+                return text[start + 1:i]
+    raise ValueError(f"Unbalanced parentheses in: {text}")
+
+
+class TableSchema:
+    def __init__(self, name: str, columns: Dict[str, str], partition_key: List[str],
+                 clustering: List[str]):
+        self.name = name
+        self.columns = columns
+        self.partition_key = partition_key
+        self.clustering = clustering
+
+    @classmethod
+    def parse(cls, cql: str) -> 'TableSchema':
+        match = CREATE_TABLE_RE.search(cql)
+        name = match.group(1)
+        body = _parenthesized(cql, match.end() - 1)
+        body, _, key = body.rpartition('PRIMARY KEY')
+        columns = {}
+        for line in body.split(','):
+            parts = line.split()
+            if len(parts) >= 2:
+                columns[parts[0]] = parts[1].lower()
+
+        key = key.strip().strip(',')[1:-1].strip()
+        if key.startswith('('):
+            partition, _, rest = key[1:].partition(')')
+            partition_key = [c.strip() for c in partition.split(',')]
+            clustering = [c.strip() for c in rest.split(',') if c.strip()]
+        else:
+            names = [c.strip() for c in key.split(',')]
+            partition_key, clustering = names[:1], names[1:]
+
+        return cls(name, columns, partition_key, clustering)
+
+
+class FakeResponseFuture:
+    """Pending result with the ResponseFuture callback and paging API."""
+    _col_names = None
+    _col_types = None
+    _continuous_paging_session = None
+
+    def __init__(self, session: 'FakeSession', query):
+        self._session = session
+        self._query = query
+        self._paging_state = None
+        self._event = threading.Event()
+        self._result = None
+        self._error = None
+        self._callbacks = []
+        self._errbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def has_more_pages(self) -> bool:
+        return self._paging_state is not None
+
+    def _complete(self, result=None, error=None, paging_state=None):
+        with self._lock:
+            self._result, self._error, self._paging_state = result, error, paging_state
+            self._event.set()
+            callbacks = list(self._errbacks if error else self._callbacks)
+        for fn, args, kwargs in callbacks:
+            fn(error if error else result, *args, **kwargs)
+
+    def start_fetching_next_page(self):
+        """Request the next page; callbacks already added run again with its rows."""
+        if not self.has_more_pages:
+            raise QueryExhausted()
+        with self._lock:
+            self._event.clear()
+        self._session._submit(self, self._query, self._paging_state)
+
+    # Like the driver, callbacks are kept after they run so they see every page
+    def add_callback(self, fn, *args, **kwargs):
+        with self._lock:
+            self._callbacks.append((fn, args, kwargs))
+            if not self._event.is_set():
+                return
+        if self._error is None:
+            fn(self._result, *args, **kwargs)
+
+    def add_errback(self, fn, *args, **kwargs):
+        with self._lock:
+            self._errbacks.append((fn, args, kwargs))
+            if not self._event.is_set():
+                return
+        if self._error is not None:
+            fn(self._error, *args, **kwargs)
+
+    def add_callbacks(self, callback, errback, callback_args=(), callback_kwargs=None,
+                      errback_args=(), errback_kwargs=None):
+        self.add_callback(callback, *callback_args, **(callback_kwargs or {}))
+        self.add_errback(errback, *errback_args, **(errback_kwargs or {}))
+
+    def clear_callbacks(self):
+        with self._lock:
+            self._callbacks = []
+            self._errbacks = []
+
+    def result(self) -> ResultSet:
+        self._event.wait()
+        if self._error is not None:
+            raise self._error
+        return ResultSet(self, self._result)
+
+
+class FakeSession:
+    """
+    Dictionary-backed session emulating prepare/execute/execute_async.
+
+    Args:
+        latency: Seconds each request takes to complete, simulated off-thread
+        keyspace: Keyspace name reported in prepared statement metadata
+        default_fetch_size: Rows per page for statements without a fetch_size;
+            None returns every row in one page
+    """
+
+    def __init__(self, latency: float = 0.0, keyspace: str = 'music_streaming',
+                 default_fetch_size: Optional[int] = None):
+        self.latency = latency
+        self.keyspace = keyspace
+        self.default_fetch_size = default_fetch_size
+        self.schemas: Dict[str, TableSchema] = {}
+        self.tables: Dict[str, Dict[tuple, Dict[tuple, dict]]] = {}
+        self.requests = 0
+
+        self._prepared: Dict[bytes, tuple] = {}
+        self._row_types: Dict[tuple, type] = {}
+        self._lock = threading.Lock()
+        # Requests always complete off the caller's thread, as with the driver's event loop;
+        # completing inside execute_async would make execute_concurrent recurse through callbacks
+        self._pool = ThreadPoolExecutor(max_workers=256 if latency > 0 else 1)
+
+        # Both users_by_song layouts, so either USERS_BY_SONG_BUCKETS setting can run
+        for cql in get_all_table_create_statements(song_buckets=1) + [TABLE_USERS_BY_SONG_BUCKETED_CQL]:
+            self._create_table(cql)
+
+    def set_keyspace(self, keyspace):
+        self.keyspace = keyspace
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+    def _create_table(self, cql: str):
+        schema = TableSchema.parse(cql)
+        self.schemas[schema.name] = schema
+        self.tables.setdefault(schema.name, {})
+
+    def prepare(self, query: str) -> PreparedStatement:
+        query_id = hashlib.md5(query.encode()).digest()
+        insert = INSERT_RE.search(query)
+        update = UPDATE_RE.search(query.strip())
+        if insert:
+            table = insert.group(1)
+            bind_columns = [c.strip() for c in insert.group(2).split(',')]
+            parsed = ('insert', table, bind_columns)
+        elif update:
+            table, counter, where = update.groups()
+            bind_columns = [counter] + re.findall(r'(\w+)\s*=\s*\?', where)
+            parsed = ('update', table, bind_columns)
+        else:
+            select = SELECT_RE.search(query.strip())
+            selected, table, where = select.groups()
+            bind_columns = re.findall(r'(\w+)\s*=\s*\?', where or '')
+            parsed = ('select', table, [c.strip() for c in selected.split(',')], bind_columns)
+
+        schema = self.schemas[table]
+        column_metadata = [
+            ColumnMetadata(self.keyspace, table, name, CQL_TYPES[schema.columns[name]])
+            for name in bind_columns
+        ]
+        routing_key_indexes = [bind_columns.index(c) for c in schema.partition_key if c in bind_columns]
+        self._prepared[query_id] = parsed
+
+        return PreparedStatement(
+            column_metadata, query_id, routing_key_indexes or None, query,
+            self.keyspace, PROTOCOL_VERSION, None, None
+        )
+
+    def execute(self, query, parameters=None, **kwargs):
+        return self.execute_async(query, parameters, **kwargs).result()
+
+    def execute_async(self, query, parameters=None, paging_state=None, **kwargs) -> FakeResponseFuture:
+        if isinstance(query, PreparedStatement):
+            query = query.bind(parameters)
+        future = FakeResponseFuture(self, query)
+        self._submit(future, query, paging_state)
+        return future
+
+    def _submit(self, future, query, paging_state):
+        self._pool.submit(self._run_later, future, query, paging_state)
+
+    def _run_later(self, future, query, paging_state):
+        if self.latency:
+            time.sleep(self.latency)
+        self._run(future, query, paging_state)
+
+    def _run(self, future, query, paging_state):
+        try:
+            rows = self._apply(query)
+        except Exception as e:
+            future._complete(error=e)
+            return
+
+        fetch_size = getattr(query, 'fetch_size', None)
+        if not isinstance(fetch_size, int):
+            fetch_size = self.default_fetch_size
+        if not fetch_size:
+            future._complete(result=rows)
+            return
+
+        # The paging state is the offset of the page's first row
+        start = int(paging_state) if paging_state else 0
+        end = start + fetch_size
+        future._complete(result=rows[start:end],
+                         paging_state=str(end).encode() if end < len(rows) else None)
+
+    def _apply(self, query) -> list:
+        with self._lock:
+            self.requests += 1
+
+            if isinstance(query, BatchStatement):
+                for _, query_id, values in query._statements_and_parameters:
+                    parsed = self._prepared[query_id]
+                    self._write(parsed, self._decode(parsed[1], parsed[2], values))
+                return []
+
+            if isinstance(query, BoundStatement):
+                parsed = self._prepared[query.prepared_statement.query_id]
+                if parsed[0] != 'select':
+                    self._write(parsed, query.raw_values)
+                    return []
+                return self._select(parsed, query.raw_values)
+
+            if CREATE_TABLE_RE.search(str(query)):
+                self._create_table(str(query))
+            return []
+
+    def _decode(self, table: str, columns: List[str], values) -> list:
+        schema = self.schemas[table]
+        return [
+            None if value is None else CQL_TYPES[schema.columns[name]].deserialize(value, PROTOCOL_VERSION)
+            for name, value in zip(columns, values)
+        ]
+
+    def _write(self, parsed, values):
+        kind, table, columns = parsed
+        schema = self.schemas[table]
+        row = dict(zip(columns, values))
+        partition = tuple(row[c] for c in schema.partition_key)
+        clustering = tuple(row[c] for c in schema.clustering)
+        stored = self.tables[table].setdefault(partition, {}).setdefault(clustering, {})
+        if kind == 'update':
+            counter = columns[0]
+            row[counter] = stored.get(counter, 0) + row[counter]
+        stored.update(row)
+
+    def _select(self, parsed, values) -> list:
+        _, table, selected, where = parsed
+        schema = self.schemas[table]
+        conditions = dict(zip(where, values))
+        partition = self.tables[table].get(tuple(conditions[c] for c in schema.partition_key), {})
+
+        row_type = self._row_types.get((table, tuple(selected)))
+        if row_type is None:
+            row_type = self._row_types[(table, tuple(selected))] = namedtuple('Row', selected)
+
+        return [
+            row_type(*(row.get(c) for c in selected))
+            for _, row in sorted(partition.items())
+            if all(row.get(c) == v for c, v in conditions.items())
+        ]
+
+    def row_count(self, table: str) -> int:
+        return sum(len(partition) for partition in self.tables[table].values())
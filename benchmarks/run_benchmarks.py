@@ -0,0 +1,253 @@
+"""
+Throughput and latency benchmarks for the ETL pipeline and the queries.
+
+Measures CSV parse rate (row-by-row and pandas column blocks), ETL rows/sec per table and for a full run, and
+p50/p95/p99 latency of the three QueryExecutor queries. Runs against an
+in-process FakeSession by default, or a real node with --backend cassandra.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --backend fake --latency 0.001
+    python benchmarks/run_benchmarks.py --backend cassandra --iterations 500
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import Config
+from src.etl import PARTITION_KEY_SIZES, MusicStreamingETL, group_by_partition
+from src.queries import QueryExecutor
+from src.reader import CSVEventReader
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+@contextmanager
+def open_session(backend: str, latency: float, keyspace: str):
+    if backend == 'fake':
+        from benchmarks.fake_session import FakeSession
+
+        session = FakeSession(latency=latency)
+        try:
+            yield session
+        finally:
+            session.shutdown()
+        return
+
+    from src.connection import CassandraConnection
+    from src.models import initialize_schema
+
+    # Never write benchmark rows into the application keyspace
+    with CassandraConnection() as connection:
+        session = connection.session
+        if not initialize_schema(session, keyspace):
+            raise RuntimeError('Could not create the benchmark schema')
+        yield session
+
+
+def rate(rows: int, seconds: float) -> float:
+    return round(rows / seconds, 1) if seconds else 0.0
+
+
+def count_rows(path: Path, engine: str) -> int:
+    if engine == 'pandas':
+        from src.columnar import open_column_reader
+
+        return sum(len(columns) for columns in open_column_reader(path, chunk_size=Config.CHUNK_SIZE))
+    return sum(1 for _ in CSVEventReader(path))
+
+
+def bench_csv_parse(path: Path, runs: int, engine: str = 'python') -> dict:
+    size = path.stat().st_size
+    if engine == 'pandas':
+        # Importing pandas takes longer than parsing the sample log; keep it out of the timing
+        import src.columnar
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = count_rows(path, engine)
+        samples.append(time.perf_counter() - start)
+
+    best = min(samples)
+    return {
+        'rows': rows,
+        'seconds': round(best, 4),
+        'rows_per_sec': rate(rows, best),
+        'mb_per_sec': round(size / best / 1e6, 2),
+    }
+
+
+def bench_etl_tables(etl: MusicStreamingETL, events: list) -> dict:
+    """Load every event into one table at a time, with the pipeline's batching."""
+    results = {}
+    for table, statement, to_values in etl.table_statements():
+        writer = etl.new_writer()
+        start = time.perf_counter()
+        rows = [to_values(event) for event in events]
+        for partition_rows in group_by_partition(rows, PARTITION_KEY_SIZES[table], etl.batch_size):
+            etl.submit_batch(writer, table, statement, partition_rows)
+        etl.wait_for_writes(writer)
+        elapsed = time.perf_counter() - start
+
+        results[table] = {
+            'rows': len(rows),
+            'seconds': round(elapsed, 4),
+            'rows_per_sec': rate(len(rows), elapsed),
+        }
+    return results
+
+
+def bench_etl_run(etl: MusicStreamingETL) -> dict:
+    start = time.perf_counter()
+    if not etl.run():
+        raise RuntimeError('ETL run failed')
+    elapsed = time.perf_counter() - start
+
+    rows = etl.stats['rows_read']
+    return {
+        'rows': rows,
+        'errors': etl.stats['errors'],
+        'seconds': round(elapsed, 4),
+        'rows_per_sec': rate(rows, elapsed),
+        'writes_per_sec': rate(rows * 3, elapsed),
+    }
+
+
+def latency_summary(samples: list) -> dict:
+    p50, p95, p99 = (statistics.quantiles(samples, n=100, method='inclusive')[i] for i in (49, 94, 98))
+    return {
+        'calls': len(samples),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p50_ms': round(p50, 3),
+        'p95_ms': round(p95, 3),
+        'p99_ms': round(p99, 3),
+    }
+
+
+def bench_queries(executor: QueryExecutor, events: list, iterations: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    sample = [rng.choice(events) for _ in range(iterations)]
+    calls = {
+        'query_1': lambda e: executor.query_1_session_item_lookup(e.session_id, e.item_in_session),
+        'query_2': lambda e: executor.query_2_user_session_history(e.user_id, e.session_id),
+        'query_3': lambda e: executor.query_3_users_by_song(e.song_title),
+    }
+
+    results = {}
+    for name, call in calls.items():
+        samples = []
+        for event in sample:
+            start = time.perf_counter()
+            call(event)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = latency_summary(samples)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_benchmarks(args) -> dict:
+    source = Path(args.source)
+    events = list(CSVEventReader(source))
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'backend': args.backend,
+            'latency': args.latency,
+            'concurrency': args.concurrency,
+            'batch_size': args.batch_size,
+            'aggregates': args.aggregates,
+            'source': str(source),
+        },
+        'csv_parse': bench_csv_parse(source, args.runs),
+        'csv_parse_pandas': bench_csv_parse(source, args.runs, engine='pandas'),
+    }
+
+    with open_session(args.backend, args.latency, args.keyspace) as session:
+        etl = MusicStreamingETL(session, concurrency=args.concurrency,
+                                batch_size=args.batch_size, source=source)
+        results['etl_tables'] = bench_etl_tables(etl, events)
+
+        etl = MusicStreamingETL(session, concurrency=args.concurrency,
+                                batch_size=args.batch_size, source=source, aggregates=args.aggregates)
+        results['etl_run'] = bench_etl_run(etl)
+
+        results['queries'] = bench_queries(QueryExecutor(session), events, args.iterations, args.seed)
+
+    return results
+
+
+def print_results(results: dict):
+    meta = results['meta']
+    print(f"\nBenchmarks @ {meta['commit']} (backend {meta['backend']}, python {meta['python']})")
+
+    csv_parse = results['csv_parse']
+    print(f"\nCSV parse       {csv_parse['rows_per_sec']:>12,.0f} rows/s  {csv_parse['mb_per_sec']:>8.2f} MB/s")
+    csv_parse = results['csv_parse_pandas']
+    print(f"CSV parse (pd)  {csv_parse['rows_per_sec']:>12,.0f} rows/s  {csv_parse['mb_per_sec']:>8.2f} MB/s")
+
+    print()
+    for table, timing in results['etl_tables'].items():
+        print(f"{table:<22} {timing['rows_per_sec']:>12,.0f} rows/s")
+    etl_run = results['etl_run']
+    print(f"{'full run':<22} {etl_run['rows_per_sec']:>12,.0f} rows/s  ({etl_run['errors']} errors)")
+
+    print()
+    for name, timing in results['queries'].items():
+        print(f"{name:<10} p50 {timing['p50_ms']:>8.3f} ms  "
+              f"p95 {timing['p95_ms']:>8.3f} ms  p99 {timing['p99_ms']:>8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CSV parsing, ETL throughput and query latency')
+    parser.add_argument('--backend', choices=['fake', 'cassandra'], default='fake')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Simulated seconds per request for the fake backend')
+    parser.add_argument('--keyspace', default='music_streaming_bench',
+                        help='Keyspace the cassandra backend creates and writes to')
+    parser.add_argument('--aggregates', action='store_true',
+                        help='Maintain the play counters and top songs chart in the full run')
+    parser.add_argument('--source', default=str(Config.EVENT_LOG_FILE))
+    parser.add_argument('--concurrency', type=int, default=Config.CONCURRENT_REQUESTS)
+    parser.add_argument('--batch-size', type=int, default=Config.BATCH_SIZE)
+    parser.add_argument('--runs', type=int, default=3, help='CSV parse repetitions, best is kept')
+    parser.add_argument('--iterations', type=int, default=1000, help='Calls per query')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', type=Path, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = run_benchmarks(args)
+    print_results(results)
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Startup-time benchmark for the src package.
+
+Each import is timed in a fresh interpreter, the way a cron job or a
+short-lived CLI call pays for it.
+
+Usage:
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+IMPORTS = {
+    'src': 'import src',
+    'src.config': 'from src.config import Config',
+    'src.queries': 'from src.queries import QueryExecutor',
+    'src.etl': 'from src.etl import MusicStreamingETL',
+}
+
+TIMER = """
+import time
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def time_import(statement: str, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', TIMER.format(statement=statement)],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        samples.append(float(output.strip().splitlines()[-1]) * 1000)
+
+    return {
+        'median_ms': round(statistics.median(samples), 2),
+        'min_ms': round(min(samples), 2),
+        'max_ms': round(max(samples), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import time of the src package')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--output', type=Path, help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = {name: time_import(statement, args.runs) for name, statement in IMPORTS.items()}
+
+    for name, timing in results.items():
+        print(f"{name:<14} median {timing['median_ms']:>8.2f} ms  "
+              f"(min {timing['min_ms']:.2f}, max {timing['max_ms']:.2f})")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
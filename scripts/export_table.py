@@ -0,0 +1,109 @@
+import sys
+import argparse
+import logging
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import Config
+from src.connection import CassandraConnection
+from src.scan import TokenRangeScanner
+
+def setup_logging(log_level='INFO'):
+    logging.basicConfig(
+        level=getattr(logging, log_level),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+
+    return logging.getLogger(__name__)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description='Count or export a whole table with parallel token-range queries',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+
+    parser.add_argument(
+        'table',
+        help='Table to scan, e.g. songs_by_session'
+    )
+
+    parser.add_argument(
+        '--output',
+        type=str,
+        help='CSV file, or Parquet for .parquet/.pq; counts the rows when omitted'
+    )
+
+    parser.add_argument(
+        '--estimate',
+        action='store_true',
+        help='Print estimated partitions and sizes from system.size_estimates instead of scanning'
+    )
+
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=Config.SCAN_CONCURRENCY,
+        help='Token ranges read at the same time'
+    )
+
+    parser.add_argument(
+        '--splits',
+        type=int,
+        default=Config.SCAN_SPLITS,
+        help='Parts each node token range is cut into'
+    )
+
+    parser.add_argument(
+        '--log-level',
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+        default='INFO',
+        help='Set logging level'
+    )
+
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    logger = setup_logging(args.log_level)
+
+    conn = CassandraConnection()
+    try:
+        session = conn.connect(keyspace=Config.CASSANDRA_KEYSPACE)
+        if args.estimate:
+            stats = conn.get_table_stats(args.table)
+            if stats is None:
+                return 1
+            logger.info(f"{args.table}: ~{stats.estimated_partitions} partitions, "
+                        f"mean {stats.mean_partition_size} bytes, ~{stats.estimated_bytes} bytes "
+                        f"({stats.ring_coverage:.0%} of the ring from {stats.hosts} nodes)")
+            return 0
+
+        scanner = TokenRangeScanner(session, args.table, concurrency=args.concurrency,
+                                    splits=args.splits)
+
+        start = time.perf_counter()
+        if args.output:
+            rows = scanner.export(args.output)
+            logger.info(f"Exported {rows} rows of {args.table} to {args.output}")
+        else:
+            rows = scanner.count()
+            logger.info(f"{args.table}: {rows} rows")
+        logger.info(f"Scan took {time.perf_counter() - start:.2f}s")
+        return 0
+
+    except KeyboardInterrupt:
+        logger.warning("Interrupted by user")
+        return 130
+
+    except Exception as e:
+        logger.error(f"Fatal error: {e}", exc_info=True)
+        return 1
+
+    finally:
+        conn.disconnect()
+
+if __name__ == '__main__':
+    sys.exit(main())
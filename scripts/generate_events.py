@@ -0,0 +1,74 @@
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import Config
+from src.generator import ESTIMATED_ROW_BYTES, GeneratorSpec, generate_event_logs
+
+def setup_logging(log_level='INFO'):
+    logging.basicConfig(
+        level=getattr(logging, log_level),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    
+    return logging.getLogger(__name__)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description='Generate synthetic event logs in the schema of the sample data',
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    
+    size_group = parser.add_mutually_exclusive_group(required=True)
+    size_group.add_argument('--rows', type=int)
+    size_group.add_argument('--size-gb', type=float, help='Approximate total size of the log')
+    
+    parser.add_argument('--output-dir', type=Path, default=Config.DATA_DIR / 'generated')
+    parser.add_argument('--workers', type=int, default=None, help='Defaults to the CPU count')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rows-per-file', type=int, default=1_000_000)
+    parser.add_argument('--songs', type=int, default=100_000)
+    parser.add_argument('--artists', type=int, default=20_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--song-skew', type=float, default=1.1, help='Zipf exponent of song popularity')
+    parser.add_argument('--user-skew', type=float, default=0.8, help='Zipf exponent of user activity')
+    parser.add_argument('--mean-session-length', type=float, default=20.0)
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO')
+    
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+    logger = setup_logging(args.log_level)
+    
+    rows = args.rows or int(args.size_gb * 1e9 / ESTIMATED_ROW_BYTES)
+    spec = GeneratorSpec(
+        rows=rows,
+        songs=args.songs,
+        artists=args.artists,
+        users=args.users,
+        song_skew=args.song_skew,
+        user_skew=args.user_skew,
+        mean_session_length=args.mean_session_length,
+        rows_per_file=args.rows_per_file,
+        seed=args.seed
+    )
+    
+    try:
+        files = generate_event_logs(spec, args.output_dir, args.workers)
+    except KeyboardInterrupt:
+        return 130
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    
+    size = sum(path.stat().st_size for path in files)
+    logger.info(f"Wrote {rows:,} events ({size / 1e9:.2f} GB) in {len(files)} files to {args.output_dir}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,13 @@
 import os
+
+if os.getenv('USE_GEVENT') == '1':
+    from gevent import monkey
+    monkey.patch_all()
+
 import sys
 import argparse
 import logging
+from contextlib import nullcontext
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -9,7 +15,10 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from src.config import Config
 from src.connection import CassandraConnection
 from src.models import initialize_schema, drop_schema
-from src.etl import run_etl_pipeline
+from src.checkpoint import INCREMENTAL, RESUME, Checkpoint
+from src.deadletter import DeadLetterLog
+from src.etl import MusicStreamingETL, run_etl_parallel, run_etl_pipeline
+from src.metrics import Metrics, MetricsReporter, create_sink, instrument_session
 
 def setup_logging(log_level='INFO'):
     Config.LOG_DIR.mkdir(exist_ok=True)
@@ -33,12 +42,66 @@ def parse_arguments():
     parser.add_argument('--init-only', action='store_true')
     parser.add_argument('--drop-tables', action='store_true')
     parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO')
+    parser.add_argument('--concurrency', type=int, default=Config.CONCURRENT_REQUESTS)
+    parser.add_argument('--batch-size', type=int, default=Config.BATCH_SIZE)
+    parser.add_argument('--chunk-size', type=int, default=Config.CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--source', default=str(Config.EVENT_LOG_FILE),
+                        help='Event file (CSV, Parquet or Arrow), directory of them or glob pattern')
+    parser.add_argument('--readers', type=int, default=Config.READER_THREADS)
+    parser.add_argument('--csv-engine', choices=['python', 'pandas'], default=Config.CSV_ENGINE,
+                        help='Parse CSV row by row, or in column blocks with pandas')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Skip writes that repeat a primary key with the same values')
+    parser.add_argument('--aggregates', action='store_true',
+                        help='Maintain play counters per song and artist and the top songs chart; '
+                             'with --replay, also replay dead-lettered counter updates')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Adapt in-flight writes to latency and overload errors (AIMD), '
+                             'between MIN_ and MAX_CONCURRENT_REQUESTS')
+    parser.add_argument('--max-rows-per-sec', type=float,
+                        help='Cap on table rows written per second; with --adaptive the cap '
+                             'backs off and recovers with the concurrency limit')
+    parser.add_argument('--dead-letter', type=Path, default=Config.DEAD_LETTER_FILE,
+                        help='JSONL file for rows that still fail after retries')
+    parser.add_argument('--metrics-sink',
+                        help="Export metrics: 'prometheus:PORT', 'file:PATH' or 'log'")
+    
+    checkpoint_group = parser.add_mutually_exclusive_group()
+    checkpoint_group.add_argument('--resume', action='store_true',
+                                  help='Continue an interrupted load, skipping completed files')
+    checkpoint_group.add_argument('--incremental', action='store_true',
+                                  help='Load only rows appended since the last run')
+    checkpoint_group.add_argument('--replay', action='store_true',
+                                  help='Reload only the rows in the dead-letter file')
+    checkpoint_group.add_argument('--follow', action='store_true',
+                                  help='Keep tailing the source and load new rows in micro-batches')
+    checkpoint_group.add_argument('--no-checkpoint', action='store_true',
+                                  help='Do not record progress, so chunks are not drained to save it; '
+                                       'a later --resume or --incremental reloads everything')
+    parser.add_argument('--flush-interval', type=float, default=Config.FOLLOW_INTERVAL,
+                        help='Seconds between checks for new rows in --follow mode')
+    parser.add_argument('--flush-rows', type=int, default=Config.FOLLOW_BATCH_ROWS,
+                        help='Events per micro-batch in --follow mode')
+    
+    args = parser.parse_args()
+    if args.workers > 1 and (args.resume or args.incremental or args.replay or args.follow):
+        parser.error('--resume, --incremental, --replay and --follow cannot be combined with --workers')
+    if args.workers > 1 and args.metrics_sink:
+        parser.error('--metrics-sink cannot be combined with --workers')
+    if args.flush_rows < 1 or args.flush_interval <= 0:
+        parser.error('--flush-rows must be at least 1 and --flush-interval above 0')
+    
+    return args
     
-    return parser.parse_args()
-
 def main():
     args = parse_arguments()
     logger = setup_logging(args.log_level)
+    if args.aggregates and (args.resume or args.incremental or args.replay or args.follow):
+        # Counter updates are not idempotent, and a checkpoint only records whole chunks
+        logger.warning("--aggregates is not exactly-once with a checkpoint or --replay: plays of a "
+                       "chunk in flight when a run stopped, or of a counter update that timed out "
+                       "but was applied, are counted twice")
     
     try:
         logger.info("=" * 70)
@@ -65,8 +128,63 @@ def main():
             conn.disconnect()
             return 0
         
-        success = run_etl_pipeline(session)
-        conn.disconnect()
+        if args.replay:
+            etl = MusicStreamingETL(
+                session,
+                concurrency=args.concurrency,
+                batch_size=args.batch_size,
+                adaptive=args.adaptive,
+                max_rows_per_sec=args.max_rows_per_sec,
+                dead_letter=DeadLetterLog(args.dead_letter),
+                aggregates=args.aggregates
+            )
+            success = etl.replay_dead_letters(args.dead_letter)
+            conn.disconnect()
+        elif args.workers > 1:
+            conn.disconnect()
+            success = run_etl_parallel(
+                args.workers,
+                concurrency=args.concurrency,
+                batch_size=args.batch_size,
+                chunk_size=args.chunk_size,
+                source=args.source,
+                log_level=args.log_level,
+                adaptive=args.adaptive,
+                max_rows_per_sec=args.max_rows_per_sec,
+                dead_letter=args.dead_letter,
+                csv_engine=args.csv_engine,
+                dedup=args.dedup,
+                aggregates=args.aggregates
+            )
+        else:
+            metrics = reporter = None
+            if args.metrics_sink:
+                metrics = Metrics()
+                instrument_session(session, metrics)
+                reporter = MetricsReporter(metrics, create_sink(args.metrics_sink))
+            
+            with reporter or nullcontext():
+                success = run_etl_pipeline(
+                    session,
+                    concurrency=args.concurrency,
+                    batch_size=args.batch_size,
+                    chunk_size=args.chunk_size,
+                    source=args.source,
+                    readers=args.readers,
+                    checkpoint=None if args.no_checkpoint else Checkpoint(),
+                    checkpoint_mode=RESUME if args.resume else INCREMENTAL if args.incremental else None,
+                    metrics=metrics,
+                    adaptive=args.adaptive,
+                    max_rows_per_sec=args.max_rows_per_sec,
+                    dead_letter=DeadLetterLog(args.dead_letter),
+                    csv_engine=args.csv_engine,
+                    dedup=args.dedup,
+                    aggregates=args.aggregates,
+                    follow=args.follow,
+                    flush_interval=args.flush_interval,
+                    flush_rows=args.flush_rows
+                )
+            conn.disconnect()
         
         if success:
             logger.info("=" * 70)
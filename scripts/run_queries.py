@@ -1,7 +1,12 @@
+import os
+
+if os.getenv('USE_GEVENT') == '1':
+    from gevent import monkey
+    monkey.patch_all()
+
 import sys
 import argparse
 import logging
-import os
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -67,6 +72,18 @@ def parse_arguments():
         help='Song title for Query 3'
     )
     
+    parser.add_argument(
+        '--fetch-size',
+        type=int,
+        help='Page size for Query 3; returns one page and a token for the next'
+    )
+    
+    parser.add_argument(
+        '--paging-state',
+        type=str,
+        help='Token printed by a previous paged Query 3 run'
+    )
+    
     parser.add_argument(
         '--log-level',
         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
@@ -102,6 +119,16 @@ def main():
                 )
                 results = {'query_1': {}, 'query_2': result, 'query_3': []}
             
+            elif args.query == 3 and (args.fetch_size or args.paging_state):
+                page = executor.query_3_users_by_song_page(
+                    args.song_title,
+                    fetch_size=args.fetch_size,
+                    paging_state=args.paging_state
+                )
+                results = {'query_1': {}, 'query_2': [], 'query_3': page.rows}
+                if page.has_more:
+                    logger.info(f"Next page: --paging-state {page.paging_state}")
+            
             elif args.query == 3:
                 result = executor.query_3_users_by_song(args.song_title)
                 results = {'query_1': {}, 'query_2': [], 'query_3': result}
@@ -11,6 +11,8 @@ Author: Your Name
 Version: 1.0.0
 """
 
+import importlib
+
 __version__ = '1.0.0'
 __author__ = 'Your Name'
 __all__ = [
@@ -19,26 +21,42 @@ __all__ = [
     'get_cassandra_session',
     'MusicStreamingETL',
     'QueryExecutor',
+    'QueryCache',
+    'Metrics',
+    'AsyncQueryExecutor',
+    'get_async_cassandra_session',
     'initialize_schema',
     'drop_schema',
 ]
 
-from .config import Config
-from .connection import CassandraConnection, get_cassandra_session
-from .etl import MusicStreamingETL, run_etl_pipeline
-from .queries import QueryExecutor, print_query_results
-from .models import initialize_schema, drop_schema
-
-
-# ========================================
-# tests/__init__.py
-# ========================================
-"""
-Test suite for Music Streaming Cassandra project.
-
-Run tests with:
-    pytest tests/ -v
-    pytest tests/ --cov=src --cov-report=html
-"""
-
-__all__ = []
\ No newline at end of file
+# Exports are imported on first access, so `import src` stays cheap and
+# short-lived jobs only pay for the driver modules they actually use.
+_EXPORTS = {
+    'Config': '.config',
+    'CassandraConnection': '.connection',
+    'get_cassandra_session': '.connection',
+    'MusicStreamingETL': '.etl',
+    'run_etl_pipeline': '.etl',
+    'QueryExecutor': '.queries',
+    'print_query_results': '.queries',
+    'QueryCache': '.cache',
+    'Metrics': '.metrics',
+    'AsyncQueryExecutor': '.async_queries',
+    'get_async_cassandra_session': '.async_queries',
+    'initialize_schema': '.models',
+    'drop_schema': '.models',
+}
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,90 @@
+"""
+Play-count aggregates maintained by the ETL.
+Plays are counted in memory per chunk and written as one counter delta per
+song and per artist; the top songs chart is rebuilt from the counters of the
+songs a load touched.
+"""
+import logging
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple, Union
+
+from cassandra.cluster import EXEC_PROFILE_DEFAULT, Session
+from cassandra.concurrent import execute_concurrent_with_args
+
+from .config import Config
+from .models import INSERT_TOP_SONGS_CQL, QUERY_SONG_PLAYS_CQL, QUERY_TOP_SONGS_CQL, Event
+from .reader import EventColumns
+
+logger = logging.getLogger(__name__)
+
+
+def count_plays(events: Union[List[Event], EventColumns]) -> Tuple[Counter, Counter]:
+    """
+    Count the plays in a chunk of events.
+
+    Returns:
+        (plays per (artist, song_title), plays per artist)
+    """
+    if isinstance(events, EventColumns):
+        songs = Counter(events.rows(('artist', 'song_title')))
+    else:
+        songs = Counter((event.artist, event.song_title) for event in events)
+
+    artists = Counter()
+    for (artist, _), plays in songs.items():
+        artists[artist] += plays
+    return songs, artists
+
+
+def refresh_top_songs(session: Session, songs: Iterable[Tuple[str, str]], size: Optional[int] = None,
+                      concurrency: Optional[int] = None,
+                      execution_profile=EXEC_PROFILE_DEFAULT) -> List[Tuple[str, str, int]]:
+    """
+    Rebuild the top songs chart after a load.
+
+    Play counts only grow, so a song outside the chart can only enter it if
+    its count changed: the new chart is the best `size` of the current chart
+    and the current counters of the songs the load touched.
+
+    Args:
+        session: Session connected to the keyspace
+        songs: (artist, song_title) of every song whose counter was updated
+        size: Songs kept in the chart (defaults to Config.TOP_SONGS_SIZE)
+
+    Returns:
+        The chart as (artist, song_title, plays), most played first
+    """
+    size = size or Config.TOP_SONGS_SIZE
+    songs = list(set(songs))
+    if not songs:
+        return []
+
+    query_chart = session.prepare(QUERY_TOP_SONGS_CQL)
+    query_plays = session.prepare(QUERY_SONG_PLAYS_CQL)
+    insert_chart = session.prepare(INSERT_TOP_SONGS_CQL)
+
+    plays = {
+        (row.artist, row.song_title): row.plays
+        for row in session.execute(query_chart, (Config.TOP_SONGS_CHART,), execution_profile=execution_profile)
+    }
+    outcomes = execute_concurrent_with_args(
+        session, query_plays, songs,
+        concurrency=concurrency or Config.CONCURRENT_REQUESTS,
+        execution_profile=execution_profile
+    )
+    for song, (_, result) in zip(songs, outcomes):
+        row = result.one()
+        if row is not None:
+            plays[song] = row.plays
+
+    chart = sorted(plays.items(), key=lambda item: (-item[1], item[0]))[:size]
+    execute_concurrent_with_args(
+        session, insert_chart,
+        [(Config.TOP_SONGS_CHART, rank, artist, song_title, count)
+         for rank, ((artist, song_title), count) in enumerate(chart, start=1)],
+        concurrency=concurrency or Config.CONCURRENT_REQUESTS,
+        execution_profile=execution_profile
+    )
+    logger.info(f"Top songs chart rebuilt from {len(songs)} updated songs")
+
+    return [(artist, song_title, count) for (artist, song_title), count in chart]
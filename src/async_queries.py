@@ -0,0 +1,171 @@
+"""
+Asyncio query execution for embedding in async web services.
+Driver ResponseFutures are bridged to asyncio futures, so lookups never block the event loop.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from cassandra.cluster import ResponseFuture, Session
+
+from .cache import MISS, QueryCache
+from .config import Config
+from .connection import CassandraConnection, resolve_profile
+from .metrics import Metrics, time_request
+from .models import (
+    QUERY_SONGS_BY_SESSION_CQL,
+    QUERY_SONGS_BY_USER_SESSION_CQL,
+    QUERY_USERS_BY_SONG_BUCKET_CQL,
+    QUERY_USERS_BY_SONG_CQL
+)
+from .queries import (
+    QUERY_1,
+    QUERY_2,
+    QUERY_3,
+    merge_buckets,
+    session_songs_from_rows,
+    song_from_row,
+    users_from_rows
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _resolve(future: asyncio.Future, result: Any):
+    if not future.done():
+        future.set_result(result)
+
+
+def _reject(future: asyncio.Future, error: Exception):
+    if not future.done():
+        future.set_exception(error)
+
+
+def fetch_all(response_future: ResponseFuture,
+              loop: Optional[asyncio.AbstractEventLoop] = None) -> asyncio.Future:
+    """
+    Bridge a driver ResponseFuture to an asyncio future resolving to all result rows.
+
+    Driver callbacks run on the driver's I/O thread, so results are handed to
+    the event loop with call_soon_threadsafe. Further pages are requested from
+    the callback without blocking either side; the callbacks run again for
+    every page, and an error on any page rejects the future.
+    """
+    loop = loop or asyncio.get_running_loop()
+    future = loop.create_future()
+    rows = []
+
+    def on_page(page):
+        try:
+            rows.extend(page)
+            if response_future.has_more_pages:
+                response_future.start_fetching_next_page()
+                return
+        except Exception as e:
+            # Raised on the driver's thread, where nothing would report it
+            loop.call_soon_threadsafe(_reject, future, e)
+            return
+        loop.call_soon_threadsafe(_resolve, future, rows)
+
+    def on_error(error):
+        loop.call_soon_threadsafe(_reject, future, error)
+
+    response_future.add_callbacks(on_page, on_error)
+    return future
+
+
+class AsyncQueryExecutor:
+    """Asyncio counterpart of QueryExecutor; create it with `await AsyncQueryExecutor.create(session)`."""
+
+    def __init__(self, session: Session, statements: Dict[str, Any],
+                 cache: Optional[QueryCache] = None, metrics: Optional[Metrics] = None,
+                 song_buckets: Optional[int] = None):
+        self.session = session
+        self.cache = cache
+        self.metrics = metrics
+        self.execution_profile = resolve_profile(session, Config.EXEC_PROFILE_READ)
+        self.statements = statements
+        self.song_buckets = song_buckets or Config.USERS_BY_SONG_BUCKETS
+
+    @classmethod
+    async def create(cls, session: Session, cache: Optional[QueryCache] = None,
+                     metrics: Optional[Metrics] = None,
+                     song_buckets: Optional[int] = None) -> 'AsyncQueryExecutor':
+        """Prepare the query statements off the event loop and build the executor."""
+        song_buckets = song_buckets or Config.USERS_BY_SONG_BUCKETS
+        queries = {
+            QUERY_1: QUERY_SONGS_BY_SESSION_CQL,
+            QUERY_2: QUERY_SONGS_BY_USER_SESSION_CQL,
+            QUERY_3: QUERY_USERS_BY_SONG_BUCKET_CQL if song_buckets > 1 else QUERY_USERS_BY_SONG_CQL,
+        }
+        statements = {}
+        for query_id, cql in queries.items():
+            statements[query_id] = await asyncio.to_thread(session.prepare, cql)
+        return cls(session, statements, cache, metrics, song_buckets)
+
+    async def _execute(self, query_id: str, params: tuple) -> List[Any]:
+        done = time_request(self.metrics, 'query', query=query_id)
+        try:
+            response_future = self.session.execute_async(
+                self.statements[query_id], params, execution_profile=self.execution_profile
+            )
+            rows = await fetch_all(response_future)
+        except Exception as e:
+            done(e)
+            raise
+        done()
+        return rows
+
+    async def _execute_buckets(self, song_title: str) -> List[Any]:
+        """Query 3 rows of every bucket of a song, fetched concurrently and merged."""
+        buckets = await asyncio.gather(*(
+            self._execute(QUERY_3, (song_title, bucket)) for bucket in range(self.song_buckets)
+        ))
+        return merge_buckets(buckets)
+
+    async def _lookup(self, query_id: str, params: tuple, convert, empty: Any, fetch=None) -> Any:
+        version = None
+        if self.cache is not None:
+            cached = self.cache.get(query_id, params)
+            if cached is not MISS:
+                return cached
+            version = self.cache.version()
+
+        try:
+            rows = await (fetch() if fetch else self._execute(query_id, params))
+            data = convert(rows)
+        except Exception as e:
+            logger.error(f"✗ {query_id} failed for {params}: {e}")
+            return empty
+
+        if self.cache is not None:
+            self.cache.put(query_id, params, data, version)
+        return data
+
+    async def query_1_session_item_lookup(self, session_id: int, item_in_session: int) -> Dict[str, Any]:
+        """Query 1: song details for a session and item number, as in QueryExecutor."""
+        return await self._lookup(
+            QUERY_1, (session_id, item_in_session),
+            lambda rows: song_from_row(rows[0]) if rows else {}, {}
+        )
+
+    async def query_2_user_session_history(self, user_id: int, session_id: int) -> List[Dict[str, Any]]:
+        """Query 2: songs played by a user in a session, as in QueryExecutor."""
+        return await self._lookup(QUERY_2, (user_id, session_id), session_songs_from_rows, [])
+
+    async def query_3_users_by_song(self, song_title: str) -> List[Dict[str, str]]:
+        """Query 3: users who listened to a song, as in QueryExecutor."""
+        fetch = (lambda: self._execute_buckets(song_title)) if self.song_buckets > 1 else None
+        return await self._lookup(QUERY_3, (song_title,), users_from_rows, [], fetch)
+
+
+@asynccontextmanager
+async def get_async_cassandra_session(keyspace=None):
+    """Async counterpart of get_cassandra_session; connecting and shutdown run off the event loop."""
+    connection = CassandraConnection()
+    try:
+        session = await asyncio.to_thread(connection.connect, keyspace)
+        yield session
+    finally:
+        await asyncio.to_thread(connection.disconnect)
@@ -0,0 +1,139 @@
+"""
+In-process read-through cache for query results.
+Entries are keyed by query id plus parameters, evicted LRU and expired by TTL.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Returned by QueryCache.get when there is no live entry
+MISS = object()
+
+
+def freeze(value: Any) -> Any:
+    """
+    Read-only copy of a query result: a dict becomes a read-only mapping,
+    a list of rows a tuple of them. Rows hold plain values, so one level
+    deep is enough.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType(dict(value))
+    if isinstance(value, list):
+        return tuple(MappingProxyType(dict(row)) if isinstance(row, dict) else row for row in value)
+    return value
+
+
+class QueryCache:
+    """
+    Size-bounded LRU cache with a time-to-live per query id.
+
+    Results are frozen once on put (see `freeze`) and returned as is, so a
+    hit costs no copy however many rows it holds, and a caller cannot change
+    what the next caller reads. A list result comes back as a tuple of
+    read-only mappings.
+
+    A read that started before a write was acknowledged can finish after
+    the write invalidated its key. To keep it from caching the old result
+    again, readers take `version()` before querying and pass it to `put`,
+    which drops the result if the key was invalidated since.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl: Optional[float] = None,
+                 query_ttls: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_size: Maximum number of cached results
+            ttl: Seconds a result stays valid unless overridden in `query_ttls`
+            query_ttls: TTL in seconds per query id
+            clock: Time source, monotonic seconds
+        """
+        self.max_size = max_size or Config.QUERY_CACHE_SIZE
+        self.ttl = ttl if ttl is not None else Config.QUERY_CACHE_TTL
+        self.query_ttls = dict(query_ttls or {})
+        self.clock = clock
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: 'OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]' = OrderedDict()
+        # Version at which each key was last invalidated; the oldest are forgotten past
+        # max_size, and a put older than the newest forgotten one is dropped to be safe
+        self._version = 0
+        self._invalidated: 'OrderedDict[Tuple[str, Hashable], int]' = OrderedDict()
+        self._forgotten = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, query_id: str, params: Hashable) -> Any:
+        """Return the cached result, or MISS if absent or expired."""
+        key = (query_id, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISS
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def version(self) -> int:
+        """Current invalidation version; take it before querying the result to `put`."""
+        with self._lock:
+            return self._version
+
+    def put(self, query_id: str, params: Hashable, value: Any, version: Optional[int] = None):
+        """
+        Cache a result. With `version` from `version()`, the result is dropped
+        if its key was invalidated after that version was taken.
+        """
+        expires_at = self.clock() + self.query_ttls.get(query_id, self.ttl)
+        key = (query_id, params)
+        value = freeze(value)
+        with self._lock:
+            if version is not None and self._invalidated.get(key, self._forgotten) > version:
+                return
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, query_id: str, params: Hashable) -> bool:
+        """Drop one entry, and results of reads still in flight for it. Returns True if it was cached."""
+        key = (query_id, params)
+        with self._lock:
+            self._version += 1
+            self._invalidated[key] = self._version
+            self._invalidated.move_to_end(key)
+            while len(self._invalidated) > self.max_size:
+                _, self._forgotten = self._invalidated.popitem(last=False)
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._invalidated.clear()
+            self._version += 1
+            self._forgotten = self._version
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,105 @@
+"""
+Checkpoint state for resumable and incremental ETL runs.
+Records, per event file, how many bytes and rows have been loaded.
+"""
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+RESUME = 'resume'
+INCREMENTAL = 'incremental'
+
+FINGERPRINT_BLOCK = 64 * 1024
+
+
+def fingerprint(path: Path, offset: int) -> str:
+    """
+    Hash the start of a file and the block just before `offset`.
+
+    Detects a file that was rewritten or truncated since the checkpoint
+    without re-reading everything that was already loaded.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read(min(offset, FINGERPRINT_BLOCK)))
+        tail_start = max(0, offset - FINGERPRINT_BLOCK)
+        f.seek(tail_start)
+        digest.update(f.read(offset - tail_start))
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """Local JSON file with the load position of every event file."""
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path or Config.CHECKPOINT_FILE)
+        self.files: Dict[str, Dict] = {}
+        self.load()
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.files = json.load(f).get('files', {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            self.files = {}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'files': self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, file_path: Path) -> Optional[Dict]:
+        return self.files.get(str(Path(file_path).resolve()))
+
+    def update(self, file_path: Path, offset: int, rows: int, completed: bool = False):
+        """Record that `file_path` has been loaded up to byte `offset`."""
+        self.files[str(Path(file_path).resolve())] = {
+            'offset': offset,
+            'rows': rows,
+            'fingerprint': fingerprint(file_path, offset),
+            'completed': completed,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self.save()
+
+    def start_offset(self, file_path: Path, mode: Optional[str]) -> Optional[int]:
+        """
+        Byte offset a run should start reading `file_path` from.
+
+        Args:
+            file_path: Event file about to be loaded
+            mode: RESUME skips completed files and continues unfinished ones;
+                INCREMENTAL continues every file from its last offset;
+                None loads the whole file
+
+        Returns:
+            Offset to start from, or None if the file should be skipped
+        """
+        entry = self.get(file_path)
+        if mode is None or entry is None:
+            return 0
+
+        offset = entry['offset']
+        if os.path.getsize(file_path) < offset or fingerprint(file_path, offset) != entry['fingerprint']:
+            logger.warning(f"{file_path} changed since the last checkpoint, reloading it from the start")
+            return 0
+
+        if mode == RESUME and entry['completed']:
+            logger.info(f"Skipping {file_path}: already loaded")
+            return None
+
+        logger.info(f"Continuing {file_path} from byte {offset} ({entry['rows']} rows already loaded)")
+        return offset
@@ -1,37 +1,79 @@
 import os
 from pathlib import Path
-from dotenv import load_dotenv
 
 env_path = Path(__file__).parent.parent / '.env'
-load_dotenv(dotenv_path=env_path)
+if env_path.exists():
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=env_path)
 
 class Config:
     CASSANDRA_HOST = os.getenv('CASSANDRA_HOST', '127.0.0.1')
     CASSANDRA_PORT = int(os.getenv('CASSANDRA_PORT', '9042'))
     CASSANDRA_KEYSPACE = os.getenv('CASSANDRA_KEYSPACE', 'music_streaming')
     
-    CASSANDRA_PROTOCOL_VERSION = 4
+    CASSANDRA_PROTOCOL_VERSION = int(os.getenv('CASSANDRA_PROTOCOL_VERSION', '4'))
     CASSANDRA_COMPRESSION = True
     CONNECTION_TIMEOUT = int(os.getenv('CONNECTION_TIMEOUT', '30'))
     
+    CASSANDRA_LOCAL_DC = os.getenv('CASSANDRA_LOCAL_DC') or None
+    
+    EXEC_PROFILE_WRITE = 'etl_write'
+    EXEC_PROFILE_READ = 'read'
+    WRITE_CONSISTENCY_LEVEL = os.getenv('WRITE_CONSISTENCY_LEVEL', 'LOCAL_ONE')
+    READ_CONSISTENCY_LEVEL = os.getenv('READ_CONSISTENCY_LEVEL', 'LOCAL_ONE')
+    WRITE_TIMEOUT = float(os.getenv('WRITE_TIMEOUT', '10'))
+    READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', '10'))
+    
     PROJECT_ROOT = Path(__file__).parent.parent
     DATA_DIR = PROJECT_ROOT / 'data'
     EVENT_LOG_FILE = DATA_DIR / os.getenv('EVENT_LOG_FILE', 'event_datafile_new.csv')
     
     BATCH_SIZE = int(os.getenv('BATCH_SIZE', '100'))
     CONCURRENT_REQUESTS = int(os.getenv('CONCURRENT_REQUESTS', '10'))
+    MIN_CONCURRENT_REQUESTS = int(os.getenv('MIN_CONCURRENT_REQUESTS', '1'))
+    MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', '256'))
+    WRITE_LATENCY_TARGET = float(os.getenv('WRITE_LATENCY_TARGET', '0.05'))
+    WRITE_RETRIES = int(os.getenv('WRITE_RETRIES', '3'))
+    RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '0.1'))
+    RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '5'))
+    CHUNK_SIZE = int(os.getenv('CHUNK_SIZE', '10000'))
+    READER_THREADS = int(os.getenv('READER_THREADS', '4'))
+    CSV_ENGINE = os.getenv('CSV_ENGINE', 'python')
+    DEDUP_CACHE_SIZE = int(os.getenv('DEDUP_CACHE_SIZE', '100000'))
+    USERS_BY_SONG_BUCKETS = int(os.getenv('USERS_BY_SONG_BUCKETS', '1'))
+    TOP_SONGS_SIZE = int(os.getenv('TOP_SONGS_SIZE', '100'))
+    FOLLOW_INTERVAL = float(os.getenv('FOLLOW_INTERVAL', '1'))
+    FOLLOW_BATCH_ROWS = int(os.getenv('FOLLOW_BATCH_ROWS', '1000'))
+    
+    QUERY_FETCH_SIZE = int(os.getenv('QUERY_FETCH_SIZE', '5000'))
+    QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', '10000'))
+    QUERY_CACHE_TTL = float(os.getenv('QUERY_CACHE_TTL', '60'))
+    SCAN_CONCURRENCY = int(os.getenv('SCAN_CONCURRENCY', '8'))
+    SCAN_SPLITS = int(os.getenv('SCAN_SPLITS', '1'))
+    TABLE_STATS_TTL = float(os.getenv('TABLE_STATS_TTL', '60'))
+    
+    METRICS_INTERVAL = float(os.getenv('METRICS_INTERVAL', '15'))
     
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_DIR = PROJECT_ROOT / 'logs'
+    STATE_DIR = PROJECT_ROOT / 'state'
+    CHECKPOINT_FILE = STATE_DIR / os.getenv('CHECKPOINT_FILE', 'etl_checkpoint.json')
+    DEAD_LETTER_FILE = STATE_DIR / os.getenv('DEAD_LETTER_FILE', 'dead_letter.jsonl')
     
     TABLE_SONGS_BY_SESSION = 'songs_by_session'
     TABLE_SONGS_BY_USER_SESSION = 'songs_by_user_session'
     TABLE_USERS_BY_SONG = 'users_by_song'
+    TABLE_USERS_BY_SONG_BUCKETED = 'users_by_song_bucketed'
+    TABLE_SONG_PLAYS = 'song_plays'
+    TABLE_ARTIST_PLAYS = 'artist_plays'
+    TABLE_TOP_SONGS = 'top_songs'
+    TOP_SONGS_CHART = 'all'
     
     @classmethod
     def validate(cls):
         cls.DATA_DIR.mkdir(exist_ok=True)
         cls.LOG_DIR.mkdir(exist_ok=True)
+        cls.STATE_DIR.mkdir(exist_ok=True)
         
         if not cls.EVENT_LOG_FILE.exists():
             return False
@@ -41,7 +83,7 @@ class Config:
     @classmethod
     def get_connection_params(cls):
         return {
-            'contact_points': [cls.CASSANDRA_HOST],
+            'contact_points': [host.strip() for host in cls.CASSANDRA_HOST.split(',')],
             'port': cls.CASSANDRA_PORT,
             'protocol_version': cls.CASSANDRA_PROTOCOL_VERSION,
             'compression': cls.CASSANDRA_COMPRESSION,
@@ -1,29 +1,69 @@
-from gevent import monkey
-monkey.patch_all()
-
 import logging
 from contextlib import contextmanager
-from cassandra.cluster import Cluster
+from dataclasses import replace
+from cassandra.cluster import Cluster, ExecutionProfile, EXEC_PROFILE_DEFAULT
 from cassandra.auth import PlainTextAuthProvider
 from cassandra import ConsistencyLevel
+from cassandra.policies import DCAwareRoundRobinPolicy, TokenAwarePolicy
 from cassandra.query import SimpleStatement
+from src.cache import MISS, QueryCache
 from src.config import Config
+from src.stats import estimate_table_stats
 
 logger = logging.getLogger(__name__)
 
+TABLE_STATS = 'table_stats'
+
+def token_aware_policy():
+    return TokenAwarePolicy(DCAwareRoundRobinPolicy(local_dc=Config.CASSANDRA_LOCAL_DC))
+
+def build_execution_profiles():
+    """
+    Execution profiles for the cluster, all routed token-aware to a replica.
+    
+    The default profile keeps the driver defaults; the write and read profiles
+    take their consistency level and timeout from Config.
+    """
+    return {
+        EXEC_PROFILE_DEFAULT: ExecutionProfile(
+            load_balancing_policy=token_aware_policy()
+        ),
+        Config.EXEC_PROFILE_WRITE: ExecutionProfile(
+            load_balancing_policy=token_aware_policy(),
+            consistency_level=ConsistencyLevel.name_to_value[Config.WRITE_CONSISTENCY_LEVEL],
+            request_timeout=Config.WRITE_TIMEOUT
+        ),
+        Config.EXEC_PROFILE_READ: ExecutionProfile(
+            load_balancing_policy=token_aware_policy(),
+            consistency_level=ConsistencyLevel.name_to_value[Config.READ_CONSISTENCY_LEVEL],
+            request_timeout=Config.READ_TIMEOUT
+        ),
+    }
+
+def resolve_profile(session, name):
+    """Return `name` if the session's cluster defines that profile, else the default profile."""
+    cluster = getattr(session, 'cluster', None)
+    profiles = getattr(getattr(cluster, 'profile_manager', None), 'profiles', {})
+    return name if name in profiles else EXEC_PROFILE_DEFAULT
+
 class CassandraConnection:
     
-    def __init__(self):
+    def __init__(self, stats_ttl=None):
         self.cluster = None
         self.session = None
         self._connected = False
+        # Table statistics are polled by monitoring; keep them for TABLE_STATS_TTL seconds
+        self._stats_cache = QueryCache(ttl=stats_ttl if stats_ttl is not None else Config.TABLE_STATS_TTL)
     
     def connect(self, keyspace=None):
         try:
             connection_params = Config.get_connection_params()
             
             logger.info(f"Connecting to Cassandra at {Config.CASSANDRA_HOST}:{Config.CASSANDRA_PORT}")
-            self.cluster = Cluster(**connection_params)
+            self.cluster = Cluster(
+                execution_profiles=build_execution_profiles(),
+                **connection_params
+            )
             
             if keyspace:
                 self.session = self.cluster.connect(keyspace)
@@ -117,15 +157,45 @@ class CassandraConnection:
             return False
     
     def get_table_count(self, table_name):
+        # One COUNT(*) per token range, rather than a single scan on one coordinator
+        from src.scan import TokenRangeScanner
+        
         try:
-            query = f"SELECT COUNT(*) FROM {table_name}"
-            result = self.session.execute(query).one()
-            return result[0] if result else 0
+            return TokenRangeScanner(self.session, table_name).count()
         
         except Exception as e:
             logger.error(f"Error getting table count: {e}")
             return 0
     
+    def get_table_stats(self, table_name, exact=False):
+        """
+        Estimated partition count and mean partition size of a table.
+        
+        Read from system.size_estimates on every live node and cached for
+        TABLE_STATS_TTL seconds. With `exact`, `rows` also holds an exact
+        count from a token-range scan, which reads the whole table.
+        
+        Returns:
+            TableStats, or None if the statistics could not be read
+        """
+        from src.scan import TokenRangeScanner
+        
+        params = (table_name, exact)
+        cached = self._stats_cache.get(TABLE_STATS, params)
+        if cached is not MISS:
+            return cached
+        
+        try:
+            stats = estimate_table_stats(self.session, table_name)
+            if exact:
+                stats = replace(stats, rows=TokenRangeScanner(self.session, table_name).count())
+        except Exception as e:
+            logger.error(f"Error getting table stats: {e}")
+            return None
+        
+        self._stats_cache.put(TABLE_STATS, params, stats)
+        return stats
+    
     def __enter__(self):
         self.connect()
         return self
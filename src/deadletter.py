@@ -0,0 +1,62 @@
+"""
+Dead-letter log for rows the ETL could not write.
+Each failed statement is appended as one JSON line with its table, row values
+and the error, so the rows can be replayed once the cause is fixed.
+"""
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class DeadLetterLog:
+    """Append-only JSONL file of failed writes."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path or Config.DEAD_LETTER_FILE)
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def write(self, table: str, values: List[tuple], error: BaseException):
+        """Record the rows of one failed statement."""
+        self.append({
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'table': table,
+            'error_type': type(error).__name__,
+            'error': str(error),
+            'rows': [list(row) for row in values],
+        })
+
+    def append(self, entry: Dict):
+        """Record an entry as is, e.g. one read back from a dead-letter file but not replayed."""
+        line = json.dumps(entry, default=str) + '\n'
+
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # One write per entry; O_APPEND keeps lines from worker processes whole
+            with open(self.path, 'a', encoding='utf8') as f:
+                f.write(line)
+            self.rows += len(entry['rows'])
+
+    def extend(self, path: Path):
+        """Record every entry of another dead-letter file."""
+        for entry in read_dead_letters(path):
+            self.append(entry)
+
+
+def read_dead_letters(path: Path) -> Iterator[Dict]:
+    """Yield the entries of a dead-letter file, skipping lines that do not parse."""
+    with open(path, encoding='utf8') as f:
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Skipping unreadable dead-letter line {number} in {path}: {e}")
@@ -0,0 +1,59 @@
+"""
+Pre-write deduplication for the ETL pipeline.
+Collapses rows that share a primary key before they are written, and skips
+rows identical to one written recently, so replayed songs cost one write.
+"""
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class RowDeduplicator:
+    """
+    Drops writes that would not change a table.
+
+    Within one call rows are collapsed per primary key, keeping the last one,
+    which is the row an in-order load would have left behind. Across calls a
+    bounded LRU of the most recently written row per key skips exact repeats;
+    a repeated key with different values is still written. Only exact matches
+    are dropped, so unlike a Bloom filter no distinct row is ever lost.
+    """
+
+    def __init__(self, key_sizes: Dict[str, int], capacity: Optional[int] = None):
+        """
+        Args:
+            key_sizes: Number of leading values forming the primary key, per table
+            capacity: Keys remembered per table across calls; 0 dedups within a call only
+        """
+        self.key_sizes = key_sizes
+        self.capacity = Config.DEDUP_CACHE_SIZE if capacity is None else capacity
+        self._written = {table: OrderedDict() for table in key_sizes}
+        self.dropped = {table: 0 for table in key_sizes}
+
+    def filter(self, table: str, rows: List[tuple]) -> List[tuple]:
+        """Return the rows of `table` that still need writing."""
+        size = self.key_sizes[table]
+        latest = {}
+        for values in rows:
+            latest[values[:size]] = values
+
+        written = self._written[table]
+        kept = []
+        for key, values in latest.items():
+            if written.get(key) == values:
+                written.move_to_end(key)
+                continue
+            kept.append(values)
+            if self.capacity:
+                written[key] = values
+                written.move_to_end(key)
+
+        while len(written) > self.capacity:
+            written.popitem(last=False)
+
+        self.dropped[table] += len(rows) - len(kept)
+        return kept
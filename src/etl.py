@@ -1,115 +1,514 @@
-import csv
 import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from cassandra.cluster import Session
-from cassandra.query import BatchStatement, ConsistencyLevel
+from cassandra.query import BatchStatement, BatchType, ConsistencyLevel
 
 from .config import Config
 from .models import (
     INSERT_SONGS_BY_SESSION_CQL,
     INSERT_SONGS_BY_USER_SESSION_CQL,
-    INSERT_USERS_BY_SONG_CQL
+    INSERT_USERS_BY_SONG_BUCKETED_CQL,
+    INSERT_USERS_BY_SONG_CQL,
+    UPDATE_ARTIST_PLAYS_CQL,
+    UPDATE_SONG_PLAYS_CQL,
+    Event,
+    song_bucket
 )
+from .aggregates import count_plays, refresh_top_songs
+from .cache import QueryCache
+from .checkpoint import INCREMENTAL, RESUME, Checkpoint
+from .connection import CassandraConnection, resolve_profile
+from .deadletter import DeadLetterLog, read_dead_letters
+from .dedup import RowDeduplicator
+from .metrics import Metrics, time_request
+from .throttle import AdaptiveConcurrency, RateLimiter
+from .queries import cache_key_for_row
+from .retry import BackoffRetry
+from .reader import (
+    CSVEventReader, EventChunk, EventColumns, complete_lines_end, is_columnar_file, plan_shards,
+    read_parallel, resolve_event_files
+)
+from .writer import ConcurrentWriter
 
 logger = logging.getLogger(__name__)
 
+TABLE_STAT_KEYS = {
+    Config.TABLE_SONGS_BY_SESSION: 'table1',
+    Config.TABLE_SONGS_BY_USER_SESSION: 'table2',
+    Config.TABLE_USERS_BY_SONG: 'table3',
+    Config.TABLE_USERS_BY_SONG_BUCKETED: 'table3',
+    Config.TABLE_SONG_PLAYS: 'counters',
+    Config.TABLE_ARTIST_PLAYS: 'counters',
+}
+
+# Counter updates of the play-count aggregates; not idempotent, so never retried
+COUNTER_UPDATES = {
+    Config.TABLE_SONG_PLAYS: UPDATE_SONG_PLAYS_CQL,
+    Config.TABLE_ARTIST_PLAYS: UPDATE_ARTIST_PLAYS_CQL,
+}
+
+# Number of leading values in each INSERT that form the partition key
+PARTITION_KEY_SIZES = {
+    Config.TABLE_SONGS_BY_SESSION: 1,
+    Config.TABLE_SONGS_BY_USER_SESSION: 2,
+    Config.TABLE_USERS_BY_SONG: 1,
+    Config.TABLE_USERS_BY_SONG_BUCKETED: 2,
+}
+
+# Number of leading values in each INSERT that form the full primary key
+PRIMARY_KEY_SIZES = {
+    Config.TABLE_SONGS_BY_SESSION: 2,
+    Config.TABLE_SONGS_BY_USER_SESSION: 3,
+    Config.TABLE_USERS_BY_SONG: 2,
+    Config.TABLE_USERS_BY_SONG_BUCKETED: 3,
+}
+
+# Event fields bound to each INSERT, in order; used to build rows from EventColumns
+TABLE_FIELDS = {
+    Config.TABLE_SONGS_BY_SESSION: ('session_id', 'item_in_session', 'artist', 'song_title', 'song_length'),
+    Config.TABLE_SONGS_BY_USER_SESSION: ('user_id', 'session_id', 'item_in_session', 'artist',
+                                         'song_title', 'user_first_name', 'user_last_name'),
+    Config.TABLE_USERS_BY_SONG: ('song_title', 'user_id', 'user_first_name', 'user_last_name'),
+}
+
+def songs_by_session_values(event: Event) -> tuple:
+    return (
+        event.session_id,
+        event.item_in_session,
+        event.artist,
+        event.song_title,
+        event.song_length
+    )
+
+def songs_by_user_session_values(event: Event) -> tuple:
+    return (
+        event.user_id,
+        event.session_id,
+        event.item_in_session,
+        event.artist,
+        event.song_title,
+        event.user_first_name,
+        event.user_last_name
+    )
+
+def users_by_song_values(event: Event) -> tuple:
+    return (
+        event.song_title,
+        event.user_id,
+        event.user_first_name,
+        event.user_last_name
+    )
+
+def users_by_song_bucketed_values(event: Event, buckets: int) -> tuple:
+    return (
+        event.song_title,
+        song_bucket(event.user_id, buckets),
+        event.user_id,
+        event.user_first_name,
+        event.user_last_name
+    )
+
 class MusicStreamingETL:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, concurrency: int = None, batch_size: int = None,
+                 chunk_size: int = None, source: Union[str, Path] = None, start: int = 0,
+                 end: Optional[int] = None, readers: int = None,
+                 checkpoint: Checkpoint = None, checkpoint_mode: Optional[str] = None,
+                 cache: QueryCache = None, metrics: Metrics = None,
+                 adaptive: bool = False, max_rows_per_sec: Optional[float] = None,
+                 retry: BackoffRetry = None, dead_letter: DeadLetterLog = None,
+                 csv_engine: Optional[str] = None, dedup: bool = False,
+                 song_buckets: Optional[int] = None, aggregates: bool = False,
+                 refresh_chart: bool = True):
         self.session = session
+        self.source = source or Config.EVENT_LOG_FILE
+        self.start = start
+        self.end = end
+        self.readers = readers or Config.READER_THREADS
+        self.checkpoint = checkpoint
+        self.checkpoint_mode = checkpoint_mode
+        self.cache = cache
+        self.metrics = metrics
+        self.retry = retry or BackoffRetry()
+        self.dead_letter = dead_letter
+        self._rows_loaded: Dict[Path, int] = {}
+        self.execution_profile = resolve_profile(session, Config.EXEC_PROFILE_WRITE)
+        self.concurrency = concurrency or Config.CONCURRENT_REQUESTS
+        self.batch_size = batch_size or Config.BATCH_SIZE
+        self.chunk_size = chunk_size or Config.CHUNK_SIZE
+        self.csv_engine = csv_engine or Config.CSV_ENGINE
+        # Shared by every writer of this run, so the learned limit carries over
+        self.rate_limiter = RateLimiter(max_rows_per_sec) if max_rows_per_sec else None
+        self.controller = AdaptiveConcurrency(
+            initial=self.concurrency, rate_limiter=self.rate_limiter
+        ) if adaptive else None
+        self.dedup = RowDeduplicator(PRIMARY_KEY_SIZES) if dedup else None
+        self.aggregates = aggregates
+        # Workers leave the chart to the parent, which rebuilds it once from all their songs
+        self.refresh_chart = refresh_chart
+        self.touched_songs = set()
+        self._counter_updates = {}
+        # Follow mode: next offset to read per file (None once a whole file is loaded), and
+        # the last size seen of Parquet and Arrow files, which load once they stop growing
+        self._follow_offsets: Dict[Path, Optional[int]] = {}
+        self._follow_sizes: Dict[Path, int] = {}
         self.stats = {
             'rows_read': 0,
+            'rows_invalid': 0,
             'rows_inserted_table1': 0,
             'rows_inserted_table2': 0,
             'rows_inserted_table3': 0,
+            'rows_inserted_counters': 0,
+            'errors_table1': 0,
+            'errors_table2': 0,
+            'errors_table3': 0,
+            'errors_counters': 0,
             'errors': 0,
+            'retries': 0,
+            'rows_dead_lettered': 0,
+            'rows_deduplicated': 0,
             'start_time': None,
             'end_time': None
         }
+        self._stats_lock = threading.Lock()
+        # (table, rows, error) of failed writes, queued by driver callbacks
+        self._failures = deque()
         
         self.insert_songs_by_session = self.session.prepare(INSERT_SONGS_BY_SESSION_CQL)
         self.insert_songs_by_user_session = self.session.prepare(INSERT_SONGS_BY_USER_SESSION_CQL)
-        self.insert_users_by_song = self.session.prepare(INSERT_USERS_BY_SONG_CQL)
+        
+        # users_by_song, or its bucketed layout when rows are spread over several buckets
+        self.song_buckets = song_buckets or Config.USERS_BY_SONG_BUCKETS
+        if self.song_buckets > 1:
+            self.users_by_song_table = Config.TABLE_USERS_BY_SONG_BUCKETED
+            self.insert_users_by_song = self.session.prepare(INSERT_USERS_BY_SONG_BUCKETED_CQL)
+            self.users_by_song_values = partial(users_by_song_bucketed_values, buckets=self.song_buckets)
+        else:
+            self.users_by_song_table = Config.TABLE_USERS_BY_SONG
+            self.insert_users_by_song = self.session.prepare(INSERT_USERS_BY_SONG_CQL)
+            self.users_by_song_values = users_by_song_values
     
-    def read_csv(self) -> List[Dict]:
-        logger.info(f"Reading CSV file: {Config.EVENT_LOG_FILE}")
-        events = []
+    def iter_file_chunks(self, path: Path, start: int = 0, end: Optional[int] = None,
+                         chunk_size: Optional[int] = None) -> Iterator[EventChunk]:
+        """
+        Stream the events of one file in chunks of about `chunk_size` events
+        (defaults to the ETL's chunk size).
+        
+        CSV files are parsed row by row unless `csv_engine` is 'pandas'.
+        Parquet and Arrow files, and CSV with the pandas engine, are read in
+        column batches that become EventColumns chunks.
+        The last chunk is marked completed and may be empty.
+        """
+        chunk_size = chunk_size or self.chunk_size
+        columnar = is_columnar_file(path) or self.csv_engine == 'pandas'
+        logger.info(f"Reading event file: {path}")
+        if columnar:
+            from .columnar import open_column_reader
+            reader = open_column_reader(path, start, end, chunk_size)
+        else:
+            reader = CSVEventReader(path, start, end)
         
         try:
-            with open(Config.EVENT_LOG_FILE, 'r', encoding='utf8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['artist']:
-                        events.append(row)
-                        self.stats['rows_read'] += 1
+            if columnar:
+                for columns in reader:
+                    yield EventChunk(path, reader.offset, columns)
+                yield EventChunk(path, reader.offset, EventColumns.empty(), completed=True)
+                return
             
-            logger.info(f"Read {len(events)} valid events from CSV")
-            return events
+            events = []
+            for event in reader:
+                events.append(event)
+                if len(events) >= chunk_size:
+                    yield EventChunk(path, reader.offset, events)
+                    events = []
+            
+            yield EventChunk(path, reader.offset, events, completed=True)
         
         except FileNotFoundError:
-            logger.error(f"CSV file not found: {Config.EVENT_LOG_FILE}")
+            logger.error(f"Event file not found: {path}")
             raise
         except Exception as e:
-            logger.error(f"Error reading CSV: {e}")
+            logger.error(f"Error reading {path}: {e}")
             raise
+        finally:
+            with self._stats_lock:
+                self.stats['rows_invalid'] += reader.rows_invalid
     
-    def insert_into_songs_by_session(self, event: Dict):
-        try:
-            self.session.execute(
-                self.insert_songs_by_session,
-                (
-                    int(event['sessionId']),
-                    int(event['itemInSession']),
-                    event['artist'],
-                    event['song'],
-                    float(event['length'])
-                )
-            )
-            self.stats['rows_inserted_table1'] += 1
-        except Exception as e:
-            logger.error(f"Error inserting into songs_by_session: {e}")
-            self.stats['errors'] += 1
+    def plan_files(self) -> Dict[Path, int]:
+        """Map each file to load to the byte offset reading starts from."""
+        files = resolve_event_files(self.source)
+        if self.checkpoint is None:
+            return {path: self.start for path in files}
+        
+        starts = {}
+        for path in files:
+            offset = self.checkpoint.start_offset(path, self.checkpoint_mode)
+            if offset is not None:
+                starts[path] = offset
+                entry = self.checkpoint.get(path)
+                self._rows_loaded[path] = entry['rows'] if offset and entry else 0
+                if self.aggregates and entry and not offset:
+                    logger.warning(f"{path} was loaded before: its plays are added to the "
+                                   f"play counters again")
+        return starts
     
-    def insert_into_songs_by_user_session(self, event: Dict):
-        try:
-            self.session.execute(
-                self.insert_songs_by_user_session,
-                (
-                    int(event['userId']),
-                    int(event['sessionId']),
-                    int(event['itemInSession']),
-                    event['artist'],
-                    event['song'],
-                    event['firstName'],
-                    event['lastName']
-                )
+    def iter_chunks(self) -> Iterator[EventChunk]:
+        """
+        Stream chunks of valid events from the configured source.
+        
+        A single file is read in place, honouring the start/end byte range.
+        Several files are read concurrently by up to `readers` threads.
+        """
+        starts = self.plan_files()
+        
+        if not starts:
+            logger.info("No new events to load")
+            return
+        elif len(starts) == 1:
+            [(path, start)] = starts.items()
+            chunks = self.iter_file_chunks(path, start, self.end)
+        else:
+            logger.info(f"Reading {len(starts)} event files with {min(self.readers, len(starts))} readers")
+            chunks = read_parallel(
+                list(starts), lambda path: self.iter_file_chunks(path, starts[path]), self.readers
             )
-            self.stats['rows_inserted_table2'] += 1
-        except Exception as e:
-            logger.error(f"Error inserting into songs_by_user_session: {e}")
-            self.stats['errors'] += 1
+        
+        for chunk in chunks:
+            self.count_read(chunk)
+            yield chunk
     
-    def insert_into_users_by_song(self, event: Dict):
-        try:
-            self.session.execute(
-                self.insert_users_by_song,
-                (
-                    event['song'],
-                    int(event['userId']),
-                    event['firstName'],
-                    event['lastName']
-                )
-            )
-            self.stats['rows_inserted_table3'] += 1
-        except Exception as e:
-            logger.error(f"Error inserting into users_by_song: {e}")
-            self.stats['errors'] += 1
+    def count_read(self, chunk: EventChunk):
+        self.stats['rows_read'] += len(chunk)
+        if self.metrics is not None:
+            self.metrics.counter('etl_rows_read_total', 'Valid events read from the source').inc(len(chunk))
+    
+    def save_checkpoint(self, chunk: EventChunk, writer: ConcurrentWriter):
+        """Wait for the chunk's writes to finish, then record the file position."""
+        self.wait_for_writes(writer)
+        
+        self._rows_loaded[chunk.path] += len(chunk)
+        self.checkpoint.update(chunk.path, chunk.offset, self._rows_loaded[chunk.path], chunk.completed)
+    
+    def iter_events(self) -> Iterator[Event]:
+        for chunk in self.iter_chunks():
+            yield from chunk
+    
+    def read_csv(self) -> List[Event]:
+        events = list(self.iter_events())
+        logger.info(f"Read {len(events)} valid events from CSV")
+        return events
+    
+    def insert_row(self, table: str, statement, values: tuple):
+        attempt = 1
+        while True:
+            done = time_request(self.metrics, 'etl_write', table=table)
+            try:
+                self.session.execute(statement, values, execution_profile=self.execution_profile)
+            except Exception as e:
+                done(e)
+                if not self.retry.should_retry(e, attempt):
+                    self.record_result(table, 1, e, [values])
+                    return
+                time.sleep(self.retry.delay(attempt))
+                attempt += 1
+                self.record_retry(table, e)
+            else:
+                done()
+                self.record_result(table, 1, values=[values])
+                return
+    
+    def insert_into_songs_by_session(self, event: Event):
+        self.insert_row(Config.TABLE_SONGS_BY_SESSION, self.insert_songs_by_session,
+                        songs_by_session_values(event))
     
-    def load_event(self, event: Dict):
+    def insert_into_songs_by_user_session(self, event: Event):
+        self.insert_row(Config.TABLE_SONGS_BY_USER_SESSION, self.insert_songs_by_user_session,
+                        songs_by_user_session_values(event))
+    
+    def insert_into_users_by_song(self, event: Event):
+        self.insert_row(self.users_by_song_table, self.insert_users_by_song,
+                        self.users_by_song_values(event))
+    
+    def load_event(self, event: Event):
         self.insert_into_songs_by_session(event)
         self.insert_into_songs_by_user_session(event)
         self.insert_into_users_by_song(event)
     
+    def table_statements(self) -> List[Tuple[str, object, callable]]:
+        return [
+            (Config.TABLE_SONGS_BY_SESSION, self.insert_songs_by_session, songs_by_session_values),
+            (Config.TABLE_SONGS_BY_USER_SESSION, self.insert_songs_by_user_session, songs_by_user_session_values),
+            (self.users_by_song_table, self.insert_users_by_song, self.users_by_song_values),
+        ]
+    
+    def submit_batch(self, writer: ConcurrentWriter, table: str, statement, rows: List[tuple]):
+        if len(rows) == 1:
+            writer.submit(statement, rows[0], table)
+            return
+        
+        batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+        for values in rows:
+            batch.add(statement, values)
+        writer.submit(batch, None, table, rows=len(rows), values=rows)
+    
+    def new_writer(self) -> ConcurrentWriter:
+        return ConcurrentWriter(self.session, self.concurrency, on_result=self.record_result,
+                                execution_profile=self.execution_profile, metrics=self.metrics,
+                                controller=self.controller, rate_limiter=self.rate_limiter,
+                                retry=self.retry, on_retry=self.record_retry)
+    
+    def load_events_batched(self, events: List[Event], writer: ConcurrentWriter = None):
+        own_writer = writer is None
+        writer = writer or self.new_writer()
+        
+        for table, statement, to_values in self.table_statements():
+            if isinstance(events, EventColumns):
+                rows = self.column_rows(table, events)
+            else:
+                rows = [to_values(event) for event in events]
+            if self.dedup is not None:
+                rows = self.deduplicate(table, rows)
+            batches = 0
+            for partition_rows in group_by_partition(rows, PARTITION_KEY_SIZES[table], self.batch_size):
+                self.submit_batch(writer, table, statement, partition_rows)
+                batches += 1
+            
+            logger.debug(f"  Submitted {len(rows)} rows to {table} in {batches} batches")
+        
+        if own_writer:
+            self.wait_for_writes(writer)
+    
+    def column_rows(self, table: str, columns: EventColumns) -> List[tuple]:
+        if table == Config.TABLE_USERS_BY_SONG_BUCKETED:
+            return [
+                (song_title, song_bucket(user_id, self.song_buckets), user_id, first_name, last_name)
+                for song_title, user_id, first_name, last_name
+                in columns.rows(TABLE_FIELDS[Config.TABLE_USERS_BY_SONG])
+            ]
+        return columns.rows(TABLE_FIELDS[table])
+    
+    def deduplicate(self, table: str, rows: List[tuple]) -> List[tuple]:
+        kept = self.dedup.filter(table, rows)
+        saved = len(rows) - len(kept)
+        if saved:
+            with self._stats_lock:
+                self.stats['rows_deduplicated'] += saved
+            if self.metrics is not None:
+                self.metrics.counter('etl_rows_deduplicated_total', 'Writes skipped as duplicates',
+                                     table=table).inc(saved)
+        return kept
+    
+    def submit_event(self, writer: ConcurrentWriter, event: Event):
+        writer.submit(self.insert_songs_by_session, songs_by_session_values(event),
+                      Config.TABLE_SONGS_BY_SESSION)
+        writer.submit(self.insert_songs_by_user_session, songs_by_user_session_values(event),
+                      Config.TABLE_SONGS_BY_USER_SESSION)
+        writer.submit(self.insert_users_by_song, self.users_by_song_values(event),
+                      self.users_by_song_table)
+    
+    def record_retry(self, table: str, error: Exception):
+        with self._stats_lock:
+            self.stats['retries'] += 1
+        logger.debug(f"Retrying write to {table} after: {error}")
+    
+    def record_result(self, table: str, rows: int, error: Exception = None,
+                      values: List[tuple] = None):
+        key = TABLE_STAT_KEYS[table]
+        with self._stats_lock:
+            if error is None:
+                self.stats[f'rows_inserted_{key}'] += rows
+            else:
+                self.stats[f'errors_{key}'] += rows
+                self.stats['errors'] += rows
+        
+        # Only now is the write acknowledged, so a read that refills the cache sees it
+        if self.cache is not None and values:
+            self.invalidate_cache(table, values)
+        
+        if self.metrics is not None:
+            outcome = 'error' if error is not None else 'ok'
+            self.metrics.counter('etl_rows_total', 'Rows processed by the write stage',
+                                 table=table, outcome=outcome).inc(rows)
+        
+        # Runs on the driver's I/O thread: logging and dead-lettering wait for write_failures
+        if error is not None:
+            self._failures.append((table, values, error))
+    
+    def write_failures(self):
+        """Log the writes that failed since the last call and append their rows to the dead-letter log."""
+        while self._failures:
+            table, values, error = self._failures.popleft()
+            logger.error(f"Error inserting into {table}: {error}")
+            if self.dead_letter is not None and values:
+                self.dead_letter.write(table, values, error)
+                with self._stats_lock:
+                    self.stats['rows_dead_lettered'] += len(values)
+    
+    def wait_for_writes(self, writer: ConcurrentWriter):
+        """Wait for the writer's requests, then record their failures on this thread."""
+        writer.wait()
+        self.write_failures()
+    
+    def load_events_concurrently(self, events: List[Event], writer: ConcurrentWriter = None):
+        own_writer = writer is None
+        writer = writer or self.new_writer()
+        
+        for event in events:
+            self.submit_event(writer, event)
+        
+        if own_writer:
+            self.wait_for_writes(writer)
+    
+    def load_chunk(self, events: List[Event], writer: ConcurrentWriter):
+        # Deduplication works on per-table rows, which only the batched path builds
+        if self.batch_size > 1 or self.dedup is not None:
+            self.load_events_batched(events, writer)
+        elif self.concurrency > 1 or self.controller or self.rate_limiter:
+            self.load_events_concurrently(events, writer)
+        else:
+            for event in events:
+                self.load_event(event)
+        
+        if self.aggregates:
+            self.write_aggregates(events, writer)
+        self.write_failures()
+    
+    def counter_update(self, table: str):
+        if table not in self._counter_updates:
+            self._counter_updates[table] = self.session.prepare(COUNTER_UPDATES[table])
+        return self._counter_updates[table]
+    
+    def write_aggregates(self, events: List[Event], writer: ConcurrentWriter):
+        """Add the chunk's plays to the counters, one delta per song and per artist."""
+        songs, artists = count_plays(events)
+        
+        update_song = self.counter_update(Config.TABLE_SONG_PLAYS)
+        for (artist, song_title), plays in songs.items():
+            writer.submit(update_song, (plays, artist, song_title), Config.TABLE_SONG_PLAYS,
+                          idempotent=False)
+        
+        update_artist = self.counter_update(Config.TABLE_ARTIST_PLAYS)
+        for artist, plays in artists.items():
+            writer.submit(update_artist, (plays, artist), Config.TABLE_ARTIST_PLAYS, idempotent=False)
+        
+        self.touched_songs.update(songs)
+        logger.debug(f"  Counted {sum(songs.values())} plays as {len(songs) + len(artists)} counter updates")
+    
+    def invalidate_cache(self, table: str, values: List[tuple]):
+        """Drop cached query results for every key the rows were written to."""
+        keys = {cache_key_for_row(table, row) for row in values} - {None}
+        dropped = sum(self.cache.invalidate(query_id, params) for query_id, params in keys)
+        if dropped:
+            logger.debug(f"  Invalidated {dropped} cached query results")
+    
     def run(self):
         try:
             self.stats['start_time'] = datetime.now()
@@ -118,48 +517,428 @@ class MusicStreamingETL:
             logger.info("STARTING ETL PIPELINE")
             logger.info("=" * 60)
             
-            events = self.read_csv()
+            logger.info(f"Loading events into Cassandra tables "
+                        f"({self.concurrency} concurrent requests, batch size {self.batch_size})...")
+            if self.controller:
+                logger.info(f"Adaptive concurrency between {self.controller.min_limit} and "
+                            f"{self.controller.max_limit}, target latency "
+                            f"{self.controller.target_latency * 1000:.0f} ms")
             
-            logger.info(f"Loading {len(events)} events into Cassandra tables...")
+            writer = self.new_writer()
+            for chunk in self.iter_chunks():
+                self.load_chunk(chunk.events, writer)
+                if self.checkpoint is not None:
+                    self.save_checkpoint(chunk, writer)
+                if chunk.events:
+                    logger.info(f"  Processed {self.stats['rows_read']} events...")
+            self.wait_for_writes(writer)
             
-            for i, event in enumerate(events, 1):
-                self.load_event(event)
-                
-                if i % 1000 == 0:
-                    logger.info(f"  Processed {i}/{len(events)} events...")
+            if self.aggregates and self.refresh_chart:
+                refresh_top_songs(self.session, self.touched_songs, concurrency=self.concurrency,
+                                  execution_profile=self.execution_profile)
             
             self.stats['end_time'] = datetime.now()
             self.print_summary()
+            if self.dedup:
+                logger.info("Duplicate writes skipped: " + ", ".join(
+                    f"{table} {self.dedup.dropped[table]}" for table, _, _ in self.table_statements()))
+            if self.controller:
+                logger.info(f"Final concurrency limit {self.controller.limit} "
+                            f"({self.controller.decreases} backoffs)")
+                if self.rate_limiter:
+                    logger.info(f"Final rate limit {self.rate_limiter.rate:.0f} rows/s "
+                                f"of {self.rate_limiter.max_rate:.0f}")
             
             logger.info("ETL pipeline completed successfully")
             return True
         
         except Exception as e:
             logger.error(f"ETL pipeline failed: {e}", exc_info=True)
+            # Keep the rows of writes that already failed
+            self.write_failures()
+            return False
+    
+    def follow(self, interval: Optional[float] = None, batch_rows: Optional[int] = None,
+               stop: Optional[threading.Event] = None) -> bool:
+        """
+        Tail the source and load new events as they arrive, until `stop` is set
+        or the process is interrupted.
+        
+        Every `interval` seconds the source is checked for new rows: a CSV file
+        is read up to its last complete line, a directory or glob picks up new
+        files. New rows are written in micro-batches of up to `batch_rows`
+        events, and the checkpoint records the offset reached after each one,
+        so a restart continues where the last run stopped.
+        
+        Args:
+            interval: Seconds between checks (defaults to Config.FOLLOW_INTERVAL)
+            batch_rows: Events per micro-batch (defaults to Config.FOLLOW_BATCH_ROWS)
+            stop: Event that ends the loop when set
+        
+        Returns:
+            True unless loading failed
+        """
+        interval = interval or Config.FOLLOW_INTERVAL
+        batch_rows = batch_rows or Config.FOLLOW_BATCH_ROWS
+        stop = stop or threading.Event()
+        if self.checkpoint is None:
+            self.checkpoint = Checkpoint()
+        
+        self.stats['start_time'] = datetime.now()
+        logger.info(f"Following {self.source}: micro-batches of up to {batch_rows} events, "
+                    f"checked every {interval:g}s")
+        
+        writer = self.new_writer()
+        try:
+            while not stop.is_set():
+                if self.poll_once(writer, batch_rows):
+                    if self.aggregates and self.refresh_chart:
+                        refresh_top_songs(self.session, self.touched_songs, concurrency=self.concurrency,
+                                          execution_profile=self.execution_profile)
+                        self.touched_songs = set()
+                    logger.info(f"  Processed {self.stats['rows_read']} events...")
+                stop.wait(interval)
+        except KeyboardInterrupt:
+            logger.info("Stopped following")
+        except Exception as e:
+            logger.error(f"Follow mode failed: {e}", exc_info=True)
             return False
+        finally:
+            self.wait_for_writes(writer)
+            self.stats['end_time'] = datetime.now()
+            self.print_summary()
+        
+        return True
+    
+    def poll_once(self, writer: ConcurrentWriter, batch_rows: Optional[int] = None) -> int:
+        """Load whatever the source gained since the last poll. Returns the number of events read."""
+        try:
+            files = resolve_event_files(self.source)
+        except FileNotFoundError:
+            return 0
+        return sum(self.follow_file(path, writer, batch_rows) for path in files)
+    
+    def follow_file(self, path: Path, writer: ConcurrentWriter, batch_rows: Optional[int] = None) -> int:
+        columnar = is_columnar_file(path)
+        if path not in self._follow_offsets:
+            # CSV files may keep growing, so never count as completed; Parquet and Arrow are loaded once
+            offset = self.checkpoint.start_offset(path, RESUME if columnar else INCREMENTAL)
+            entry = self.checkpoint.get(path)
+            self._follow_offsets[path] = offset
+            self._rows_loaded[path] = entry['rows'] if offset and entry else 0
+        
+        offset = self._follow_offsets[path]
+        if offset is None:
+            return 0
+        
+        try:
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            # Removed from the drop directory since it was listed
+            del self._follow_offsets[path]
+            return 0
+        
+        if columnar:
+            # A file still being written would fail to parse; wait until its size holds for a poll
+            previous, self._follow_sizes[path] = self._follow_sizes.get(path), size
+            if size != previous:
+                return 0
+            end = None
+        else:
+            if size < offset:
+                logger.warning(f"{path} shrank below the loaded offset, reloading it from the start")
+                offset = 0
+                self._rows_loaded[path] = 0
+            end = complete_lines_end(path, offset)
+            if end <= offset:
+                return 0
+        
+        rows = 0
+        for chunk in self.iter_file_chunks(path, offset, end, chunk_size=batch_rows):
+            self.count_read(chunk)
+            rows += len(chunk)
+            completed = columnar and chunk.completed
+            if chunk.events:
+                self.load_chunk(chunk.events, writer)
+            if chunk.events or completed:
+                self.wait_for_writes(writer)
+                self._rows_loaded[path] += len(chunk)
+                self.checkpoint.update(path, chunk.offset, self._rows_loaded[path], completed)
+        
+        self._follow_offsets[path] = None if columnar else end
+        return rows
+    
+    def replay_dead_letters(self, path: Union[str, Path]) -> bool:
+        """
+        Write the rows of a dead-letter file again.
+        
+        The file is moved aside while it is replayed, so rows that fail again
+        are appended to `dead_letter` afresh, even when it uses the same path.
+        
+        Counter updates are replayed only with `aggregates`: one that timed
+        out may still have been applied, and replaying it would count the
+        plays twice. Otherwise they are kept in the dead-letter file, as are
+        rows of tables outside the current layout, such as
+        users_by_song_bucketed rows when USERS_BY_SONG_BUCKETS is 1.
+        
+        A replay that stopped part way leaves its rows in `<path>.replay`;
+        they are added back to the dead-letter file and replayed again.
+        
+        Returns:
+            True if every row was written and none were kept
+        """
+        path = Path(path)
+        replaying = path.with_name(path.name + '.replay')
+        if replaying.exists():
+            logger.warning(f"Recovering the rows of an unfinished replay from {replaying}")
+            DeadLetterLog(path).extend(replaying)
+            replaying.unlink()
+        
+        if not path.exists():
+            logger.info(f"No dead-letter file at {path}")
+            return True
+        
+        os.replace(path, replaying)
+        statements = {table: statement for table, statement, _ in self.table_statements()}
+        
+        self.stats['start_time'] = datetime.now()
+        logger.info(f"Replaying dead-letter rows from {path}")
+        
+        writer = self.new_writer()
+        keep = self.dead_letter or DeadLetterLog(path)
+        skipped_counters = skipped_tables = 0
+        for entry in read_dead_letters(replaying):
+            table = entry['table']
+            if table not in statements and table not in COUNTER_UPDATES:
+                keep.append(entry)
+                skipped_tables += len(entry['rows'])
+                continue
+            
+            if table in COUNTER_UPDATES and not self.aggregates:
+                keep.append(entry)
+                skipped_counters += len(entry['rows'])
+                continue
+            
+            rows = [tuple(row) for row in entry['rows']]
+            self.stats['rows_read'] += len(rows)
+            if table in COUNTER_UPDATES:
+                for values in rows:
+                    writer.submit(self.counter_update(table), values, table, idempotent=False)
+                continue
+            for partition_rows in group_by_partition(rows, PARTITION_KEY_SIZES[table], self.batch_size):
+                self.submit_batch(writer, table, statements[table], partition_rows)
+        self.wait_for_writes(writer)
+        if skipped_counters:
+            logger.warning(f"Kept {skipped_counters} counter updates in the dead-letter file; "
+                           f"replay with aggregates to apply them")
+        if skipped_tables:
+            logger.warning(f"Kept {skipped_tables} rows of tables this run does not write in the "
+                           f"dead-letter file; check USERS_BY_SONG_BUCKETS")
+        
+        self.stats['end_time'] = datetime.now()
+        self.print_summary()
+        replaying.unlink()
+        
+        return self.stats['errors'] == 0 and not (skipped_counters or skipped_tables)
     
     def print_summary(self):
-        duration = (self.stats['end_time'] - self.stats['start_time']).total_seconds()
-        
-        logger.info("=" * 60)
-        logger.info("ETL PIPELINE SUMMARY")
-        logger.info("=" * 60)
-        logger.info(f"Execution Time: {duration:.2f} seconds")
-        logger.info(f"CSV Rows Read: {self.stats['rows_read']}")
-        logger.info("")
-        logger.info("Records Inserted:")
-        logger.info(f"  songs_by_session:       {self.stats['rows_inserted_table1']}")
-        logger.info(f"  songs_by_user_session:  {self.stats['rows_inserted_table2']}")
-        logger.info(f"  users_by_song:          {self.stats['rows_inserted_table3']}")
-        logger.info(f"  Total:                  {sum([
-            self.stats['rows_inserted_table1'],
-            self.stats['rows_inserted_table2'],
-            self.stats['rows_inserted_table3']
-        ])}")
-        logger.info("")
-        logger.info(f"Errors: {self.stats['errors']}")
-        logger.info("=" * 60)
-
-def run_etl_pipeline(session: Session) -> bool:
-    etl = MusicStreamingETL(session)
-    return etl.run()
\ No newline at end of file
+        print_summary(self.stats)
+
+def merge_stats(all_stats: List[Dict]) -> Dict:
+    """Combine the stats of several ETL runs, e.g. one per worker process."""
+    merged = {}
+    for stats in all_stats:
+        for key, value in stats.items():
+            if key == 'start_time':
+                merged[key] = min(filter(None, [merged.get(key), value]), default=None)
+            elif key == 'end_time':
+                merged[key] = max(filter(None, [merged.get(key), value]), default=None)
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+def print_summary(stats: Dict):
+    start, end = stats.get('start_time'), stats.get('end_time')
+    # A run that failed, or workers that all failed, never record an end time
+    duration = f"{(end - start).total_seconds():.2f} seconds" if start and end else "unknown (did not finish)"
+    total = sum([
+        stats['rows_inserted_table1'],
+        stats['rows_inserted_table2'],
+        stats['rows_inserted_table3']
+    ])
+    
+    logger.info("=" * 60)
+    logger.info("ETL PIPELINE SUMMARY")
+    logger.info("=" * 60)
+    logger.info(f"Execution Time: {duration}")
+    logger.info(f"CSV Rows Read: {stats['rows_read']}")
+    logger.info(f"CSV Rows Skipped: {stats['rows_invalid']}")
+    logger.info("")
+    logger.info("Records Inserted:")
+    logger.info(f"  songs_by_session:       {stats['rows_inserted_table1']}")
+    logger.info(f"  songs_by_user_session:  {stats['rows_inserted_table2']}")
+    logger.info(f"  users_by_song:          {stats['rows_inserted_table3']}")
+    logger.info(f"  Total:                  {total}")
+    logger.info("")
+    logger.info(f"Errors: {stats['errors']}")
+    logger.info(f"  songs_by_session:       {stats['errors_table1']}")
+    logger.info(f"  songs_by_user_session:  {stats['errors_table2']}")
+    logger.info(f"  users_by_song:          {stats['errors_table3']}")
+    logger.info(f"Retries: {stats.get('retries', 0)}")
+    logger.info(f"Rows Dead-Lettered: {stats.get('rows_dead_lettered', 0)}")
+    logger.info(f"Writes Deduplicated: {stats.get('rows_deduplicated', 0)}")
+    logger.info(f"Counter Updates: {stats.get('rows_inserted_counters', 0)}")
+    logger.info("=" * 60)
+
+def group_by_partition(rows: List[tuple], key_size: int, batch_size: int) -> Iterator[List[tuple]]:
+    """
+    Group insert values by partition key and split each group into chunks.
+    
+    Args:
+        rows: Insert values, partition key columns first
+        key_size: Number of leading values forming the partition key
+        batch_size: Maximum number of rows per chunk
+    
+    Yields:
+        Lists of values that all belong to one partition
+    """
+    partitions = defaultdict(list)
+    for values in rows:
+        partitions[values[:key_size]].append(values)
+    
+    for partition_rows in partitions.values():
+        for start in range(0, len(partition_rows), batch_size):
+            yield partition_rows[start:start + batch_size]
+
+def run_etl_pipeline(session: Session, concurrency: int = None, batch_size: int = None,
+                     chunk_size: int = None, source: Union[str, Path] = None,
+                     readers: int = None, checkpoint: Checkpoint = None,
+                     checkpoint_mode: Optional[str] = None, metrics: Metrics = None,
+                     adaptive: bool = False, max_rows_per_sec: Optional[float] = None,
+                     dead_letter: DeadLetterLog = None, csv_engine: Optional[str] = None,
+                     dedup: bool = False, aggregates: bool = False, follow: bool = False,
+                     flush_interval: Optional[float] = None, flush_rows: Optional[int] = None) -> bool:
+    etl = MusicStreamingETL(session, concurrency=concurrency, batch_size=batch_size,
+                            chunk_size=chunk_size, source=source, readers=readers,
+                            checkpoint=checkpoint, checkpoint_mode=checkpoint_mode,
+                            metrics=metrics, adaptive=adaptive, max_rows_per_sec=max_rows_per_sec,
+                            dead_letter=dead_letter, csv_engine=csv_engine, dedup=dedup,
+                            aggregates=aggregates)
+    if follow:
+        return etl.follow(flush_interval, flush_rows)
+    return etl.run()
+
+def _init_worker(log_level: str):
+    logging.basicConfig(
+        level=getattr(logging, log_level),
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+def run_etl_shard(shard: Dict) -> Dict:
+    """
+    Load one byte range of the event log in a worker process.
+    
+    Each worker opens its own CassandraConnection and MusicStreamingETL.
+    
+    Args:
+        shard: Dictionary with path, start, end and the ETL options
+    
+    Returns:
+        Dictionary with 'success', the worker's 'stats' and the 'songs'
+        whose play counters it updated
+    """
+    conn = CassandraConnection()
+    try:
+        session = conn.connect(keyspace=Config.CASSANDRA_KEYSPACE)
+        etl = MusicStreamingETL(
+            session,
+            concurrency=shard['concurrency'],
+            batch_size=shard['batch_size'],
+            chunk_size=shard['chunk_size'],
+            source=shard['path'],
+            start=shard['start'],
+            end=shard['end'],
+            adaptive=shard['adaptive'],
+            max_rows_per_sec=shard['max_rows_per_sec'],
+            dead_letter=DeadLetterLog(shard['dead_letter']) if shard['dead_letter'] else None,
+            csv_engine=shard['csv_engine'],
+            dedup=shard['dedup'],
+            aggregates=shard['aggregates'],
+            refresh_chart=False
+        )
+        success = etl.run()
+        return {'success': success, 'stats': etl.stats, 'songs': etl.touched_songs}
+    except Exception as e:
+        logger.error(f"Worker failed on bytes {shard['start']}-{shard['end']}: {e}", exc_info=True)
+        return {'success': False, 'stats': {}, 'songs': set()}
+    finally:
+        conn.disconnect()
+
+def run_etl_parallel(workers: int, concurrency: int = None, batch_size: int = None,
+                     chunk_size: int = None, source: Union[str, Path] = None,
+                     log_level: str = 'INFO', adaptive: bool = False,
+                     max_rows_per_sec: Optional[float] = None,
+                     dead_letter: Optional[Path] = None, csv_engine: Optional[str] = None,
+                     dedup: bool = False, aggregates: bool = False) -> bool:
+    """
+    Load the event log in worker processes.
+    
+    A single CSV file is split into line-aligned byte ranges; with several
+    files, or a Parquet or Arrow file, each worker loads whole files.
+    
+    Args:
+        workers: Maximum number of worker processes
+        source: Event file, directory or glob (defaults to Config.EVENT_LOG_FILE)
+        log_level: Logging level for the workers
+        adaptive: Let each worker adapt its concurrency to write latency
+        max_rows_per_sec: Write rate cap for all workers together
+        dead_letter: JSONL file the workers append failed rows to
+        csv_engine: 'python' or 'pandas' CSV parsing in the workers
+        dedup: Skip duplicate writes within each worker
+        aggregates: Update the play counters; the top songs chart is rebuilt
+            once, after every worker has finished
+    
+    Returns:
+        True if every worker succeeded
+    """
+    files = resolve_event_files(source or Config.EVENT_LOG_FILE)
+    planned = plan_shards(files, workers)
+    processes = min(workers, len(planned))
+    shards = [
+        {
+            'path': path,
+            'start': start,
+            'end': end,
+            'concurrency': concurrency,
+            'batch_size': batch_size,
+            'chunk_size': chunk_size,
+            'adaptive': adaptive,
+            'max_rows_per_sec': max_rows_per_sec / processes if max_rows_per_sec else None,
+            'dead_letter': dead_letter,
+            'csv_engine': csv_engine,
+            'dedup': dedup,
+            'aggregates': aggregates,
+        }
+        for path, start, end in planned
+    ]
+    logger.info(f"Loading {len(shards)} shards from {len(files)} files with {processes} worker processes")
+    
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(processes, mp_context=context,
+                             initializer=_init_worker, initargs=(log_level,)) as pool:
+        results = list(pool.map(run_etl_shard, shards))
+    
+    songs = set().union(*(result['songs'] for result in results))
+    if aggregates and songs:
+        conn = CassandraConnection()
+        try:
+            refresh_top_songs(conn.connect(keyspace=Config.CASSANDRA_KEYSPACE), songs,
+                              concurrency=concurrency)
+        finally:
+            conn.disconnect()
+    
+    stats = [result['stats'] for result in results if result['stats']]
+    if stats:
+        print_summary(merge_stats(stats))
+    
+    return all(result['success'] for result in results)
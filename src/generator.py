@@ -0,0 +1,248 @@
+"""
+Synthetic event log generator for scale testing.
+Writes CSVs in the schema of data/event_datafile_new.csv, with Zipf-distributed
+song and user popularity and log-normal session lengths.
+"""
+import csv
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CSV_HEADER = (
+    'artist', 'firstName', 'gender', 'itemInSession', 'lastName', 'length',
+    'level', 'location', 'sessionId', 'song', 'userId'
+)
+
+# sessionId and userId are CQL INTs
+MAX_ROWS = 2**31 - 1
+
+WRITE_BLOCK_ROWS = 100_000
+
+# Average size of a generated row with the default catalog, for sizing by bytes
+ESTIMATED_ROW_BYTES = 129
+
+WORDS = (
+    'Love', 'Night', 'Fire', 'Heart', 'Dream', 'Blue', 'City', 'Light', 'Rain', 'Gold',
+    'Summer', 'Shadow', 'River', 'Wild', 'Electric', 'Silver', 'Ghost', 'Midnight', 'Ocean', 'Star',
+    'Broken', 'Sweet', 'Crazy', 'Lonely', 'Paper', 'Glass', 'Stone', 'Velvet', 'Neon', 'Winter',
+    'Highway', 'Desert', 'Echo', 'Thunder', 'Golden', 'Little', 'Dancing', 'Falling', 'Burning', 'Sugar',
+    'Angel', 'Devil', 'Moon', 'Sun', 'Home', 'Road', 'Time', 'World', 'Dark', 'Young',
+    'Forever', 'Tonight', 'Morning', 'Mirror', 'Diamond', 'Storm', 'Honey', 'Cherry', 'Satellite', 'Garden',
+    'Empire', 'Kingdom', 'Rebel', 'Radio',
+)
+
+FIRST_NAMES = (
+    'Kevin', 'Sara', 'Jacqueline', 'Tegan', 'Sylvie', 'Chloe', 'Mohammad', 'Lily', 'Jayden', 'Ava',
+    'Aleena', 'Jacob', 'Kate', 'Layla', 'Matthew', 'Rylan', 'Emily', 'Noah', 'Olivia', 'Liam',
+    'Sophia', 'Mason', 'Isabella', 'Lucas', 'Mia', 'Ethan', 'Harper', 'James', 'Amelia', 'Logan',
+)
+
+LAST_NAMES = (
+    'Arellano', 'Johnson', 'Lynch', 'Levine', 'Cruz', 'Cuevas', 'Rodriguez', 'Koch', 'Graham', 'Harrell',
+    'Kirby', 'Garrison', 'Smith', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Martinez',
+    'Lopez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Thompson',
+)
+
+LOCATIONS = (
+    'Harrisburg-Carlisle, PA', 'San Francisco-Oakland-Hayward, CA', 'Lansing-East Lansing, MI',
+    'Chicago-Naperville-Elgin, IL-IN-WI', 'Atlanta-Sandy Springs-Roswell, GA',
+    'New York-Newark-Jersey City, NY-NJ-PA', 'Los Angeles-Long Beach-Anaheim, CA',
+    'Houston-The Woodlands-Sugar Land, TX', 'Seattle-Tacoma-Bellevue, WA', 'Portland-South Portland, ME',
+    'Tampa-St. Petersburg-Clearwater, FL', 'Janesville-Beloit, WI', 'Red Bluff, CA',
+    'Birmingham-Hoover, AL', 'Phoenix-Mesa-Scottsdale, AZ', 'Denver-Aurora-Lakewood, CO',
+)
+
+
+@dataclass(frozen=True)
+class GeneratorSpec:
+    """
+    Shape of a synthetic event log.
+
+    Output depends only on these fields, not on the number of worker
+    processes, so the same spec and seed always produce the same files.
+    """
+    rows: int
+    songs: int = 100_000
+    artists: int = 20_000
+    users: int = 100_000
+    song_skew: float = 1.1
+    user_skew: float = 0.8
+    mean_session_length: float = 20.0
+    session_length_sigma: float = 1.0
+    rows_per_file: int = 1_000_000
+    seed: int = 0
+
+    @property
+    def files(self) -> int:
+        return -(-self.rows // self.rows_per_file)
+
+    def file_rows(self, index: int) -> Tuple[int, int]:
+        """(first row, row count) of the file with the given index."""
+        first = index * self.rows_per_file
+        return first, min(self.rows_per_file, self.rows - first)
+
+
+class ZipfSampler:
+    """Draws ranks 0..n-1 with probability proportional to 1 / (rank + 1) ** skew."""
+
+    def __init__(self, n: int, skew: float):
+        weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** skew
+        self.cdf = np.cumsum(weights)
+        self.cdf /= self.cdf[-1]
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return np.minimum(np.searchsorted(self.cdf, rng.random(size)), len(self.cdf) - 1)
+
+
+def _names(rng: np.random.Generator, n: int, words: int) -> np.ndarray:
+    picks = rng.integers(0, len(WORDS), size=(n, words))
+    return np.array([' '.join(WORDS[i] for i in row) for row in picks], dtype=object)
+
+
+@dataclass
+class Catalog:
+    """Songs ordered by popularity rank, and the user base."""
+    song_titles: np.ndarray
+    song_artists: np.ndarray
+    song_lengths: np.ndarray
+    first_names: np.ndarray
+    last_names: np.ndarray
+    genders: np.ndarray
+    levels: np.ndarray
+    locations: np.ndarray
+
+
+@lru_cache(maxsize=4)
+def build_catalog(spec: GeneratorSpec) -> Catalog:
+    """Build the song catalog and user base; deterministic in the spec."""
+    rng = np.random.default_rng([spec.seed, 0])
+
+    # Popular artists also have more songs
+    artist_names = _names(rng, spec.artists, 2)
+    song_artist = ZipfSampler(spec.artists, 0.8).sample(rng, spec.songs)
+    lengths = rng.lognormal(np.log(230.0), 0.35, spec.songs).round(5)
+
+    users = spec.users
+    return Catalog(
+        song_titles=_names(rng, spec.songs, 3),
+        song_artists=artist_names[song_artist],
+        song_lengths=lengths,
+        first_names=np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), users)],
+        last_names=np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), users)],
+        genders=np.array(('F', 'M'), dtype=object)[rng.integers(0, 2, users)],
+        levels=np.array(('free', 'paid'), dtype=object)[(rng.random(users) < 0.25).astype(int)],
+        locations=np.array(LOCATIONS, dtype=object)[rng.integers(0, len(LOCATIONS), users)],
+    )
+
+
+def session_lengths(rng: np.random.Generator, rows: int, mean: float, sigma: float) -> np.ndarray:
+    """Log-normal session lengths (at least one item) summing to exactly `rows`."""
+    mu = np.log(mean) - sigma ** 2 / 2
+    lengths = []
+    remaining = rows
+    while remaining > 0:
+        draw = np.maximum(1, rng.lognormal(mu, sigma, int(remaining / mean) + 16).astype(np.int64))
+        total = np.cumsum(draw)
+        cut = int(np.searchsorted(total, remaining))
+        if cut < len(draw):
+            draw = draw[:cut + 1]
+            draw[-1] -= total[cut] - remaining
+        lengths.append(draw)
+        remaining -= int(draw.sum())
+    return np.concatenate(lengths)
+
+
+def write_event_file(spec: GeneratorSpec, index: int, path: Path) -> int:
+    """
+    Write one file of the event log. Returns the number of rows written.
+
+    The file is written under a temporary name and renamed when complete,
+    so a partly written log is never picked up by the ETL.
+    """
+    catalog = build_catalog(spec)
+    rng = np.random.default_rng([spec.seed, 1, index])
+    first_row, rows = spec.file_rows(index)
+
+    lengths = session_lengths(rng, rows, spec.mean_session_length, spec.session_length_sigma)
+    starts = np.cumsum(lengths) - lengths
+    # Session ids are unique across files because a file has at most one session per row
+    session_ids = np.repeat(first_row + 1 + np.arange(len(lengths)), lengths)
+    items = np.arange(rows) - np.repeat(starts, lengths)
+    users = np.repeat(ZipfSampler(spec.users, spec.user_skew).sample(rng, len(lengths)), lengths)
+    songs = ZipfSampler(spec.songs, spec.song_skew).sample(rng, rows)
+
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', newline='', encoding='utf8') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(CSV_HEADER)
+
+        for block in range(0, rows, WRITE_BLOCK_ROWS):
+            s = slice(block, block + WRITE_BLOCK_ROWS)
+            song, user = songs[s], users[s]
+            writer.writerows(zip(
+                catalog.song_artists[song].tolist(),
+                catalog.first_names[user].tolist(),
+                catalog.genders[user].tolist(),
+                items[s].tolist(),
+                catalog.last_names[user].tolist(),
+                catalog.song_lengths[song].tolist(),
+                catalog.levels[user].tolist(),
+                catalog.locations[user].tolist(),
+                session_ids[s].tolist(),
+                catalog.song_titles[song].tolist(),
+                (user + 1).tolist(),
+            ))
+
+    os.replace(tmp_path, path)
+    return rows
+
+
+def _write_event_file(task: Tuple[GeneratorSpec, int, Path]) -> int:
+    return write_event_file(*task)
+
+
+def generate_event_logs(spec: GeneratorSpec, output_dir: Path,
+                        workers: Optional[int] = None) -> List[Path]:
+    """
+    Write the event log described by `spec` as numbered CSV files.
+
+    Args:
+        spec: Row count, distributions and seed
+        output_dir: Directory for the files; usable as the ETL's --source
+        workers: Processes to generate files in (defaults to the CPU count)
+
+    Returns:
+        Paths of the files written
+    """
+    if not 0 < spec.rows <= MAX_ROWS:
+        raise ValueError(f"rows must be between 1 and {MAX_ROWS}")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    width = max(5, len(str(spec.files - 1)))
+    tasks = [
+        (spec, index, output_dir / f"events-{index:0{width}d}.csv")
+        for index in range(spec.files)
+    ]
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    logger.info(f"Generating {spec.rows} events in {len(tasks)} files with {workers} processes")
+
+    if workers == 1:
+        rows = [_write_event_file(task) for task in tasks]
+    else:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            rows = list(pool.map(_write_event_file, tasks))
+
+    logger.info(f"Wrote {sum(rows)} events to {output_dir}")
+    return [path for _, _, path in tasks]
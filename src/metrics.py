@@ -0,0 +1,390 @@
+"""
+Instrumentation for the ETL write path and the query executors.
+Counters, gauges and latency histograms are exported in the Prometheus text
+format, to a file or an HTTP endpoint, or logged as structured JSON.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from cassandra import OperationTimedOut, ReadTimeout, WriteTimeout
+from cassandra.policies import RetryPolicy
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans a local single-node round trip up to the driver timeout
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+TIMEOUT_ERRORS = (OperationTimedOut, ReadTimeout, WriteTimeout)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str, labels: Labels) -> Iterator[str]:
+        yield f"{name}{_format_labels(labels)} {_format_value(self.value)}"
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """Current value, either set explicitly or read from `function` at export time."""
+
+    def __init__(self, function: Optional[Callable[[], float]] = None):
+        self.function = function
+        self._value = 0
+
+    @property
+    def value(self) -> float:
+        return self.function() if self.function else self._value
+
+    def set(self, value: float):
+        self._value = value
+
+    def samples(self, name: str, labels: Labels) -> Iterator[str]:
+        yield f"{name}{_format_labels(labels)} {_format_value(self.value)}"
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """Fixed-bucket histogram in the Prometheus layout, with a quantile estimate."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile by linear interpolation within its bucket."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+
+        rank = q * total
+        cumulative = 0
+        for index, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def samples(self, name: str, labels: Labels) -> Iterator[str]:
+        with self._lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            yield f"{name}_bucket{_format_labels(labels, (('le', _format_value(bound)),))} {cumulative}"
+        yield f"{name}_sum{_format_labels(labels)} {value_sum!r}"
+        yield f"{name}_count{_format_labels(labels)} {total}"
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'p50': round(self.quantile(0.50), 6),
+            'p95': round(self.quantile(0.95), 6),
+            'p99': round(self.quantile(0.99), 6),
+        }
+
+
+class Metrics:
+    """
+    Registry of labelled metrics.
+
+    Metrics are created on first use, so instrumented code only names what
+    it records: `metrics.histogram('etl_write_latency_seconds', table=...)`.
+    """
+
+    def __init__(self, prefix: str = 'music_streaming'):
+        self.prefix = prefix
+        self._families: Dict[str, Tuple[type, str, Dict[Labels, object]]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: type, name: str, help_text: str, labels: Dict[str, str], factory):
+        key = tuple(sorted(labels.items()))
+        family = self._families.get(name)
+        if family is None or key not in family[2]:
+            with self._lock:
+                family = self._families.setdefault(name, (kind, help_text, {}))
+                if family[0] is not kind:
+                    raise ValueError(f"Metric {name} is already registered as {family[0].__name__}")
+                family[2].setdefault(key, factory())
+        return family[2][key]
+
+    def counter(self, name: str, help_text: str = '', **labels) -> Counter:
+        return self._get(Counter, name, help_text, labels, Counter)
+
+    def gauge(self, name: str, help_text: str = '', function: Optional[Callable[[], float]] = None,
+              **labels) -> Gauge:
+        """Get a gauge; passing `function` rebinds it, e.g. to the newest writer."""
+        gauge = self._get(Gauge, name, help_text, labels, Gauge)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name: str, help_text: str = '', buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+                  **labels) -> Histogram:
+        return self._get(Histogram, name, help_text, labels, lambda: Histogram(buckets))
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        kinds = {Counter: 'counter', Gauge: 'gauge', Histogram: 'histogram'}
+        lines = []
+        with self._lock:
+            families = sorted((name, kind, help_text, dict(series))
+                              for name, (kind, help_text, series) in self._families.items())
+        for name, kind, help_text, series in families:
+            full_name = f"{self.prefix}_{name}"
+            if help_text:
+                lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kinds[kind]}")
+            for labels, metric in sorted(series.items()):
+                lines.extend(metric.samples(full_name, labels))
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        """All metrics as plain data, one entry per label set."""
+        with self._lock:
+            families = {name: dict(series) for name, (_, _, series) in self._families.items()}
+        return {
+            name: [{'labels': dict(labels), 'value': metric.snapshot()}
+                   for labels, metric in sorted(series.items())]
+            for name, series in sorted(families.items())
+        }
+
+
+def time_request(metrics: Optional[Metrics], name: str, **labels):
+    """
+    Start timing one request; returns a function to call with the error, or None, on completion.
+
+    With `metrics` None the returned function does nothing, so call sites
+    need no checks of their own.
+    """
+    if metrics is None:
+        return _no_op
+    start = time.perf_counter()
+
+    def done(error: Optional[BaseException] = None):
+        metrics.histogram(f"{name}_latency_seconds", 'Request latency', **labels).observe(
+            time.perf_counter() - start
+        )
+        if error is not None:
+            metrics.counter(f"{name}_errors_total", 'Failed requests', **labels).inc()
+            if isinstance(error, TIMEOUT_ERRORS):
+                metrics.counter(f"{name}_timeouts_total", 'Requests that timed out', **labels).inc()
+    return done
+
+
+def _no_op(error: Optional[BaseException] = None):
+    pass
+
+
+class CountingRetryPolicy(RetryPolicy):
+    """Delegates every decision to `policy` and counts the retries it asks for."""
+
+    def __init__(self, policy: RetryPolicy, metrics: Metrics, profile: str):
+        self.policy = policy
+        self.metrics = metrics
+        self.profile = profile
+
+    def _count(self, reason: str, decision):
+        if decision[0] in (self.RETRY, self.RETRY_NEXT_HOST):
+            self.metrics.counter('driver_retries_total', 'Retries decided by the driver retry policy',
+                                 profile=self.profile, reason=reason).inc()
+        return decision
+
+    def on_read_timeout(self, *args, **kwargs):
+        return self._count('read_timeout', self.policy.on_read_timeout(*args, **kwargs))
+
+    def on_write_timeout(self, *args, **kwargs):
+        return self._count('write_timeout', self.policy.on_write_timeout(*args, **kwargs))
+
+    def on_unavailable(self, *args, **kwargs):
+        return self._count('unavailable', self.policy.on_unavailable(*args, **kwargs))
+
+    def on_request_error(self, *args, **kwargs):
+        return self._count('request_error', self.policy.on_request_error(*args, **kwargs))
+
+
+def instrument_session(session, metrics: Metrics):
+    """Count driver retries for every execution profile of the session's cluster."""
+    cluster = getattr(session, 'cluster', None)
+    profiles = getattr(getattr(cluster, 'profile_manager', None), 'profiles', {})
+    for name, profile in profiles.items():
+        if not isinstance(profile.retry_policy, CountingRetryPolicy):
+            profile.retry_policy = CountingRetryPolicy(
+                profile.retry_policy or RetryPolicy(), metrics, str(name)
+            )
+
+
+class PrometheusFileSink:
+    """Rewrites a .prom file, e.g. for node_exporter's textfile collector."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def export(self, metrics: Metrics):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(metrics.render_prometheus())
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        pass
+
+
+class PrometheusHTTPSink:
+    """Serves the current metrics at http://host:port/metrics for scraping."""
+
+    def __init__(self, port: int, host: str = ''):
+        self.metrics: Optional[Metrics] = None
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics' or sink.metrics is None:
+                    self.send_error(404)
+                    return
+                body = sink.metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Serving metrics on port {self.port}")
+
+    def export(self, metrics: Metrics):
+        self.metrics = metrics
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class JSONLogSink:
+    """Logs each export as one JSON line."""
+
+    def __init__(self, log: Optional[logging.Logger] = None):
+        self.log = log or logging.getLogger('music_streaming.metrics')
+
+    def export(self, metrics: Metrics):
+        self.log.info(json.dumps({'metrics': metrics.snapshot(), 'time': time.time()}, default=str))
+
+    def close(self):
+        pass
+
+
+def create_sink(target: str):
+    """
+    Build a sink from a target string.
+
+    Args:
+        target: 'prometheus:PORT' for an HTTP endpoint, 'file:PATH' for a
+            Prometheus text file, or 'log' for JSON log lines
+    """
+    kind, _, value = target.partition(':')
+    if kind == 'prometheus':
+        return PrometheusHTTPSink(int(value))
+    if kind == 'file':
+        return PrometheusFileSink(Path(value))
+    if kind == 'log':
+        return JSONLogSink()
+    raise ValueError(f"Unknown metrics sink: {target}")
+
+
+class MetricsReporter:
+    """Exports a registry to a sink every `interval` seconds and once more on stop."""
+
+    def __init__(self, metrics: Metrics, sink, interval: Optional[float] = None):
+        self.metrics = metrics
+        self.sink = sink
+        self.interval = interval or Config.METRICS_INTERVAL
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-reporter', daemon=True)
+
+    def _export(self):
+        try:
+            self.sink.export(self.metrics)
+        except Exception as e:
+            logger.warning(f"Metrics export failed: {e}")
+
+    def _run(self):
+        self._export()
+        while not self._stop.wait(self.interval):
+            self._export()
+
+    def start(self) -> 'MetricsReporter':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._export()
+        self.sink.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
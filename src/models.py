@@ -2,14 +2,16 @@ import logging
 from dataclasses import dataclass
 from typing import Optional
 
+from .config import Config
+
 logger = logging.getLogger(__name__)
 
 KEYSPACE_CQL = """
-CREATE KEYSPACE IF NOT EXISTS music_streaming 
-WITH replication = {
+CREATE KEYSPACE IF NOT EXISTS {keyspace} 
+WITH replication = {{
     'class': 'SimpleStrategy',
     'replication_factor': 1
-}
+}}
 AND durable_writes = true;
 """
 
@@ -85,7 +87,119 @@ FROM users_by_song
 WHERE song_title = ?;
 """
 
-DROP_KEYSPACE = "DROP KEYSPACE IF EXISTS music_streaming;"
+# Optional layout of users_by_song whose partitions are split into buckets by
+# user_id, so a hit song does not grow one unbounded partition
+TABLE_USERS_BY_SONG_BUCKETED_CQL = """
+CREATE TABLE IF NOT EXISTS users_by_song_bucketed (
+    song_title TEXT,
+    bucket INT,
+    user_id INT,
+    user_first_name TEXT,
+    user_last_name TEXT,
+    PRIMARY KEY ((song_title, bucket), user_id)
+) WITH CLUSTERING ORDER BY (user_id ASC);
+"""
+
+INSERT_USERS_BY_SONG_BUCKETED_CQL = """
+INSERT INTO users_by_song_bucketed (
+    song_title, bucket, user_id, user_first_name, user_last_name
+) VALUES (?, ?, ?, ?, ?);
+"""
+
+QUERY_USERS_BY_SONG_BUCKET_CQL = """
+SELECT user_id, user_first_name, user_last_name 
+FROM users_by_song_bucketed 
+WHERE song_title = ? AND bucket = ?;
+"""
+
+# Aggregates kept up to date by the ETL: play counters per song and per
+# artist, and the most played songs ranked in one small partition
+TABLE_SONG_PLAYS_CQL = """
+CREATE TABLE IF NOT EXISTS song_plays (
+    artist TEXT,
+    song_title TEXT,
+    plays COUNTER,
+    PRIMARY KEY ((artist, song_title))
+);
+"""
+
+UPDATE_SONG_PLAYS_CQL = """
+UPDATE song_plays SET plays = plays + ? 
+WHERE artist = ? AND song_title = ?;
+"""
+
+QUERY_SONG_PLAYS_CQL = """
+SELECT plays 
+FROM song_plays 
+WHERE artist = ? AND song_title = ?;
+"""
+
+TABLE_ARTIST_PLAYS_CQL = """
+CREATE TABLE IF NOT EXISTS artist_plays (
+    artist TEXT,
+    plays COUNTER,
+    PRIMARY KEY (artist)
+);
+"""
+
+UPDATE_ARTIST_PLAYS_CQL = """
+UPDATE artist_plays SET plays = plays + ? 
+WHERE artist = ?;
+"""
+
+QUERY_ARTIST_PLAYS_CQL = """
+SELECT plays 
+FROM artist_plays 
+WHERE artist = ?;
+"""
+
+TABLE_TOP_SONGS_CQL = """
+CREATE TABLE IF NOT EXISTS top_songs (
+    chart TEXT,
+    rank INT,
+    artist TEXT,
+    song_title TEXT,
+    plays BIGINT,
+    PRIMARY KEY (chart, rank)
+) WITH CLUSTERING ORDER BY (rank ASC);
+"""
+
+INSERT_TOP_SONGS_CQL = """
+INSERT INTO top_songs (
+    chart, rank, artist, song_title, plays
+) VALUES (?, ?, ?, ?, ?);
+"""
+
+QUERY_TOP_SONGS_CQL = """
+SELECT rank, artist, song_title, plays 
+FROM top_songs 
+WHERE chart = ?;
+"""
+
+DROP_KEYSPACE = "DROP KEYSPACE IF EXISTS {keyspace};"
+
+@dataclass(slots=True)
+class Event:
+    session_id: int
+    item_in_session: int
+    user_id: int
+    artist: str
+    song_title: str
+    song_length: float
+    user_first_name: str
+    user_last_name: str
+
+# CSV column for each Event field, in field order
+EVENT_CSV_COLUMNS = (
+    'sessionId',
+    'itemInSession',
+    'userId',
+    'artist',
+    'song',
+    'length',
+    'firstName',
+    'lastName',
+)
 
 @dataclass
 class SongBySession:
@@ -112,17 +226,26 @@ class UserBySong:
     user_first_name: str
     user_last_name: str
 
-def get_all_table_create_statements():
+def song_bucket(user_id: int, buckets: int) -> int:
+    """Bucket of users_by_song_bucketed that holds `user_id`'s row for a song."""
+    return user_id % buckets
+
+def get_all_table_create_statements(song_buckets=None):
+    song_buckets = song_buckets or Config.USERS_BY_SONG_BUCKETS
     return [
         TABLE_SONGS_BY_SESSION_CQL,
         TABLE_SONGS_BY_USER_SESSION_CQL,
-        TABLE_USERS_BY_SONG_CQL
+        TABLE_USERS_BY_SONG_BUCKETED_CQL if song_buckets > 1 else TABLE_USERS_BY_SONG_CQL,
+        TABLE_SONG_PLAYS_CQL,
+        TABLE_ARTIST_PLAYS_CQL,
+        TABLE_TOP_SONGS_CQL
     ]
 
-def initialize_schema(session):
+def initialize_schema(session, keyspace=None):
+    keyspace = keyspace or Config.CASSANDRA_KEYSPACE
     try:
-        session.execute(KEYSPACE_CQL)
-        session.set_keyspace('music_streaming')
+        session.execute(KEYSPACE_CQL.format(keyspace=keyspace))
+        session.set_keyspace(keyspace)
         for create_statement in get_all_table_create_statements():
             session.execute(create_statement)
         logger.info("Schema initialized successfully")
@@ -131,10 +254,11 @@ def initialize_schema(session):
         logger.error(f"Schema initialization failed: {e}")
         return False
 
-def drop_schema(session):
+def drop_schema(session, keyspace=None):
+    keyspace = keyspace or Config.CASSANDRA_KEYSPACE
     try:
-        session.execute(DROP_KEYSPACE)
-        logger.info("Keyspace music_streaming dropped")
+        session.execute(DROP_KEYSPACE.format(keyspace=keyspace))
+        logger.info(f"Keyspace {keyspace} dropped")
         return True
     except Exception as e:
         logger.error(f"Failed to drop schema: {e}")
@@ -2,29 +2,226 @@
 Query execution module for music streaming analytics.
 Contains functions to execute the three main business queries.
 """
+import heapq
 import logging
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Tuple
 from cassandra.cluster import Session
+from cassandra.concurrent import execute_concurrent, execute_concurrent_with_args
 
+from .cache import MISS, QueryCache
+from .config import Config
+from .connection import resolve_profile
+from .metrics import Metrics, time_request
 from .models import (
+    QUERY_ARTIST_PLAYS_CQL,
+    QUERY_SONG_PLAYS_CQL,
     QUERY_SONGS_BY_SESSION_CQL,
     QUERY_SONGS_BY_USER_SESSION_CQL,
+    QUERY_USERS_BY_SONG_BUCKET_CQL,
+    QUERY_TOP_SONGS_CQL,
     QUERY_USERS_BY_SONG_CQL
 )
 
 logger = logging.getLogger(__name__)
 
+QUERY_1 = 'query_1'
+QUERY_2 = 'query_2'
+QUERY_3 = 'query_3'
+TOP_SONGS = 'top_songs'
+ARTIST_PLAYS = 'artist_plays'
+SONG_PLAYS = 'song_plays'
+
+
+def song_from_row(row) -> Dict[str, Any]:
+    return {
+        'artist': row.artist,
+        'song_title': row.song_title,
+        'song_length': float(row.song_length)
+    }
+
+
+def session_songs_from_rows(rows) -> List[Dict[str, Any]]:
+    return [
+        {
+            'artist': row.artist,
+            'song_title': row.song_title,
+            'item_in_session': row.item_in_session,
+            'user_first_name': row.user_first_name,
+            'user_last_name': row.user_last_name
+        }
+        for row in rows
+    ]
+
+
+def user_from_row(row) -> Dict[str, str]:
+    return {
+        'user_first_name': row.user_first_name,
+        'user_last_name': row.user_last_name
+    }
+
+
+def users_from_rows(rows) -> List[Dict[str, str]]:
+    return [user_from_row(row) for row in rows]
+
+
+def iter_merged_buckets(bucket_rows: Iterable) -> Iterator[Any]:
+    """Merge the rows of every bucket of a song lazily, in user_id order as the unbucketed table returns them."""
+    # heapq.merge re-iterates the last input, which would restart a ResultSet's page
+    return heapq.merge(*((row for row in rows) for rows in bucket_rows), key=attrgetter('user_id'))
+
+
+def merge_buckets(bucket_rows: Iterable) -> List[Any]:
+    return list(iter_merged_buckets(bucket_rows))
+
+
+def merge_bucket_outcomes(outcomes: List[Tuple[bool, Any]]) -> Tuple[bool, Any]:
+    """Combine execute_concurrent outcomes of one song's buckets; any failed bucket fails the song."""
+    for success, result in outcomes:
+        if not success:
+            return False, result
+    return True, merge_buckets(result for _, result in outcomes)
+
+
+def first_song_from_rows(rows) -> Dict[str, Any]:
+    row = rows.one()
+    return song_from_row(row) if row else {}
+
+
+@dataclass
+class BulkResult:
+    """Outcome of one key in a bulk lookup; `error` is set when the query failed."""
+    params: tuple
+    data: Any
+    error: Optional[str] = None
+
+
+@dataclass
+class Page:
+    """One page of a paged query; pass `paging_state` back to get the next page."""
+    rows: List[Dict[str, Any]]
+    paging_state: Optional[str] = None
+    
+    @property
+    def has_more(self) -> bool:
+        return self.paging_state is not None
+
+
+def encode_page_token(bucket: int, paging_state: Optional[bytes]) -> str:
+    """Page token for Page.paging_state: the bucket and the driver's paging state as '<bucket>:<hex>'."""
+    return f"{bucket}:{paging_state.hex() if paging_state else ''}"
+
+
+def decode_page_token(token: Optional[str]) -> Tuple[int, Optional[bytes]]:
+    """(bucket, driver paging state) of a token from encode_page_token; (0, None) for no token."""
+    if not token:
+        return 0, None
+    bucket, separator, state = token.partition(':')
+    try:
+        if not separator:
+            raise ValueError
+        return int(bucket), bytes.fromhex(state) if state else None
+    except ValueError:
+        raise ValueError(f"Malformed paging state: {token!r}") from None
+
+
+# Query whose cached results a table's rows feed, and how many leading values form its parameters
+CACHED_QUERY_BY_TABLE = {
+    Config.TABLE_SONGS_BY_SESSION: (QUERY_1, 2),
+    Config.TABLE_SONGS_BY_USER_SESSION: (QUERY_2, 2),
+    Config.TABLE_USERS_BY_SONG: (QUERY_3, 1),
+    Config.TABLE_USERS_BY_SONG_BUCKETED: (QUERY_3, 1),
+}
+
+
+def cache_key_for_row(table: str, values: tuple) -> Optional[tuple]:
+    """(query id, parameters) of the cached result a row written to `table` can change, if any."""
+    if table not in CACHED_QUERY_BY_TABLE:
+        return None
+    query_id, size = CACHED_QUERY_BY_TABLE[table]
+    return query_id, tuple(values[:size])
+
 
 class QueryExecutor:
     """Executes analytical queries against Cassandra."""
     
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, cache: Optional[QueryCache] = None,
+                 metrics: Optional[Metrics] = None, song_buckets: Optional[int] = None):
+        """
+        Args:
+            session: Cassandra session connected to the keyspace
+            cache: Optional read-through cache shared with the ETL for invalidation
+            metrics: Optional registry for per-query latency and cache hit counts
+            song_buckets: Buckets per song in users_by_song_bucketed (defaults to
+                Config.USERS_BY_SONG_BUCKETS); 1 reads users_by_song
+        """
         self.session = session
+        self.cache = cache
+        self.metrics = metrics
+        self.execution_profile = resolve_profile(session, Config.EXEC_PROFILE_READ)
+        self.song_buckets = song_buckets or Config.USERS_BY_SONG_BUCKETS
         
         # Prepare statements for better performance
         self.query_songs_by_session = self.session.prepare(QUERY_SONGS_BY_SESSION_CQL)
         self.query_songs_by_user_session = self.session.prepare(QUERY_SONGS_BY_USER_SESSION_CQL)
-        self.query_users_by_song = self.session.prepare(QUERY_USERS_BY_SONG_CQL)
+        if self.song_buckets > 1:
+            self.query_users_by_song = self.session.prepare(QUERY_USERS_BY_SONG_BUCKET_CQL)
+        else:
+            self.query_users_by_song = self.session.prepare(QUERY_USERS_BY_SONG_CQL)
+        # Prepared on first use, so keyspaces created before the aggregate tables still serve queries 1-3
+        self._aggregate_statements = {}
+    
+    def _cache_get(self, query_id: str, params: tuple) -> Any:
+        if self.cache is None:
+            return MISS
+        value = self.cache.get(query_id, params)
+        if value is not MISS:
+            logger.debug(f"Cache hit for {query_id}{params}")
+        if self.metrics is not None:
+            result = 'miss' if value is MISS else 'hit'
+            self.metrics.counter('query_cache_total', 'Query cache lookups', query=query_id, result=result).inc()
+        return value
+    
+    def _cache_version(self) -> Optional[int]:
+        # Taken before querying, so a write acknowledged meanwhile keeps the result out of the cache
+        return self.cache.version() if self.cache is not None else None
+    
+    def _cache_put(self, query_id: str, params: tuple, value: Any, version: Optional[int] = None):
+        if self.cache is not None:
+            self.cache.put(query_id, params, value, version)
+    
+    def _execute(self, query_id: str, statement, params: tuple, **kwargs):
+        done = time_request(self.metrics, 'query', query=query_id)
+        try:
+            result = self.session.execute(
+                statement, params, execution_profile=self.execution_profile, **kwargs
+            )
+        except Exception as e:
+            done(e)
+            raise
+        done()
+        return result
+    
+    def _users_by_song(self, song_title: str):
+        """Rows of query 3; with buckets, every bucket is read concurrently and the rows merged."""
+        if self.song_buckets == 1:
+            return self._execute(QUERY_3, self.query_users_by_song, (song_title,))
+        
+        done = time_request(self.metrics, 'query', query=QUERY_3)
+        try:
+            outcomes = execute_concurrent_with_args(
+                self.session,
+                self.query_users_by_song,
+                [(song_title, bucket) for bucket in range(self.song_buckets)],
+                concurrency=self.song_buckets,
+                execution_profile=self.execution_profile
+            )
+        except Exception as e:
+            done(e)
+            raise
+        done()
+        return merge_buckets(result for _, result in outcomes)
     
     def query_1_session_item_lookup(self, session_id: int, item_in_session: int) -> Dict[str, Any]:
         """
@@ -43,23 +240,24 @@ class QueryExecutor:
         """
         logger.info(f"Query 1: session_id={session_id}, item_in_session={item_in_session}")
         
+        params = (session_id, item_in_session)
+        cached = self._cache_get(QUERY_1, params)
+        if cached is not MISS:
+            return cached
+        version = self._cache_version()
+        
         try:
-            result = self.session.execute(
-                self.query_songs_by_session,
-                (session_id, item_in_session)
-            ).one()
+            result = self._execute(QUERY_1, self.query_songs_by_session, params).one()
             
             if result:
-                data = {
-                    'artist': result.artist,
-                    'song_title': result.song_title,
-                    'song_length': float(result.song_length)
-                }
+                data = song_from_row(result)
                 logger.info(f"✓ Found: {data['artist']} - {data['song_title']}")
-                return data
             else:
                 logger.warning("✗ No results found")
-                return {}
+                data = {}
+            
+            self._cache_put(QUERY_1, params, data, version)
+            return data
         
         except Exception as e:
             logger.error(f"✗ Query failed: {e}")
@@ -83,27 +281,23 @@ class QueryExecutor:
         """
         logger.info(f"Query 2: user_id={user_id}, session_id={session_id}")
         
+        params = (user_id, session_id)
+        cached = self._cache_get(QUERY_2, params)
+        if cached is not MISS:
+            return cached
+        version = self._cache_version()
+        
         try:
-            results = self.session.execute(
-                self.query_songs_by_user_session,
-                (user_id, session_id)
-            )
+            results = self._execute(QUERY_2, self.query_songs_by_user_session, params)
             
-            data = []
-            for row in results:
-                data.append({
-                    'artist': row.artist,
-                    'song_title': row.song_title,
-                    'item_in_session': row.item_in_session,
-                    'user_first_name': row.user_first_name,
-                    'user_last_name': row.user_last_name
-                })
+            data = session_songs_from_rows(results)
             
             if data:
                 logger.info(f"✓ Found {len(data)} songs for user {data[0]['user_first_name']} {data[0]['user_last_name']}")
             else:
                 logger.warning("✗ No results found")
             
+            self._cache_put(QUERY_2, params, data, version)
             return data
         
         except Exception as e:
@@ -126,30 +320,245 @@ class QueryExecutor:
         """
         logger.info(f"Query 3: song_title='{song_title}'")
         
+        params = (song_title,)
+        cached = self._cache_get(QUERY_3, params)
+        if cached is not MISS:
+            return cached
+        version = self._cache_version()
+        
         try:
-            results = self.session.execute(
-                self.query_users_by_song,
-                (song_title,)
-            )
+            results = self._users_by_song(song_title)
             
-            data = []
-            for row in results:
-                data.append({
-                    'user_first_name': row.user_first_name,
-                    'user_last_name': row.user_last_name
-                })
+            data = users_from_rows(results)
             
             if data:
                 logger.info(f"✓ Found {len(data)} users who listened to '{song_title}'")
             else:
                 logger.warning(f"✗ No users found for song '{song_title}'")
             
+            self._cache_put(QUERY_3, params, data, version)
             return data
         
         except Exception as e:
             logger.error(f"✗ Query failed: {e}")
             return []
     
+    def query_3_users_by_song_page(self, song_title: str, fetch_size: Optional[int] = None,
+                                   paging_state: Optional[str] = None) -> Page:
+        """
+        Query 3, one page at a time, for songs whose partition is too large to read at once.
+        
+        With buckets, pages walk the buckets in turn, so users are ordered by
+        user_id within each bucket only.
+        
+        Args:
+            song_title: Title of the song
+            fetch_size: Rows per page (defaults to Config.QUERY_FETCH_SIZE)
+            paging_state: Token from the previous Page, or None for the first page
+        
+        Returns:
+            Page with up to `fetch_size` users and the token for the next page;
+            an empty last page if the query fails
+        """
+        bucket, driver_state = decode_page_token(paging_state)
+        if not 0 <= bucket < self.song_buckets:
+            raise ValueError(f"Paging state {paging_state!r} is for bucket {bucket}, "
+                             f"but users_by_song has {self.song_buckets}")
+        
+        params = (song_title,) if self.song_buckets == 1 else (song_title, bucket)
+        bound = self.query_users_by_song.bind(params)
+        bound.fetch_size = fetch_size or Config.QUERY_FETCH_SIZE
+        
+        try:
+            results = self._execute(QUERY_3, bound, None, paging_state=driver_state)
+        except Exception as e:
+            logger.error(f"✗ Query failed: {e}")
+            return Page([])
+        
+        next_state = None
+        if results.paging_state:
+            next_state = encode_page_token(bucket, results.paging_state)
+        elif bucket + 1 < self.song_buckets:
+            next_state = encode_page_token(bucket + 1, None)
+        
+        page = Page(users_from_rows(results.current_rows), next_state)
+        logger.info(f"Query 3 page: {len(page.rows)} users for '{song_title}', more={page.has_more}")
+        return page
+    
+    def _iter_pages(self, results) -> Iterator[Any]:
+        """Rows of a ResultSet, timing every page fetched after the first."""
+        while True:
+            yield from results.current_rows
+            if not results.has_more_pages:
+                return
+            done = time_request(self.metrics, 'query', query=QUERY_3)
+            try:
+                results.fetch_next_page()
+            except Exception as e:
+                done(e)
+                raise
+            done()
+    
+    def iter_users_by_song(self, song_title: str, fetch_size: Optional[int] = None) -> Iterator[Dict[str, str]]:
+        """
+        Stream every user who listened to a song, fetching `fetch_size` rows at a time.
+        
+        Only one page is held in memory; the next page is requested as the
+        iterator reaches the end of the current one. With buckets, the first
+        page of every bucket is fetched concurrently, one page per bucket is
+        held and the buckets are merged in user_id order. If a page fails,
+        the error is logged and the stream ends.
+        """
+        keys = [(song_title,)] if self.song_buckets == 1 else [
+            (song_title, bucket) for bucket in range(self.song_buckets)
+        ]
+        statements = []
+        for params in keys:
+            bound = self.query_users_by_song.bind(params)
+            bound.fetch_size = fetch_size or Config.QUERY_FETCH_SIZE
+            statements.append((bound, None))
+        
+        done = time_request(self.metrics, 'query', query=QUERY_3)
+        try:
+            outcomes = execute_concurrent(
+                self.session,
+                statements,
+                concurrency=len(statements),
+                execution_profile=self.execution_profile
+            )
+        except Exception as e:
+            done(e)
+            logger.error(f"✗ Query failed: {e}")
+            return
+        done()
+        
+        pages = [self._iter_pages(results) for _, results in outcomes]
+        try:
+            rows = pages[0] if len(pages) == 1 else iter_merged_buckets(pages)
+            for row in rows:
+                yield user_from_row(row)
+        except Exception as e:
+            logger.error(f"✗ Query failed: {e}")
+    
+    def _run_many(self, query_id: str, statement, keys: List[tuple], convert: Callable,
+                  empty: Any, concurrency: Optional[int], buckets: int = 1) -> List[BulkResult]:
+        """
+        Execute one prepared statement for many keys with a bounded number in flight.
+        
+        Cached keys are answered locally and duplicate keys are queried once.
+        With `buckets` > 1 each key is queried once per bucket and the rows
+        merged. Results come back in the order of `keys`.
+        """
+        results = {}
+        misses = []
+        for params in keys:
+            if params in results:
+                continue
+            cached = self._cache_get(query_id, params)
+            if cached is MISS:
+                results[params] = None
+                misses.append(params)
+            else:
+                results[params] = BulkResult(params, cached)
+        
+        if misses:
+            version = self._cache_version()
+            done = time_request(self.metrics, 'query_bulk', query=query_id)
+            outcomes = execute_concurrent_with_args(
+                self.session,
+                statement,
+                [params + (bucket,) for params in misses for bucket in range(buckets)]
+                if buckets > 1 else misses,
+                concurrency=concurrency or Config.CONCURRENT_REQUESTS,
+                raise_on_first_error=False,
+                execution_profile=self.execution_profile
+            )
+            done()
+            if buckets > 1:
+                outcomes = [
+                    merge_bucket_outcomes(outcomes[i:i + buckets])
+                    for i in range(0, len(outcomes), buckets)
+                ]
+            for params, (success, result) in zip(misses, outcomes):
+                if success:
+                    data = convert(result)
+                    self._cache_put(query_id, params, data, version)
+                    results[params] = BulkResult(params, data)
+                else:
+                    results[params] = BulkResult(params, empty, error=str(result))
+        
+        errors = sum(1 for result in results.values() if result.error)
+        logger.info(f"{query_id} bulk: {len(keys)} keys, {len(misses)} queried, {errors} failed")
+        
+        return [results[params] for params in keys]
+    
+    def query_1_many(self, pairs: Iterable[Tuple[int, int]],
+                     concurrency: Optional[int] = None) -> List[BulkResult]:
+        """
+        Query 1 for many (session_id, item_in_session) pairs concurrently.
+        
+        Returns:
+            One BulkResult per pair, in input order; `data` as in query_1_session_item_lookup
+        """
+        keys = [(int(session_id), int(item)) for session_id, item in pairs]
+        return self._run_many(QUERY_1, self.query_songs_by_session, keys,
+                              first_song_from_rows, {}, concurrency)
+    
+    def query_2_many(self, pairs: Iterable[Tuple[int, int]],
+                     concurrency: Optional[int] = None) -> List[BulkResult]:
+        """
+        Query 2 for many (user_id, session_id) pairs concurrently.
+        
+        Returns:
+            One BulkResult per pair, in input order; `data` as in query_2_user_session_history
+        """
+        keys = [(int(user_id), int(session_id)) for user_id, session_id in pairs]
+        return self._run_many(QUERY_2, self.query_songs_by_user_session, keys,
+                              session_songs_from_rows, [], concurrency)
+    
+    def query_3_many(self, song_titles: Iterable[str],
+                     concurrency: Optional[int] = None) -> List[BulkResult]:
+        """
+        Query 3 for many song titles concurrently.
+        
+        Returns:
+            One BulkResult per title, in input order; `data` as in query_3_users_by_song
+        """
+        keys = [(song_title,) for song_title in song_titles]
+        return self._run_many(QUERY_3, self.query_users_by_song, keys,
+                              users_from_rows, [], concurrency, buckets=self.song_buckets)
+    
+    def _aggregate(self, query_id: str, cql: str, params: tuple):
+        if cql not in self._aggregate_statements:
+            self._aggregate_statements[cql] = self.session.prepare(cql)
+        return self._execute(query_id, self._aggregate_statements[cql], params)
+    
+    def top_songs(self, n: int = 10) -> List[Dict[str, Any]]:
+        """
+        The most played songs, from the chart the ETL rebuilds after each load.
+        
+        Args:
+            n: Number of songs, at most Config.TOP_SONGS_SIZE
+        
+        Returns:
+            List of dictionaries with rank, artist, song_title, plays
+        """
+        rows = self._aggregate(TOP_SONGS, QUERY_TOP_SONGS_CQL, (Config.TOP_SONGS_CHART,))
+        return [
+            {'rank': row.rank, 'artist': row.artist, 'song_title': row.song_title, 'plays': row.plays}
+            for row in rows
+        ][:n]
+    
+    def artist_play_count(self, artist: str) -> int:
+        """Plays of every song by `artist`; 0 if none were counted."""
+        row = self._aggregate(ARTIST_PLAYS, QUERY_ARTIST_PLAYS_CQL, (artist,)).one()
+        return row.plays if row else 0
+    
+    def song_play_count(self, artist: str, song_title: str) -> int:
+        """Plays of one song; 0 if none were counted."""
+        row = self._aggregate(SONG_PLAYS, QUERY_SONG_PLAYS_CQL, (artist, song_title)).one()
+        return row.plays if row else 0
+    
     def run_all_queries(self):
         """
         Run all three business queries with expected test values.
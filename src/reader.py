@@ -0,0 +1,308 @@
+"""
+Event log readers for the ETL pipeline.
+Streams typed events from CSV files, optionally restricted to a byte range.
+Parquet and Arrow files are read by the columnar readers in columnar.py.
+"""
+import csv
+import glob
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from .models import EVENT_CSV_COLUMNS, Event
+
+logger = logging.getLogger(__name__)
+
+S = TypeVar('S')
+T = TypeVar('T')
+
+EVENT_FIELDS = tuple(field.name for field in fields(Event))
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+EVENT_FILE_SUFFIXES = ('.csv',) + PARQUET_SUFFIXES + ARROW_SUFFIXES
+
+
+def is_columnar_file(path: Path) -> bool:
+    return Path(path).suffix.lower() in PARQUET_SUFFIXES + ARROW_SUFFIXES
+
+
+def parse_event(row: List[str], columns: Tuple[int, ...]) -> Event:
+    """
+    Build an Event from a raw CSV row, converting only the columns the tables use.
+
+    Args:
+        row: Values from csv.reader
+        columns: Position in `row` of each name in EVENT_CSV_COLUMNS
+    """
+    session_id, item_in_session, user_id, artist, song, length, first_name, last_name = (
+        row[i] for i in columns
+    )
+    return Event(
+        int(session_id),
+        int(item_in_session),
+        int(user_id),
+        artist,
+        song,
+        float(length),
+        first_name,
+        last_name
+    )
+
+
+def read_header(path: Path) -> List[str]:
+    with open(path, 'r', encoding='utf8', newline='') as f:
+        return next(csv.reader(f))
+
+
+def header_length(path: Path) -> int:
+    """Size in bytes of the header line, i.e. the offset of the first data row."""
+    with open(path, 'rb') as f:
+        return len(f.readline())
+
+
+def shard_file(path: Path, shards: int) -> List[Tuple[int, int]]:
+    """
+    Split a CSV file into byte ranges that start and end on line boundaries.
+
+    Args:
+        path: CSV file with a header line
+        shards: Number of ranges wanted
+
+    Returns:
+        List of (start, end) offsets covering every data row exactly once.
+        Fewer ranges are returned when the file has too few lines.
+    """
+    size = os.path.getsize(path)
+    first_row = header_length(path)
+    step = max(1, (size - first_row) // max(1, shards))
+
+    boundaries = [first_row]
+    with open(path, 'rb') as f:
+        for i in range(1, shards):
+            f.seek(first_row + i * step - 1)
+            f.readline()
+            position = f.tell()
+            if boundaries[-1] < position < size:
+                boundaries.append(position)
+    boundaries.append(size)
+
+    return [
+        (start, end)
+        for start, end in zip(boundaries, boundaries[1:])
+        if start < end
+    ]
+
+
+def complete_lines_end(path: Path, start: int = 0, block_size: int = 64 * 1024) -> int:
+    """
+    Offset just past the last newline at or after `start`, or `start` if none.
+
+    A file still being appended to may end in a partly written row; reading
+    only up to this offset leaves that row for the next read.
+    """
+    with open(path, 'rb') as f:
+        end = f.seek(0, os.SEEK_END)
+        while end > start:
+            block_start = max(start, end - block_size)
+            f.seek(block_start)
+            newline = f.read(end - block_start).rfind(b'\n')
+            if newline >= 0:
+                return block_start + newline + 1
+            end = block_start
+    return start
+
+
+def resolve_event_files(source: Union[str, Path]) -> List[Path]:
+    """
+    Expand an event log source into the event files it names.
+
+    Args:
+        source: A CSV, Parquet or Arrow file, a directory of them or a glob pattern
+
+    Returns:
+        Sorted list of files
+
+    Raises:
+        FileNotFoundError: If the source matches no files
+    """
+    source = str(source)
+
+    if os.path.isdir(source):
+        files = sorted(path for path in Path(source).iterdir()
+                       if path.is_file() and path.suffix.lower() in EVENT_FILE_SUFFIXES)
+    elif glob.has_magic(source):
+        files = sorted(Path(p) for p in glob.glob(source, recursive=True) if os.path.isfile(p))
+    else:
+        files = [Path(source)] if os.path.isfile(source) else []
+
+    if not files:
+        raise FileNotFoundError(f"No event files found for {source}")
+    return files
+
+
+def plan_shards(files: List[Path], workers: int) -> List[Tuple[Path, int, Optional[int]]]:
+    """
+    Decide which (path, start, end) ranges each worker process loads.
+
+    A single CSV file is split into line-aligned byte ranges; several files,
+    and Parquet or Arrow files, are handed out whole.
+    """
+    if len(files) == 1 and not is_columnar_file(files[0]):
+        return [(files[0], start, end) for start, end in shard_file(files[0], workers)]
+    return [(path, 0, None) for path in files]
+
+
+def read_parallel(items: List[S], read_item: Callable[[S], Iterator[T]],
+                  readers: int) -> Iterator[T]:
+    """
+    Read several sources, such as files or token ranges, on a bounded pool of
+    threads and yield what they produce as it arrives.
+
+    Results of one item keep their order; items are interleaved. At most
+    2 * `readers` results are buffered, so slow consumers apply backpressure to
+    the readers. The first reader error is re-raised in the consumer.
+
+    Args:
+        items: Sources to read
+        read_item: Callable producing the results of one item
+        readers: Maximum number of items read at the same time
+    """
+    results = queue.Queue(maxsize=readers * 2)
+    stop = threading.Event()
+    finished = object()
+
+    def put(result):
+        while not stop.is_set():
+            try:
+                results.put(result, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def read(item):
+        if stop.is_set():
+            return
+        try:
+            for result in read_item(item):
+                if stop.is_set():
+                    return
+                put(result)
+        except Exception as e:
+            put(e)
+        finally:
+            put(finished)
+
+    with ThreadPoolExecutor(max_workers=readers, thread_name_prefix='reader') as pool:
+        for item in items:
+            pool.submit(read, item)
+
+        try:
+            remaining = len(items)
+            while remaining:
+                result = results.get()
+                if result is finished:
+                    remaining -= 1
+                elif isinstance(result, Exception):
+                    raise result
+                else:
+                    yield result
+        finally:
+            stop.set()
+
+
+class EventColumns:
+    """
+    A batch of events held as one list per Event field.
+
+    Iterating builds Event objects lazily; `rows` zips selected fields into
+    value tuples without creating them.
+    """
+
+    def __init__(self, columns: Dict[str, list]):
+        self.columns = columns
+
+    @classmethod
+    def empty(cls) -> 'EventColumns':
+        return cls({name: [] for name in EVENT_FIELDS})
+
+    def __len__(self) -> int:
+        return len(self.columns[EVENT_FIELDS[0]])
+
+    def __iter__(self) -> Iterator[Event]:
+        return map(Event, *(self.columns[name] for name in EVENT_FIELDS))
+
+    def rows(self, names: Tuple[str, ...]) -> List[tuple]:
+        return list(zip(*(self.columns[name] for name in names)))
+
+
+@dataclass
+class EventChunk:
+    """
+    Consecutive events of one file.
+
+    `offset` is the byte position just past the last event, and `completed`
+    marks the final (possibly empty) chunk of the file or range. Columnar
+    readers hand out EventColumns instead of a list of events.
+    """
+    path: Path
+    offset: int
+    events: Union[List[Event], EventColumns]
+    completed: bool = False
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self.events)
+
+
+class CSVEventReader:
+    """
+    Iterates over the events of one CSV file between two byte offsets.
+
+    `offset` always points just past the last row handed out, so callers can
+    record how far they got. Rows with quoted line breaks are not expected in
+    the event logs; a range boundary is always placed on a physical newline.
+    """
+
+    def __init__(self, path: Path, start: int = 0, end: Optional[int] = None):
+        self.path = Path(path)
+        self.start = start
+        self.end = end
+        self.offset = start
+        self.rows_invalid = 0
+
+    def _iter_lines(self) -> Iterator[str]:
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+            self.offset = max(self.start, len(header))
+            f.seek(self.offset)
+
+            for line in f:
+                if self.end is not None and self.offset >= self.end:
+                    break
+                self.offset += len(line)
+                yield line.decode('utf8')
+
+    def __iter__(self) -> Iterator[Event]:
+        header = read_header(self.path)
+        columns = tuple(header.index(name) for name in EVENT_CSV_COLUMNS)
+        artist_column = header.index('artist')
+        reader = csv.reader(self._iter_lines())
+
+        for row in reader:
+            if not row or not row[artist_column]:
+                continue
+            try:
+                event = parse_event(row, columns)
+            except (ValueError, IndexError) as e:
+                logger.warning(f"Skipping malformed row {reader.line_num} in {self.path.name}: {e}")
+                self.rows_invalid += 1
+                continue
+            yield event
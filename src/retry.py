@@ -0,0 +1,110 @@
+"""
+Retries for failed ETL writes.
+Every insert is an idempotent upsert, so a write that failed transiently can
+be sent again; retries are spaced by exponential backoff with full jitter.
+"""
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from cassandra import OperationTimedOut, Unavailable, WriteTimeout
+from cassandra.cluster import NoHostAvailable
+from cassandra.connection import ConnectionException
+from cassandra.protocol import IsBootstrappingErrorMessage, OverloadedErrorMessage
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Errors after which the same write may succeed; anything else is permanent
+TRANSIENT_ERRORS = (
+    OperationTimedOut,
+    WriteTimeout,
+    Unavailable,
+    OverloadedErrorMessage,
+    IsBootstrappingErrorMessage,
+    NoHostAvailable,
+    ConnectionException,
+)
+
+
+class BackoffRetry:
+    """Decides whether a failed write is retried, and after how long."""
+
+    def __init__(self, max_retries: Optional[int] = None, base_delay: Optional[float] = None,
+                 max_delay: Optional[float] = None, rng: Optional[random.Random] = None):
+        """
+        Args:
+            max_retries: Retries after the first attempt; 0 disables retrying
+            base_delay: Seconds of the first backoff window
+            max_delay: Upper bound of the backoff window in seconds
+            rng: Random source for the jitter
+        """
+        self.max_retries = Config.WRITE_RETRIES if max_retries is None else max_retries
+        self.base_delay = base_delay if base_delay is not None else Config.RETRY_BASE_DELAY
+        self.max_delay = max_delay if max_delay is not None else Config.RETRY_MAX_DELAY
+        self.rng = rng or random.Random()
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """True if a write that failed on attempt number `attempt` (from 1) is tried again."""
+        return attempt <= self.max_retries and isinstance(error, TRANSIENT_ERRORS)
+
+    def delay(self, attempt: int) -> float:
+        """Full jitter: uniform between 0 and base_delay * 2 ** (attempt - 1), capped."""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class RetryScheduler:
+    """
+    Runs callbacks after a delay on one background thread.
+
+    Keeps backoff sleeps off the driver's I/O thread without starting a
+    timer thread per retry. The thread starts with the first callback and
+    exits once `stop` is called and nothing is left to run.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def call_later(self, delay: float, fn: Callable, *args):
+        with self._condition:
+            heapq.heappush(self._queue, (self.clock() + delay, next(self._counter), fn, args))
+            self._stopping = False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-retries', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def stop(self):
+        """Let the thread finish the queued callbacks and exit; a later call_later starts a new one."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue or self._queue[0][0] > self.clock():
+                    if not self._queue and self._stopping:
+                        self._thread = None
+                        return
+                    timeout = self._queue[0][0] - self.clock() if self._queue else None
+                    self._condition.wait(timeout)
+                _, _, fn, args = heapq.heappop(self._queue)
+
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.error(f"Retry callback failed: {e}", exc_info=True)
@@ -0,0 +1,212 @@
+"""
+Full-table scans split over the token ring.
+The ring is cut into token ranges from the cluster metadata; ranges are read
+concurrently, each on a replica that owns it, and the rows are streamed to a
+callback, a CSV file or a Parquet file.
+"""
+import csv
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from cassandra.cluster import Session
+from cassandra.metadata import MAX_LONG, MIN_LONG, Murmur3Token
+
+from .config import Config
+from .connection import resolve_profile
+from .reader import PARQUET_SUFFIXES, read_parallel
+
+logger = logging.getLogger(__name__)
+
+MURMUR3_PARTITIONER = 'org.apache.cassandra.dht.Murmur3Partitioner'
+
+# Parquet column types per CQL type; anything else is exported as text
+ARROW_TYPES = {
+    'int': 'int32',
+    'bigint': 'int64',
+    'counter': 'int64',
+    'double': 'float64',
+    'decimal': 'float64',
+    'float': 'float32',
+    'boolean': 'bool_',
+}
+
+
+@dataclass(frozen=True)
+class TokenRange:
+    """Tokens in (start, end], read on `replica` when one is known."""
+    start: int
+    end: int
+    replica: Any = None
+
+
+def split_token_ring(ring: Sequence[int], splits: int = 1) -> List[Tuple[int, int]]:
+    """
+    Cut the Murmur3 token space at the ring's tokens.
+
+    A node owns the tokens after the previous ring token up to and including
+    its own; the range wrapping past the end of the ring is cut at the end of
+    the token space. Each range is divided again into `splits` equal parts.
+
+    Returns:
+        (start, end] bounds covering every token exactly once, in token order
+    """
+    edges = sorted({MIN_LONG, MAX_LONG, *ring})
+    ranges = []
+    for start, end in zip(edges, edges[1:]):
+        bounds = sorted({start + (end - start) * i // splits for i in range(splits + 1)})
+        ranges.extend(zip(bounds, bounds[1:]))
+    return ranges
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Writing Parquet files requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+class TokenRangeScanner:
+    """
+    Reads a whole table as concurrent token-range queries.
+
+    Unlike a single `SELECT COUNT(*)` or unrestricted `SELECT`, no query
+    covers more than one range, and the ranges are spread over the replicas
+    that own them, so scans grow with the cluster instead of one coordinator.
+    """
+
+    def __init__(self, session: Session, table: str, keyspace: Optional[str] = None,
+                 concurrency: Optional[int] = None, splits: Optional[int] = None,
+                 fetch_size: Optional[int] = None):
+        """
+        Args:
+            session: Session of a connected cluster
+            table: Table to scan
+            keyspace: Keyspace of the table (defaults to the session's)
+            concurrency: Ranges read at the same time (defaults to Config.SCAN_CONCURRENCY)
+            splits: Parts each node's range is cut into (defaults to Config.SCAN_SPLITS)
+            fetch_size: Rows per page (defaults to Config.QUERY_FETCH_SIZE)
+        """
+        self.session = session
+        self.keyspace = keyspace or session.keyspace
+        self.concurrency = concurrency or Config.SCAN_CONCURRENCY
+        self.splits = splits or Config.SCAN_SPLITS
+        self.fetch_size = fetch_size or Config.QUERY_FETCH_SIZE
+        self.execution_profile = resolve_profile(session, Config.EXEC_PROFILE_READ)
+
+        keyspace_meta = session.cluster.metadata.keyspaces.get(self.keyspace)
+        table_meta = keyspace_meta.tables.get(table) if keyspace_meta else None
+        if table_meta is None:
+            raise ValueError(f"Unknown table {self.keyspace}.{table}")
+
+        self.table = table
+        self.columns = list(table_meta.columns)
+        self.column_types = {name: column.cql_type for name, column in table_meta.columns.items()}
+
+        partition_key = ', '.join(column.name for column in table_meta.partition_key)
+        where = f"WHERE token({partition_key}) > ? AND token({partition_key}) <= ?"
+        self.select = session.prepare(
+            f"SELECT {', '.join(self.columns)} FROM {self.keyspace}.{table} {where}"
+        )
+        self.select_count = session.prepare(f"SELECT COUNT(*) FROM {self.keyspace}.{table} {where}")
+
+    def ranges(self) -> List[TokenRange]:
+        """Token ranges of the ring, each with a live replica when the token map has one."""
+        metadata = self.session.cluster.metadata
+        if metadata.partitioner and metadata.partitioner != MURMUR3_PARTITIONER:
+            raise ValueError(f"Token-range scans need the Murmur3 partitioner, not {metadata.partitioner}")
+
+        token_map = metadata.token_map
+        ring = [token.value for token in token_map.ring] if token_map else []
+
+        ranges = []
+        for index, (start, end) in enumerate(split_token_ring(ring, self.splits)):
+            replicas = token_map.get_replicas(self.keyspace, Murmur3Token(end)) if token_map else []
+            live = [host for host in replicas if host.is_up]
+            # Rotate over the replicas so a replication factor above 1 spreads the load
+            ranges.append(TokenRange(start, end, live[index % len(live)] if live else None))
+        return ranges
+
+    def _execute(self, statement, token_range: TokenRange):
+        bound = statement.bind((token_range.start, token_range.end))
+        bound.fetch_size = self.fetch_size
+        return self.session.execute(bound, execution_profile=self.execution_profile,
+                                    host=token_range.replica)
+
+    def _read_range(self, token_range: TokenRange) -> Iterator[list]:
+        result = self._execute(self.select, token_range)
+        while True:
+            if result.current_rows:
+                yield list(result.current_rows)
+            if not result.has_more_pages:
+                return
+            result.fetch_next_page()
+
+    def _count_range(self, token_range: TokenRange) -> Iterator[int]:
+        yield self._execute(self.select_count, token_range).one()[0]
+
+    def pages(self) -> Iterator[list]:
+        """Yield the table's rows a page at a time; pages of different ranges interleave."""
+        ranges = self.ranges()
+        logger.info(f"Scanning {self.table} in {len(ranges)} token ranges, {self.concurrency} at a time")
+        return read_parallel(ranges, self._read_range, self.concurrency)
+
+    def rows(self) -> Iterator[Any]:
+        for page in self.pages():
+            yield from page
+
+    def count(self) -> int:
+        """Exact row count, summed from one COUNT(*) per token range."""
+        return sum(read_parallel(self.ranges(), self._count_range, self.concurrency))
+
+    def scan(self, callback: Callable[[list], None]) -> int:
+        """
+        Pass every page of rows to `callback`, from the calling thread.
+
+        Returns:
+            Number of rows scanned
+        """
+        rows = 0
+        for page in self.pages():
+            callback(page)
+            rows += len(page)
+        return rows
+
+    def to_csv(self, path: Union[str, Path]) -> int:
+        """Write the table to a CSV file with a header row; returns the row count."""
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            return self.scan(writer.writerows)
+
+    def to_parquet(self, path: Union[str, Path]) -> int:
+        """Write the table to a Parquet file, one row group per page; returns the row count."""
+        pa = _import_pyarrow()
+        types = {name: ARROW_TYPES.get(self.column_types[name], 'string') for name in self.columns}
+        schema = pa.schema([(name, getattr(pa, types[name])()) for name in self.columns])
+
+        def convert(name: str, values: tuple) -> list:
+            if types[name] == 'string':
+                return [None if value is None else str(value) for value in values]
+            if self.column_types[name] == 'decimal':
+                return [None if value is None else float(value) for value in values]
+            return list(values)
+
+        with pa.parquet.ParquetWriter(str(path), schema) as writer:
+            def write(page: list):
+                columns = zip(*page)
+                writer.write_table(pa.table(
+                    [pa.array(convert(name, values), type=schema.field(name).type)
+                     for name, values in zip(self.columns, columns)],
+                    schema=schema
+                ))
+            return self.scan(write)
+
+    def export(self, path: Union[str, Path]) -> int:
+        """Write the table to `path`, as Parquet for .parquet/.pq files and CSV otherwise."""
+        if Path(path).suffix.lower() in PARQUET_SUFFIXES:
+            return self.to_parquet(path)
+        return self.to_csv(path)
@@ -0,0 +1,105 @@
+"""
+Approximate table statistics without scanning the table.
+Every node keeps partition count and size estimates for its own token ranges
+in system.size_estimates; reading them from each live node is a handful of
+small queries however large the table is.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+from cassandra.cluster import Session
+
+logger = logging.getLogger(__name__)
+
+RING_SIZE = 2 ** 64
+
+QUERY_SIZE_ESTIMATES = """
+SELECT range_start, range_end, mean_partition_size, partitions_count
+FROM system.size_estimates
+WHERE keyspace_name = %s AND table_name = %s
+"""
+
+
+@dataclass(frozen=True)
+class TableStats:
+    """
+    Estimated size of one table.
+
+    `ring_coverage` is the share of the token ring the estimates came from;
+    below 1 (a node down), the partition count is extrapolated from it.
+    `rows` is an exact count, only filled in when asked for.
+    """
+    keyspace: str
+    table: str
+    estimated_partitions: int
+    mean_partition_size: int
+    ring_coverage: float
+    hosts: int
+    token_ranges: int
+    rows: Optional[int] = None
+
+    @property
+    def estimated_bytes(self) -> int:
+        return self.estimated_partitions * self.mean_partition_size
+
+
+def merge_size_estimates(rows: Iterable) -> Tuple[int, int, float]:
+    """
+    Combine size_estimates rows from several nodes into table-wide figures.
+
+    Returns:
+        (estimated partitions, mean partition size in bytes, ring coverage)
+    """
+    partitions = 0
+    total_size = 0
+    covered = 0
+    for row in rows:
+        width = (int(row.range_end) - int(row.range_start)) % RING_SIZE
+        # A range starting and ending on the same token wraps the whole ring
+        covered += width or RING_SIZE
+        partitions += row.partitions_count
+        total_size += row.partitions_count * row.mean_partition_size
+
+    coverage = min(covered / RING_SIZE, 1.0)
+    estimated = round(partitions / coverage) if coverage else 0
+    mean_size = total_size // partitions if partitions else 0
+    return estimated, mean_size, coverage
+
+
+def estimate_table_stats(session: Session, table: str, keyspace: Optional[str] = None) -> TableStats:
+    """
+    Estimate a table's partition count and mean partition size.
+
+    Estimates are refreshed by each node every few minutes, so a table
+    loaded moments ago may still report nothing.
+
+    Args:
+        session: Session of a connected cluster
+        table: Table name
+        keyspace: Keyspace of the table (defaults to the session's)
+    """
+    keyspace = keyspace or session.keyspace
+    metadata = session.cluster.metadata
+    keyspace_meta = metadata.keyspaces.get(keyspace)
+    if keyspace_meta is None or table not in keyspace_meta.tables:
+        raise ValueError(f"Unknown table {keyspace}.{table}")
+
+    hosts = [host for host in metadata.all_hosts() if host.is_up]
+    futures = [
+        session.execute_async(QUERY_SIZE_ESTIMATES, (keyspace, table), host=host)
+        for host in hosts
+    ]
+    rows = [row for future in futures for row in future.result()]
+
+    partitions, mean_size, coverage = merge_size_estimates(rows)
+    token_map = metadata.token_map
+    return TableStats(
+        keyspace=keyspace,
+        table=table,
+        estimated_partitions=partitions,
+        mean_partition_size=mean_size,
+        ring_coverage=coverage,
+        hosts=len(hosts),
+        token_ranges=len(token_map.ring) if token_map else 0,
+    )
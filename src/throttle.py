@@ -0,0 +1,150 @@
+"""
+Backpressure for the ETL write stage.
+Adapts the number of in-flight writes to observed latency and overload
+errors (AIMD), and optionally caps the write rate in rows per second; an
+adaptive limit moves the cap along with it.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from cassandra import OperationTimedOut, Unavailable, WriteTimeout
+from cassandra.protocol import IsBootstrappingErrorMessage, OverloadedErrorMessage
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the cluster is saturated rather than that the write is invalid
+OVERLOAD_ERRORS = (
+    OperationTimedOut,
+    WriteTimeout,
+    Unavailable,
+    OverloadedErrorMessage,
+    IsBootstrappingErrorMessage,
+)
+
+
+def is_overload(error: BaseException) -> bool:
+    return isinstance(error, OVERLOAD_ERRORS)
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase, multiplicative-decrease limit on in-flight writes.
+
+    Every write that completes within `target_latency` raises the limit by
+    1/limit, i.e. by about one per round trip. A slower write or an overload
+    error multiplies it by `backoff`. Only writes sent after the previous
+    decrease can trigger the next one, so a burst of timeouts from one
+    saturated window halves the limit once rather than collapsing it.
+
+    With a `rate_limiter`, its rate follows the same signal: it is
+    multiplied by `backoff` on each decrease and grows by the limit's
+    relative step on each fast write, up to the rate it was created with.
+    """
+
+    def __init__(self, initial: Optional[int] = None, min_limit: Optional[int] = None,
+                 max_limit: Optional[int] = None, target_latency: Optional[float] = None,
+                 backoff: float = 0.5, clock: Callable[[], float] = time.perf_counter,
+                 rate_limiter: Optional['RateLimiter'] = None):
+        """
+        Args:
+            initial: Starting limit (defaults to Config.CONCURRENT_REQUESTS)
+            min_limit: Floor of the limit
+            max_limit: Ceiling of the limit
+            target_latency: Seconds above which a write counts as congestion
+            backoff: Factor applied to the limit on congestion
+            clock: Time source; must match the start times passed to on_result
+            rate_limiter: Rows-per-second cap to back off and recover together with the limit
+        """
+        self.min_limit = max(1, min_limit or Config.MIN_CONCURRENT_REQUESTS)
+        self.max_limit = max(self.min_limit, max_limit or Config.MAX_CONCURRENT_REQUESTS)
+        self.target_latency = target_latency or Config.WRITE_LATENCY_TARGET
+        self.backoff = backoff
+        self.clock = clock
+        self.rate_limiter = rate_limiter
+
+        initial = initial or Config.CONCURRENT_REQUESTS
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self._last_decrease = float('-inf')
+        self._lock = threading.Lock()
+
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def on_result(self, start: float, latency: float, error: Optional[BaseException] = None):
+        """Adjust the limit for one completed write that was sent at `start`."""
+        congested = is_overload(error) if error is not None else latency > self.target_latency
+        if error is not None and not congested:
+            return
+
+        with self._lock:
+            if congested:
+                if start < self._last_decrease:
+                    return
+                self._limit = max(self.min_limit, self._limit * self.backoff)
+                self._last_decrease = self.clock()
+                self.decreases += 1
+                if self.rate_limiter is not None:
+                    self.rate_limiter.scale(self.backoff)
+                logger.debug(f"Write congestion ({error or f'{latency * 1000:.0f} ms'}), "
+                             f"concurrency limit lowered to {self.limit}")
+            else:
+                step = 1 / self._limit
+                # The rate keeps recovering once the limit is at its ceiling or floor
+                if self.rate_limiter is not None:
+                    self.rate_limiter.scale(1 + step / self._limit)
+                if self._limit < self.max_limit:
+                    self._limit = min(self.max_limit, self._limit + step)
+                    self.increases += 1
+
+
+class RateLimiter:
+    """
+    Token bucket capping throughput, in rows per second.
+
+    A request larger than the bucket, such as a big batch, is let through and
+    the debt is paid by the requests that follow. The rate can be scaled
+    while writes run, between `min_rate` (1% of `rate` by default) and `rate`.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, min_rate: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.rate = float(rate)
+        self.max_rate = self.rate
+        self.min_rate = min(self.rate, min_rate or self.rate / 100)
+        self.capacity = float(burst or rate)
+        self.clock = clock
+        self.sleep = sleep
+
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def scale(self, factor: float):
+        """Multiply the rate by `factor`, keeping it between `min_rate` and `max_rate`."""
+        with self._lock:
+            # Tokens earned so far are earned at the old rate
+            self._refill()
+            self.rate = min(self.max_rate, max(self.min_rate, self.rate * factor))
+
+    def acquire(self, amount: float = 1):
+        """Take `amount` tokens, sleeping until the bucket has refilled enough."""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+
+        if wait > 0:
+            self.sleep(wait)
@@ -0,0 +1,172 @@
+"""
+Concurrent write stage for the ETL pipeline.
+Sends statements asynchronously with a bounded number of requests in flight.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from cassandra.cluster import EXEC_PROFILE_DEFAULT, Session
+
+from .config import Config
+from .metrics import Metrics, time_request
+from .retry import BackoffRetry, RetryScheduler
+from .throttle import AdaptiveConcurrency, RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WriteRequest:
+    """One statement on its way to the cluster, kept for retries and failure reports."""
+    statement: Any
+    parameters: Any
+    table: str
+    rows: int
+    values: List[tuple]
+    idempotent: bool = True
+    attempt: int = 1
+
+
+class ConcurrentWriter:
+    """
+    Submits writes with execute_async, never exceeding the in-flight limit.
+
+    The limit is `concurrency`, or the current limit of `controller` when
+    one is given. `rate_limiter` additionally caps rows per second; the
+    controller scales it down and back up along with its limit. Writes
+    that fail transiently are resent per `retry`, keeping their in-flight
+    slot while they back off; `wait` also stops the retry thread.
+    """
+
+    def __init__(self, session: Session, concurrency: Optional[int] = None,
+                 on_result: Optional[Callable[[str, int, Optional[Exception], List[tuple]], None]] = None,
+                 execution_profile=EXEC_PROFILE_DEFAULT, metrics: Optional[Metrics] = None,
+                 controller: Optional[AdaptiveConcurrency] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 retry: Optional[BackoffRetry] = None,
+                 on_retry: Optional[Callable[[str, Exception], None]] = None):
+        self.session = session
+        self.execution_profile = execution_profile
+        self.concurrency = max(1, concurrency or Config.CONCURRENT_REQUESTS)
+        self.on_result = on_result
+        self.controller = controller
+        self.rate_limiter = rate_limiter
+        self.retry = retry
+        self.on_retry = on_retry
+
+        self.metrics = metrics
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._scheduler = RetryScheduler() if retry else None
+
+        if metrics is not None:
+            metrics.gauge('etl_in_flight_requests', 'Writes sent and not yet completed',
+                          function=lambda: self._in_flight)
+            metrics.gauge('etl_concurrency_limit', 'Current limit on in-flight writes',
+                          function=lambda: self.limit)
+            if rate_limiter is not None:
+                metrics.gauge('etl_rate_limit_rows_per_second', 'Current cap on rows written per second',
+                              function=lambda: self.rate_limiter.rate)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def limit(self) -> int:
+        return self.controller.limit if self.controller else self.concurrency
+
+    def submit(self, statement, parameters: Any, table: str, rows: int = 1,
+               values: Optional[List[tuple]] = None, idempotent: bool = True):
+        """
+        Send one statement, blocking while the in-flight limit is reached.
+
+        Args:
+            statement: Prepared, bound or batch statement
+            parameters: Values for a prepared statement, or None
+            table: Target table, reported back through `on_result`
+            rows: Number of rows the statement writes
+            values: The rows the statement writes, reported back through
+                `on_result`; defaults to `[parameters]`
+            idempotent: False for writes that must not be resent, such as
+                counter updates
+        """
+        if self.rate_limiter:
+            self.rate_limiter.acquire(rows)
+
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+        if values is None:
+            values = [parameters] if parameters is not None else []
+        self._send(WriteRequest(statement, parameters, table, rows, values, idempotent))
+
+    def wait(self):
+        """
+        Block until every submitted request has completed, retries included,
+        then stop the retry thread until the next retry.
+        """
+        with self._condition:
+            while self._in_flight:
+                self._condition.wait()
+        if self._scheduler:
+            self._scheduler.stop()
+
+    def _send(self, request: WriteRequest):
+        done = time_request(self.metrics, 'etl_write', table=request.table)
+        start = time.perf_counter()
+        try:
+            future = self.session.execute_async(
+                request.statement, request.parameters, execution_profile=self.execution_profile
+            )
+        except Exception as e:
+            self._finish(request, e, start, done)
+            return
+
+        future.add_callbacks(
+            self._on_success, self._on_error,
+            callback_args=(request, start, done), errback_args=(request, start, done)
+        )
+
+    def _resend(self, request: WriteRequest):
+        # Retried rows count against the rate cap like new ones
+        if self.rate_limiter:
+            self.rate_limiter.acquire(request.rows)
+        self._send(request)
+
+    def _on_success(self, _result, request: WriteRequest, start: float, done: Callable):
+        self._finish(request, None, start, done)
+
+    def _on_error(self, error: Exception, request: WriteRequest, start: float, done: Callable):
+        self._finish(request, error, start, done)
+
+    def _finish(self, request: WriteRequest, error: Optional[Exception], start: float, done: Callable):
+        retrying = False
+        try:
+            done(error)
+            if self.controller:
+                self.controller.on_result(start, time.perf_counter() - start, error)
+
+            if (error is not None and self.retry and request.idempotent
+                    and self.retry.should_retry(error, request.attempt)):
+                delay = self.retry.delay(request.attempt)
+                request.attempt += 1
+                if self.on_retry:
+                    self.on_retry(request.table, error)
+                if self.metrics is not None:
+                    self.metrics.counter('etl_write_retries_total', 'Writes resent after a transient error',
+                                         table=request.table).inc()
+                self._scheduler.call_later(delay, self._resend, request)
+                retrying = True
+            elif self.on_result:
+                self.on_result(request.table, request.rows, error, request.values)
+        finally:
+            if not retrying:
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
@@ -0,0 +1,60 @@
+"""Fakes shared by the test modules."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models import Event
+
+EVENT = Event(
+    session_id=338,
+    item_in_session=4,
+    user_id=50,
+    artist='Faithless',
+    song_title='Music Matters (Mark Knight Dub)',
+    song_length=495.3073,
+    user_first_name='Ava',
+    user_last_name='Robinson',
+)
+
+
+class FakeFuture:
+    def __init__(self, error=None):
+        self.error = error
+
+    def add_callbacks(self, callback, errback, callback_args=(), errback_args=()):
+        if self.error:
+            errback(self.error, *errback_args)
+        else:
+            callback([], *callback_args)
+
+
+class FakeSession:
+    def __init__(self, fail_on=None, error=None, failures=None):
+        self.fail_on = fail_on
+        self.error = error or RuntimeError('write timeout')
+        self.failures = failures
+        self.executed = []
+
+    def prepare(self, cql):
+        return cql
+
+    def execute(self, statement, parameters=None, **kwargs):
+        self.executed.append((statement, parameters))
+
+    def execute_async(self, statement, parameters=None, **kwargs):
+        self.executed.append((statement, parameters))
+        if self.fail_on and self.fail_on in str(statement):
+            if self.failures is None or self.failures > 0:
+                if self.failures:
+                    self.failures -= 1
+                return FakeFuture(self.error)
+        return FakeFuture()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,114 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cassandra import ReadTimeout
+
+from benchmarks.fake_session import FakeSession
+from src.async_queries import AsyncQueryExecutor, fetch_all
+from src.cache import MISS, QueryCache
+from src.metrics import Metrics
+from src.models import INSERT_USERS_BY_SONG_BUCKETED_CQL, INSERT_USERS_BY_SONG_CQL, song_bucket
+from src.queries import QUERY_3
+
+SONG = 'Intro'
+
+
+class FlakySession(FakeSession):
+    """FakeSession whose reads time out from the `fail_from`th page on (1-based)."""
+
+    def __init__(self, fail_from=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_from = fail_from
+        self.pages = 0
+
+    def _run(self, future, query, paging_state):
+        self.pages += 1
+        if self.fail_from is not None and self.pages >= self.fail_from:
+            future._complete(error=ReadTimeout(f"Timed out on page {self.pages}"))
+            return
+        super()._run(future, query, paging_state)
+
+
+@pytest.fixture
+def session():
+    session = FlakySession(latency=0.001, default_fetch_size=2)
+    insert = session.prepare(INSERT_USERS_BY_SONG_CQL)
+    insert_bucketed = session.prepare(INSERT_USERS_BY_SONG_BUCKETED_CQL)
+    for user_id in range(1, 8):
+        session.execute(insert, (SONG, user_id, f'First{user_id}', f'Last{user_id}'))
+        session.execute(insert_bucketed, (SONG, song_bucket(user_id, 3), user_id,
+                                          f'First{user_id}', f'Last{user_id}'))
+    session.pages = 0
+    yield session
+    session.shutdown()
+
+
+def select_users(session):
+    return session.execute_async(session.prepare('SELECT user_id FROM users_by_song WHERE song_title = ?'),
+                                 (SONG,))
+
+
+def test_fetch_all_accumulates_every_page(session):
+    async def main():
+        return await fetch_all(select_users(session))
+
+    rows = asyncio.run(main())
+
+    assert [row.user_id for row in rows] == list(range(1, 8))
+    assert session.pages == 4
+
+
+def test_fetch_all_rejects_on_an_error_after_the_first_page(session):
+    session.fail_from = 3
+
+    async def main():
+        return await fetch_all(select_users(session))
+
+    with pytest.raises(ReadTimeout, match='page 3'):
+        asyncio.run(main())
+
+
+def test_fetch_all_rejects_when_the_next_page_cannot_be_requested(session):
+    async def main():
+        response_future = select_users(session)
+        response_future.start_fetching_next_page = lambda: 1 / 0
+        return await fetch_all(response_future)
+
+    with pytest.raises(ZeroDivisionError):
+        asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+
+@pytest.mark.parametrize('buckets', [1, 3])
+def test_executor_reads_every_page_of_every_bucket(session, buckets):
+    async def main():
+        executor = await AsyncQueryExecutor.create(session, song_buckets=buckets)
+        return await executor.query_3_users_by_song(SONG)
+
+    users = asyncio.run(main())
+
+    assert [user['user_first_name'] for user in users] == [f'First{i}' for i in range(1, 8)]
+
+
+def test_executor_reports_failures_without_caching_them(session):
+    cache = QueryCache()
+    metrics = Metrics()
+    session.fail_from = 2
+
+    async def main():
+        executor = await AsyncQueryExecutor.create(session, cache=cache, metrics=metrics, song_buckets=1)
+        failed = await executor.query_3_users_by_song(SONG)
+        session.fail_from = None
+        return failed, await executor.query_3_users_by_song(SONG)
+
+    failed, recovered = asyncio.run(main())
+
+    assert failed == []
+    assert metrics.counter('query_errors_total', query=QUERY_3).value == 1
+    assert metrics.counter('query_timeouts_total', query=QUERY_3).value == 1
+    assert len(recovered) == 7
+    assert cache.get(QUERY_3, (SONG,)) is not MISS
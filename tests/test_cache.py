@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.cache import MISS, QueryCache
+from src.config import Config
+from src.queries import QUERY_1, QUERY_2, QUERY_3, cache_key_for_row
+from tests.fakes import FakeClock
+
+
+def test_lru_eviction_keeps_recently_used():
+    cache = QueryCache(max_size=2, ttl=60)
+    cache.put('query_1', (1, 1), 'a')
+    cache.put('query_1', (2, 2), 'b')
+    cache.get('query_1', (1, 1))
+    cache.put('query_1', (3, 3), 'c')
+
+    assert cache.get('query_1', (2, 2)) is MISS
+    assert cache.get('query_1', (1, 1)) == 'a'
+    assert cache.evictions == 1
+
+
+def test_per_query_ttl_expires_entries():
+    clock = FakeClock()
+    cache = QueryCache(max_size=10, ttl=60, query_ttls={QUERY_3: 5}, clock=clock)
+    cache.put(QUERY_3, ('Song',), [])
+    cache.put('query_1', (1, 1), {})
+
+    clock.now = 10
+    assert cache.get(QUERY_3, ('Song',)) is MISS
+    assert cache.get('query_1', (1, 1)) == {}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidate_keys_of_written_rows():
+    cache = QueryCache(max_size=10, ttl=60)
+    cache.put(QUERY_1, (338, 4), 'stale')
+    cache.put(QUERY_2, (10, 338), 'stale')
+    cache.put(QUERY_3, ('Song',), 'stale')
+    rows = {
+        Config.TABLE_SONGS_BY_SESSION: (338, 4, 'Artist', 'Song', 200.0),
+        Config.TABLE_USERS_BY_SONG: ('Song', 10, 'Ava', 'Robinson'),
+        Config.TABLE_USERS_BY_SONG_BUCKETED: ('Song', 2, 10, 'Ava', 'Robinson'),
+        Config.TABLE_SONG_PLAYS: (1, 'Artist', 'Song'),
+    }
+    keys = {table: cache_key_for_row(table, row) for table, row in rows.items()}
+
+    assert keys[Config.TABLE_USERS_BY_SONG] == keys[Config.TABLE_USERS_BY_SONG_BUCKETED] == (QUERY_3, ('Song',))
+    assert keys[Config.TABLE_SONG_PLAYS] is None
+    assert cache.invalidate(*keys[Config.TABLE_SONGS_BY_SESSION])
+    assert cache.invalidate(*keys[Config.TABLE_USERS_BY_SONG])
+    assert not cache.invalidate(*keys[Config.TABLE_USERS_BY_SONG_BUCKETED])
+    assert len(cache) == 1
+
+
+def test_cached_results_are_read_only():
+    cache = QueryCache(max_size=10, ttl=60)
+    rows = [{'user_first_name': 'Ava'}]
+    cache.put(QUERY_3, ('Song',), rows)
+    rows.append({'user_first_name': 'Ben'})
+    rows[0]['user_first_name'] = 'Changed'
+
+    cached = cache.get(QUERY_3, ('Song',))
+    assert cached == ({'user_first_name': 'Ava'},)
+    # Hits share one stored result instead of copying it
+    assert cache.get(QUERY_3, ('Song',)) is cached
+    with pytest.raises(TypeError):
+        cached[0]['user_first_name'] = 'Changed'
+
+
+def test_reads_started_before_an_invalidation_are_not_cached():
+    cache = QueryCache(max_size=2, ttl=60)
+    version = cache.version()
+    cache.invalidate(QUERY_3, ('Song',))
+
+    cache.put(QUERY_3, ('Song',), 'stale', version)
+    cache.put(QUERY_3, ('Other',), 'fresh', version)
+    assert cache.get(QUERY_3, ('Song',)) is MISS
+    assert cache.get(QUERY_3, ('Other',)) == 'fresh'
+    cache.put(QUERY_3, ('Song',), 'fresh', cache.version())
+    assert cache.get(QUERY_3, ('Song',)) == 'fresh'
+
+    # Once the invalidation is forgotten, reads older than it are dropped for every key
+    cache.invalidate(QUERY_1, (1, 1))
+    cache.invalidate(QUERY_1, (2, 2))
+    cache.put(QUERY_2, (1, 1), 'maybe stale', version)
+    assert cache.get(QUERY_2, (1, 1)) is MISS
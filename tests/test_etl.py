@@ -0,0 +1,425 @@
+import sys
+import threading
+from dataclasses import astuple, replace
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cassandra import OperationTimedOut
+
+from src.cache import MISS, QueryCache
+from src.checkpoint import INCREMENTAL, RESUME, Checkpoint
+from src.config import Config
+from src.deadletter import DeadLetterLog, read_dead_letters
+from src.etl import MusicStreamingETL, group_by_partition, merge_stats, print_summary, users_by_song_values
+from src.models import EVENT_CSV_COLUMNS, Event
+from src.queries import QUERY_1, QUERY_3
+from src.reader import CSVEventReader, parse_event, shard_file
+from src.retry import BackoffRetry
+from tests.fakes import EVENT, FakeSession
+
+
+class PendingFuture:
+    def add_callbacks(self, callback, errback, callback_args=(), errback_args=()):
+        self.complete = lambda: callback([], *callback_args)
+
+
+class PendingSession(FakeSession):
+    """Leaves every write in flight until complete_all is called."""
+
+    def __init__(self):
+        super().__init__()
+        self.pending = []
+
+    def execute_async(self, statement, parameters=None, **kwargs):
+        self.executed.append((statement, parameters))
+        future = PendingFuture()
+        self.pending.append(future)
+        return future
+
+    def complete_all(self):
+        for future in self.pending:
+            future.complete()
+        self.pending = []
+
+
+def test_cache_is_invalidated_only_once_writes_are_acknowledged():
+    cache = QueryCache(max_size=10, ttl=60)
+    session = PendingSession()
+    etl = MusicStreamingETL(session, concurrency=4, batch_size=1, cache=cache)
+    writer = etl.new_writer()
+    etl.load_chunk([EVENT], writer)
+
+    # A reader missing the cache while the write is in flight caches the old rows again
+    cache.put(QUERY_3, (EVENT.song_title,), [])
+    cache.put(QUERY_1, (EVENT.session_id, EVENT.item_in_session), {})
+    assert cache.get(QUERY_3, (EVENT.song_title,)) == ()
+    # A read sent before the write is acknowledged but answered after it
+    version = cache.version()
+
+    session.complete_all()
+    writer.wait()
+
+    assert cache.get(QUERY_3, (EVENT.song_title,)) is MISS
+    assert cache.get(QUERY_1, (EVENT.session_id, EVENT.item_in_session)) is MISS
+    cache.put(QUERY_3, (EVENT.song_title,), [], version)
+    assert cache.get(QUERY_3, (EVENT.song_title,)) is MISS
+
+
+def test_concurrent_load_counts_per_table():
+    session = FakeSession()
+    etl = MusicStreamingETL(session, concurrency=4)
+    etl.load_events_concurrently([EVENT] * 10)
+
+    assert len(session.executed) == 30
+    assert etl.stats['rows_inserted_table1'] == 10
+    assert etl.stats['rows_inserted_table2'] == 10
+    assert etl.stats['rows_inserted_table3'] == 10
+    assert etl.stats['errors'] == 0
+
+
+def test_concurrent_load_records_errors_per_table():
+    session = FakeSession(fail_on=Config.TABLE_USERS_BY_SONG)
+    etl = MusicStreamingETL(session, concurrency=4)
+    etl.load_events_concurrently([EVENT] * 5)
+
+    assert etl.stats['rows_inserted_table1'] == 5
+    assert etl.stats['rows_inserted_table3'] == 0
+    assert etl.stats['errors_table3'] == 5
+    assert etl.stats['errors'] == 5
+
+
+def test_group_by_partition_splits_on_key_and_batch_size():
+    rows = [(1, i) for i in range(5)] + [(2, 0)]
+    groups = list(group_by_partition(rows, key_size=1, batch_size=2))
+
+    assert [len(g) for g in groups] == [2, 2, 1, 1]
+    assert all(len({values[0] for values in g}) == 1 for g in groups)
+
+
+def test_batched_load_counts_rows_per_table():
+    session = FakeSession()
+    etl = MusicStreamingETL(session, concurrency=4, batch_size=1)
+    etl.load_events_batched([EVENT] * 3)
+
+    assert etl.stats['rows_inserted_table2'] == 3
+    assert etl.stats['errors'] == 0
+
+
+def test_dedup_skips_only_writes_that_change_nothing():
+    session = FakeSession()
+    etl = MusicStreamingETL(session, concurrency=4, batch_size=1, dedup=True)
+    etl.load_events_batched([EVENT, EVENT])
+    etl.load_events_batched([replace(EVENT, session_id=339)])
+    etl.load_events_batched([replace(EVENT, session_id=340, user_last_name='Smith')])
+
+    assert etl.stats['rows_inserted_table1'] == 3
+    assert etl.stats['rows_inserted_table3'] == 2
+    assert etl.stats['rows_deduplicated'] == 4
+    assert etl.dedup.dropped[Config.TABLE_USERS_BY_SONG] == 2
+
+
+def test_bucketed_users_by_song_spreads_a_song_over_buckets():
+    session = FakeSession()
+    etl = MusicStreamingETL(session, concurrency=4, batch_size=1, song_buckets=4)
+    events = [replace(EVENT, user_id=user_id) for user_id in range(8)]
+    etl.load_events_batched(events)
+
+    rows = [values for statement, values in session.executed if statement is etl.insert_users_by_song]
+    assert {values[1] for values in rows} == {0, 1, 2, 3}
+    assert rows[0] == (EVENT.song_title, 0, 0, 'Ava', 'Robinson')
+    assert etl.stats['rows_inserted_table3'] == 8
+
+
+def test_aggregates_write_one_counter_delta_per_song_and_never_retry_it():
+    session = FakeSession(fail_on=Config.TABLE_ARTIST_PLAYS, error=OperationTimedOut(), failures=1)
+    etl = MusicStreamingETL(session, concurrency=4, batch_size=1, aggregates=True,
+                            retry=BackoffRetry(max_retries=3, base_delay=0))
+    writer = etl.new_writer()
+    etl.load_chunk([EVENT, EVENT, replace(EVENT, song_title='Insomnia')], writer)
+    writer.wait()
+
+    updates = [values for statement, values in session.executed if statement.lstrip().startswith('UPDATE')]
+    assert sorted(updates) == [(1, 'Faithless', 'Insomnia'), (2, 'Faithless', EVENT.song_title), (3, 'Faithless')]
+    assert etl.stats['rows_inserted_counters'] == 2
+    assert etl.stats['errors_counters'] == 1
+    assert etl.stats['retries'] == 0
+    assert etl.touched_songs == {('Faithless', 'Insomnia'), ('Faithless', EVENT.song_title)}
+
+
+def test_iter_chunks_streams_bounded_chunks():
+    etl = MusicStreamingETL(FakeSession(), chunk_size=1000)
+    chunks = etl.iter_chunks()
+
+    first = next(chunks)
+    assert len(first) == 1000
+    assert etl.stats['rows_read'] == 1000
+    assert all(isinstance(event, Event) and event.artist for event in first)
+
+
+def test_parse_event_converts_needed_columns_once():
+    header = ['artist', 'firstName', 'gender', 'itemInSession', 'lastName', 'length',
+              'level', 'location', 'sessionId', 'song', 'userId']
+    row = ['Faithless', 'Ava', 'F', '4', 'Robinson', '495.3073',
+           'free', 'Somewhere', '338', 'Music Matters (Mark Knight Dub)', '50']
+    columns = tuple(header.index(name) for name in EVENT_CSV_COLUMNS)
+
+    assert parse_event(row, columns) == EVENT
+    assert users_by_song_values(EVENT) == ('Music Matters (Mark Knight Dub)', 50, 'Ava', 'Robinson')
+
+
+def test_shards_cover_every_row_once():
+    path = Config.EVENT_LOG_FILE
+    shards = shard_file(path, 4)
+
+    assert len(shards) == 4
+    assert all(end == next_start for (_, end), (next_start, _) in zip(shards, shards[1:]))
+
+    whole = list(CSVEventReader(path))
+    sharded = [event for start, end in shards for event in CSVEventReader(path, start, end)]
+    assert sharded == whole
+
+
+def test_pandas_csv_engine_matches_row_parser(tmp_path):
+    lines = Config.EVENT_LOG_FILE.read_text(encoding='utf8').splitlines(keepends=True)
+    malformed = lines[1].replace('"66"', '"not a user"')
+    events_file = tmp_path / 'events.csv'
+    events_file.write_text(''.join(lines[:301]) + malformed, encoding='utf8')
+
+    rows = MusicStreamingETL(FakeSession(), chunk_size=100, source=events_file)
+    columns = MusicStreamingETL(FakeSession(), chunk_size=100, source=events_file, csv_engine='pandas')
+    events = list(rows.iter_events())
+
+    assert list(columns.iter_events()) == events
+    assert columns.stats['rows_invalid'] == rows.stats['rows_invalid'] == 1
+    # Plain Python values, which the driver and the dead-letter log expect
+    assert {type(value) for value in astuple(next(columns.iter_events()))} == {int, float, str}
+
+    by_event, by_column = FakeSession(), FakeSession()
+    MusicStreamingETL(by_event, batch_size=1).load_events_batched(events)
+    by_column_etl = MusicStreamingETL(by_column, batch_size=1)
+    for chunk in columns.iter_chunks():
+        by_column_etl.load_events_batched(chunk.events)
+    # Chunks end at different rows, which reorders the batched writes
+    assert sorted(by_column.executed, key=repr) == sorted(by_event.executed, key=repr)
+
+
+def test_merge_stats_sums_counts_and_spans_times():
+    merged = merge_stats([
+        {'rows_read': 2, 'errors': 1, 'start_time': 5, 'end_time': 8},
+        {'rows_read': 3, 'errors': 0, 'start_time': 4, 'end_time': None},
+    ])
+
+    assert merged == {'rows_read': 5, 'errors': 1, 'start_time': 4, 'end_time': 8}
+
+
+def test_summary_of_workers_that_all_failed(caplog):
+    caplog.set_level('INFO')
+    stats = MusicStreamingETL(FakeSession()).stats
+    failed = [dict(stats, start_time=datetime(2024, 1, 1), rows_read=3), dict(stats)]
+
+    merged = merge_stats(failed)
+    print_summary(merged)
+
+    assert merged['end_time'] is None
+    assert 'Execution Time: unknown' in caplog.text
+
+
+def test_directory_source_reads_every_file(tmp_path):
+    lines = Config.EVENT_LOG_FILE.read_text(encoding='utf8').splitlines(keepends=True)
+    header, rows = lines[0], lines[1:]
+    for i in range(3):
+        (tmp_path / f'events-{i}.csv').write_text(header + ''.join(rows[i::3]), encoding='utf8')
+
+    etl = MusicStreamingETL(FakeSession(), chunk_size=500, source=tmp_path, readers=2)
+    events = list(etl.iter_events())
+
+    assert len(events) == len(list(CSVEventReader(Config.EVENT_LOG_FILE)))
+    assert etl.stats['rows_read'] == len(events)
+
+
+def test_checkpoint_resume_and_incremental(tmp_path):
+    lines = Config.EVENT_LOG_FILE.read_text(encoding='utf8').splitlines(keepends=True)
+    events_file = tmp_path / 'events.csv'
+    events_file.write_text(''.join(lines[:101]), encoding='utf8')
+    checkpoint = Checkpoint(tmp_path / 'checkpoint.json')
+
+    def load(mode):
+        etl = MusicStreamingETL(FakeSession(), batch_size=1, chunk_size=40, source=events_file,
+                                checkpoint=checkpoint, checkpoint_mode=mode)
+        assert etl.run()
+        return etl.stats['rows_read']
+
+    first = load(None)
+    assert checkpoint.get(events_file)['completed']
+    assert checkpoint.get(events_file)['rows'] == first
+    assert load(RESUME) == 0
+
+    with open(events_file, 'a', encoding='utf8') as f:
+        f.write(''.join(lines[101:151]))
+
+    appended = load(INCREMENTAL)
+    assert 0 < appended <= 50
+    assert checkpoint.get(events_file)['rows'] == first + appended
+
+
+def test_follow_loads_complete_rows_and_resumes_from_the_saved_offset(tmp_path):
+    lines = Config.EVENT_LOG_FILE.read_text(encoding='utf8').splitlines(keepends=True)
+    expected_file = tmp_path / 'expected.csv'
+    expected_file.write_text(''.join(lines[:71]), encoding='utf8')
+    expected = len(list(CSVEventReader(expected_file)))
+
+    events_file = tmp_path / 'events.csv'
+    partial = lines[41][:10]
+    events_file.write_text(''.join(lines[:41]) + partial, encoding='utf8')
+    checkpoint = Checkpoint(tmp_path / 'checkpoint.json')
+
+    def follower():
+        etl = MusicStreamingETL(FakeSession(), batch_size=1, source=events_file, checkpoint=checkpoint)
+        return etl, etl.new_writer()
+
+    etl, writer = follower()
+    first = etl.poll_once(writer, batch_rows=15)
+    assert first > 0
+    assert checkpoint.get(events_file)['rows'] == first
+
+    with open(events_file, 'a', encoding='utf8') as f:
+        f.write(lines[41][10:] + ''.join(lines[42:61]))
+    second = etl.poll_once(writer, batch_rows=15)
+    assert etl.poll_once(writer) == 0
+
+    etl, writer = follower()
+    assert etl.poll_once(writer) == 0
+    with open(events_file, 'a', encoding='utf8') as f:
+        f.write(''.join(lines[61:71]))
+    third = etl.poll_once(writer)
+
+    assert first + second + third == expected
+    assert checkpoint.get(events_file)['rows'] == expected
+    assert not checkpoint.get(events_file)['completed']
+
+
+def test_pandas_follow_batches_stay_near_the_flush_size(tmp_path):
+    lines = Config.EVENT_LOG_FILE.read_text(encoding='utf8').splitlines(keepends=True)
+    events_file = tmp_path / 'events.csv'
+    events_file.write_text(''.join(lines[:201]), encoding='utf8')
+
+    etl = MusicStreamingETL(FakeSession(), batch_size=1, source=events_file, csv_engine='pandas')
+    sizes = [len(chunk) for chunk in etl.iter_file_chunks(events_file, chunk_size=20) if len(chunk)]
+
+    assert sum(sizes) == len(list(CSVEventReader(events_file)))
+    assert len(sizes) >= 5
+    assert max(sizes) < 40
+
+
+def test_transient_errors_are_retried():
+    session = FakeSession(fail_on=Config.TABLE_USERS_BY_SONG, error=OperationTimedOut(), failures=3)
+    etl = MusicStreamingETL(session, concurrency=4, retry=BackoffRetry(max_retries=3, base_delay=0))
+    etl.load_events_concurrently([EVENT] * 2)
+
+    assert etl.stats['rows_inserted_table3'] == 2
+    assert etl.stats['retries'] == 3
+    assert etl.stats['errors'] == 0
+
+
+def test_retries_count_against_the_rate_cap_and_release_their_thread():
+    session = FakeSession(fail_on=Config.TABLE_USERS_BY_SONG, error=OperationTimedOut(), failures=2)
+    etl = MusicStreamingETL(session, concurrency=4, max_rows_per_sec=1000,
+                            retry=BackoffRetry(max_retries=3, base_delay=0))
+    acquired = []
+    etl.rate_limiter.acquire = acquired.append
+    etl.load_events_concurrently([EVENT] * 2)
+
+    assert etl.stats['retries'] == 2
+    assert len(acquired) == 3 * 2 + 2
+    assert not any(thread.name == 'write-retries' for thread in threading.enumerate())
+
+
+def test_failed_rows_are_dead_lettered_and_replayed(tmp_path):
+    path = tmp_path / 'dead_letter.jsonl'
+    session = FakeSession(fail_on=Config.TABLE_USERS_BY_SONG)
+    etl = MusicStreamingETL(session, concurrency=4, dead_letter=DeadLetterLog(path))
+    etl.load_events_concurrently([EVENT] * 2)
+
+    entries = list(read_dead_letters(path))
+    assert etl.stats['rows_dead_lettered'] == 2
+    assert [entry['table'] for entry in entries] == [Config.TABLE_USERS_BY_SONG] * 2
+    assert entries[0]['error'] == 'write timeout'
+
+    session = FakeSession()
+    replay = MusicStreamingETL(session, batch_size=1, dead_letter=DeadLetterLog(path))
+    assert replay.replay_dead_letters(path)
+    assert session.executed == [(replay.insert_users_by_song, users_by_song_values(EVENT))] * 2
+    assert not path.exists()
+
+
+def test_rows_of_another_layout_stay_dead_lettered(tmp_path):
+    path = tmp_path / 'dead_letter.jsonl'
+    bucketed = (EVENT.song_title, 1, EVENT.user_id, EVENT.user_first_name, EVENT.user_last_name)
+    DeadLetterLog(path).write(Config.TABLE_USERS_BY_SONG_BUCKETED, [bucketed], OperationTimedOut())
+
+    session = FakeSession()
+    replay = MusicStreamingETL(session, batch_size=1, song_buckets=1, dead_letter=DeadLetterLog(path))
+
+    assert not replay.replay_dead_letters(path)
+    assert session.executed == []
+    assert [entry['rows'] for entry in read_dead_letters(path)] == [[list(bucketed)]]
+    assert not path.with_name(path.name + '.replay').exists()
+
+
+def test_an_unfinished_replay_is_recovered(tmp_path):
+    path = tmp_path / 'dead_letter.jsonl'
+    leftover = path.with_name(path.name + '.replay')
+    first, second = users_by_song_values(EVENT), users_by_song_values(replace(EVENT, user_id=51))
+    DeadLetterLog(leftover).write(Config.TABLE_USERS_BY_SONG, [first], OperationTimedOut())
+    DeadLetterLog(path).write(Config.TABLE_USERS_BY_SONG, [second], OperationTimedOut())
+
+    # Rows left by the crashed replay are replayed along with the new ones
+    session = FakeSession()
+    assert MusicStreamingETL(session, batch_size=1, song_buckets=1,
+                             dead_letter=DeadLetterLog(path)).replay_dead_letters(path)
+    assert sorted(values for _, values in session.executed) == sorted([first, second])
+    assert not path.exists() and not leftover.exists()
+
+    # Also when the crashed replay left no dead-letter file behind
+    DeadLetterLog(leftover).write(Config.TABLE_USERS_BY_SONG, [first], OperationTimedOut())
+    session = FakeSession()
+    assert MusicStreamingETL(session, batch_size=1, song_buckets=1,
+                             dead_letter=DeadLetterLog(path)).replay_dead_letters(path)
+    assert [values for _, values in session.executed] == [first]
+    assert not leftover.exists()
+
+
+def test_failures_are_dead_lettered_off_the_driver_callback(tmp_path):
+    path = tmp_path / 'dead_letter.jsonl'
+    session = FakeSession(fail_on=Config.TABLE_USERS_BY_SONG)
+    etl = MusicStreamingETL(session, concurrency=4, dead_letter=DeadLetterLog(path))
+    writer = etl.new_writer()
+    etl.submit_event(writer, EVENT)
+
+    # The callback has run, but the file is written by the submitting thread
+    assert etl.stats['errors'] == 1
+    assert not path.exists()
+    etl.wait_for_writes(writer)
+    assert etl.stats['rows_dead_lettered'] == 1
+    assert len(list(read_dead_letters(path))) == 1
+
+
+def test_counter_updates_are_replayed_only_with_aggregates(tmp_path):
+    path = tmp_path / 'dead_letter.jsonl'
+    log = DeadLetterLog(path)
+    log.write(Config.TABLE_SONG_PLAYS, [(2, 'Faithless', EVENT.song_title)], OperationTimedOut())
+    log.write(Config.TABLE_USERS_BY_SONG, [users_by_song_values(EVENT)], OperationTimedOut())
+
+    session = FakeSession()
+    assert not MusicStreamingETL(session, batch_size=1, dead_letter=DeadLetterLog(path)).replay_dead_letters(path)
+    # The timed out counter update may have been applied: it stays dead-lettered
+    assert [values for _, values in session.executed] == [users_by_song_values(EVENT)]
+    assert [entry['table'] for entry in read_dead_letters(path)] == [Config.TABLE_SONG_PLAYS]
+
+    session = FakeSession()
+    replay = MusicStreamingETL(session, batch_size=1, aggregates=True, dead_letter=DeadLetterLog(path))
+    assert replay.replay_dead_letters(path)
+    assert session.executed == [(replay.counter_update(Config.TABLE_SONG_PLAYS), (2, 'Faithless', EVENT.song_title))]
+    assert not path.exists()
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.generator import GeneratorSpec, generate_event_logs
+from src.reader import CSVEventReader, resolve_event_files
+
+SPEC = GeneratorSpec(rows=2500, songs=500, artists=100, users=200, rows_per_file=1000, seed=3)
+
+
+def test_generated_files_load_as_events(tmp_path):
+    files = generate_event_logs(SPEC, tmp_path, workers=1)
+
+    assert resolve_event_files(tmp_path) == files
+    events = [event for path in files for event in CSVEventReader(path)]
+    assert len(events) == SPEC.rows
+
+    sessions = {}
+    for event in events:
+        sessions.setdefault(event.session_id, []).append(event)
+    for items in sessions.values():
+        assert [e.item_in_session for e in items] == list(range(len(items)))
+        assert len({e.user_id for e in items}) == 1
+
+
+def test_output_depends_only_on_seed(tmp_path):
+    first = generate_event_logs(SPEC, tmp_path / 'a', workers=1)
+    second = generate_event_logs(SPEC, tmp_path / 'b', workers=2)
+    other_seed = generate_event_logs(GeneratorSpec(rows=1000, songs=500, artists=100, users=200, seed=4),
+                                     tmp_path / 'c', workers=1)
+
+    assert [p.read_bytes() for p in first] == [p.read_bytes() for p in second]
+    assert first[0].read_bytes() != other_seed[0].read_bytes()
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cassandra import OperationTimedOut
+
+from src.config import Config
+from src.etl import MusicStreamingETL
+from src.metrics import Histogram, Metrics, PrometheusFileSink, time_request
+from tests.fakes import EVENT, FakeSession
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in [0.005] * 50 + [0.05] * 45 + [0.5] * 5:
+        histogram.observe(value)
+
+    assert histogram.counts == [50, 45, 5, 0]
+    assert histogram.quantile(0.5) == 0.01
+    assert 0.1 < histogram.quantile(0.99) <= 1.0
+
+
+def test_prometheus_text_format(tmp_path):
+    metrics = Metrics()
+    metrics.counter('requests_total', 'Requests', table='users_by_song').inc(3)
+    metrics.histogram('latency_seconds', buckets=(0.1,), query='query_1').observe(0.05)
+
+    sink = PrometheusFileSink(tmp_path / 'etl.prom')
+    sink.export(metrics)
+    text = sink.path.read_text()
+
+    assert '# TYPE music_streaming_requests_total counter' in text
+    assert 'music_streaming_requests_total{table="users_by_song"} 3' in text
+    assert 'music_streaming_latency_seconds_bucket{query="query_1",le="0.1"} 1' in text
+    assert 'music_streaming_latency_seconds_bucket{query="query_1",le="+Inf"} 1' in text
+    assert 'music_streaming_latency_seconds_count{query="query_1"} 1' in text
+
+
+def test_time_request_counts_timeouts():
+    metrics = Metrics()
+    time_request(metrics, 'query', query='query_3')(OperationTimedOut())
+
+    assert metrics.counter('query_errors_total', query='query_3').value == 1
+    assert metrics.counter('query_timeouts_total', query='query_3').value == 1
+    assert time_request(None, 'query')() is None
+
+
+def test_etl_records_write_latency_per_table():
+    metrics = Metrics()
+    etl = MusicStreamingETL(FakeSession(fail_on=Config.TABLE_USERS_BY_SONG), concurrency=4, metrics=metrics)
+    etl.load_events_concurrently([EVENT] * 5)
+
+    latency = metrics.histogram('etl_write_latency_seconds', table=Config.TABLE_SONGS_BY_SESSION)
+    assert latency.count == 5
+    assert metrics.counter('etl_rows_total', table=Config.TABLE_USERS_BY_SONG, outcome='error').value == 5
+    assert metrics.gauge('etl_in_flight_requests').value == 0
@@ -0,0 +1,204 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from cassandra import ReadTimeout
+from cassandra.query import BoundStatement
+
+from benchmarks.fake_session import FakeSession
+from src.cache import QueryCache
+from src.metrics import Metrics
+from src.models import (
+    INSERT_SONGS_BY_SESSION_CQL,
+    INSERT_SONGS_BY_USER_SESSION_CQL,
+    INSERT_USERS_BY_SONG_BUCKETED_CQL,
+    INSERT_USERS_BY_SONG_CQL,
+    song_bucket
+)
+from src.queries import QUERY_1, QUERY_3, QueryExecutor, decode_page_token, encode_page_token
+
+SONG = 'Intro'
+
+
+class FailingSession(FakeSession):
+    """FakeSession whose reads time out for statements bound with any value in `failing`."""
+
+    def __init__(self, failing=(), **kwargs):
+        super().__init__(**kwargs)
+        self.failing = set(failing)
+
+    def _apply(self, query):
+        if isinstance(query, BoundStatement) and self.failing.intersection(query.raw_values):
+            with self._lock:
+                self.requests += 1
+            raise ReadTimeout(f"Timed out reading {tuple(query.raw_values)}")
+        return super()._apply(query)
+
+
+@pytest.fixture
+def session():
+    session = FailingSession(latency=0.001)
+    yield session
+    session.shutdown()
+
+
+def add_listeners(session, user_ids, buckets=1):
+    if buckets == 1:
+        insert = session.prepare(INSERT_USERS_BY_SONG_CQL)
+        for user_id in user_ids:
+            session.execute(insert, (SONG, user_id, f'First{user_id}', f'Last{user_id}'))
+    else:
+        insert = session.prepare(INSERT_USERS_BY_SONG_BUCKETED_CQL)
+        for user_id in user_ids:
+            session.execute(insert, (SONG, song_bucket(user_id, buckets), user_id,
+                                     f'First{user_id}', f'Last{user_id}'))
+
+
+def read_all_pages(executor, fetch_size):
+    pages = [executor.query_3_users_by_song_page(SONG, fetch_size=fetch_size)]
+    while pages[-1].has_more:
+        pages.append(executor.query_3_users_by_song_page(SONG, fetch_size=fetch_size,
+                                                         paging_state=pages[-1].paging_state))
+    return pages
+
+
+def test_page_tokens_round_trip():
+    assert decode_page_token(encode_page_token(3, b'\x00\xffstate')) == (3, b'\x00\xffstate')
+    assert decode_page_token(encode_page_token(2, None)) == (2, None)
+    assert decode_page_token(None) == (0, None)
+    for token in ('abc', '1:xyz', ':00'):
+        with pytest.raises(ValueError):
+            decode_page_token(token)
+
+
+def test_pages_end_after_the_last_row(session):
+    add_listeners(session, range(1, 6))
+    executor = QueryExecutor(session, song_buckets=1)
+
+    pages = read_all_pages(executor, fetch_size=2)
+
+    assert [len(page.rows) for page in pages] == [2, 2, 1]
+    assert pages[-1].paging_state is None
+    assert all(isinstance(page.paging_state, str) for page in pages[:-1])
+    assert [user['user_first_name'] for page in pages for user in page.rows] == [
+        f'First{user_id}' for user_id in range(1, 6)
+    ]
+    # A page that exactly fills the last fetch has no token after it
+    assert [len(page.rows) for page in read_all_pages(executor, fetch_size=5)] == [5]
+
+
+def test_pages_cross_bucket_boundaries(session):
+    add_listeners(session, range(1, 8), buckets=3)
+    executor = QueryExecutor(session, song_buckets=3)
+
+    pages = read_all_pages(executor, fetch_size=2)
+    names = [user['user_first_name'] for page in pages for user in page.rows]
+
+    # Buckets 0, 1 and 2 hold 2, 3 and 2 users: the middle bucket takes two pages
+    assert [len(page.rows) for page in pages] == [2, 2, 1, 2]
+    assert [decode_page_token(page.paging_state)[0] for page in pages[:-1]] == [1, 1, 2]
+    assert sorted(names) == sorted(f'First{user_id}' for user_id in range(1, 8))
+
+
+def test_tokens_for_another_layout_are_rejected(session):
+    executor = QueryExecutor(session, song_buckets=1)
+
+    with pytest.raises(ValueError):
+        executor.query_3_users_by_song_page(SONG, paging_state=encode_page_token(1, None))
+
+
+def test_streamed_users_are_merged_from_every_bucket(session):
+    add_listeners(session, range(1, 8), buckets=3)
+    metrics = Metrics()
+    executor = QueryExecutor(session, metrics=metrics, song_buckets=3)
+
+    users = list(executor.iter_users_by_song(SONG, fetch_size=2))
+
+    assert [user['user_first_name'] for user in users] == [f'First{user_id}' for user_id in range(1, 8)]
+    # The first pages of the three buckets are timed as one request, the middle bucket's second page alone
+    assert metrics.histogram('query_latency_seconds', query=QUERY_3).count == 2
+
+
+def test_paged_reads_report_failures_like_the_other_queries(session):
+    add_listeners(session, range(1, 7), buckets=3)
+    metrics = Metrics()
+    executor = QueryExecutor(session, metrics=metrics, song_buckets=3)
+    session.failing = {1}
+
+    page = executor.query_3_users_by_song_page(SONG, paging_state=encode_page_token(1, None))
+    users = list(executor.iter_users_by_song(SONG))
+
+    assert page.rows == [] and not page.has_more
+    assert users == []
+    assert metrics.counter('query_errors_total', query=QUERY_3).value == 2
+    assert metrics.counter('query_timeouts_total', query=QUERY_3).value == 2
+
+
+def add_sessions(session, session_ids):
+    insert_song = session.prepare(INSERT_SONGS_BY_SESSION_CQL)
+    insert_history = session.prepare(INSERT_SONGS_BY_USER_SESSION_CQL)
+    for session_id in session_ids:
+        session.execute(insert_song, (session_id, 0, f'Artist{session_id}', f'Song{session_id}', 200.0))
+        session.execute(insert_history, (session_id * 10, session_id, 0, f'Artist{session_id}',
+                                         f'Song{session_id}', 'Ada', 'Lovelace'))
+
+
+def test_bulk_results_follow_input_order(session):
+    add_sessions(session, range(1, 21))
+    executor = QueryExecutor(session, song_buckets=1)
+    session_ids = [17, 3, 20, 1, 9, 12, 5]
+
+    songs = executor.query_1_many([(session_id, 0) for session_id in session_ids], concurrency=4)
+    histories = executor.query_2_many([(session_id * 10, session_id) for session_id in session_ids],
+                                      concurrency=4)
+
+    assert [result.params for result in songs] == [(session_id, 0) for session_id in session_ids]
+    assert [result.data['song_title'] for result in songs] == [f'Song{i}' for i in session_ids]
+    assert [result.data[0]['artist'] for result in histories] == [f'Artist{i}' for i in session_ids]
+    assert not any(result.error for result in songs + histories)
+
+
+def test_duplicate_keys_are_queried_once(session):
+    add_sessions(session, [1, 2])
+    executor = QueryExecutor(session, song_buckets=1)
+    before = session.requests
+
+    results = executor.query_1_many([(2, 0), (1, 0), (2, 0), (2, 0)])
+
+    assert session.requests - before == 2
+    assert [result.params for result in results] == [(2, 0), (1, 0), (2, 0), (2, 0)]
+    assert [result.data['song_title'] for result in results] == ['Song2', 'Song1', 'Song2', 'Song2']
+
+
+def test_failed_keys_are_reported_without_failing_the_others(session):
+    add_sessions(session, [1, 2, 3])
+    session.failing = {2}
+    cache = QueryCache()
+    executor = QueryExecutor(session, cache=cache, song_buckets=1)
+
+    results = executor.query_1_many([(1, 0), (2, 0), (3, 0), (2, 0)])
+
+    assert [result.error is None for result in results] == [True, False, True, False]
+    assert 'Timed out reading (2, 0)' in results[1].error
+    assert results[1].data == {}
+    assert results[2].data['song_title'] == 'Song3'
+    # Failures are not cached: the key is queried again once the node recovers
+    session.failing = set()
+    assert executor.query_1_many([(2, 0)])[0].data['song_title'] == 'Song2'
+    assert cache.get(QUERY_1, (2, 0))['song_title'] == 'Song2'
+
+
+def test_a_failed_bucket_fails_the_whole_song(session):
+    add_listeners(session, range(1, 7), buckets=3)
+    session.failing = {2}
+    executor = QueryExecutor(session, song_buckets=3)
+
+    (result,) = executor.query_3_many([SONG])
+
+    assert result.error is not None
+    assert result.data == []
+    session.failing = set()
+    assert len(executor.query_3_many([SONG])[0].data) == 6
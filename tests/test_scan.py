@@ -0,0 +1,107 @@
+import csv
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from cassandra.metadata import MAX_LONG, MIN_LONG
+
+from src.scan import MURMUR3_PARTITIONER, TokenRangeScanner, split_token_ring
+
+# Token of each row's partition, from just past the lowest token to the highest
+TOKENS = {1: MIN_LONG + 1, 2: -50, 3: -49, 4: 0, 5: 7, 6: 100, 7: 101, 8: MAX_LONG}
+RING = [100, -50, 7]
+
+
+class FakeResult:
+    def __init__(self, rows, fetch_size):
+        self._pages = [rows[i:i + fetch_size] for i in range(0, len(rows), fetch_size)] or [[]]
+        self.current_rows = self._pages.pop(0)
+
+    @property
+    def has_more_pages(self):
+        return bool(self._pages)
+
+    def fetch_next_page(self):
+        self.current_rows = self._pages.pop(0)
+
+    def one(self):
+        return self.current_rows[0]
+
+
+class FakeScanSession:
+    """Table `listeners` keyed by user_id, whose tokens are given by TOKENS."""
+    keyspace = 'music_streaming'
+
+    def __init__(self):
+        column = lambda name, cql_type: SimpleNamespace(name=name, cql_type=cql_type)
+        columns = {'user_id': column('user_id', 'int'), 'name': column('name', 'text')}
+        self.hosts = [SimpleNamespace(name='a', is_up=True), SimpleNamespace(name='b', is_up=False),
+                      SimpleNamespace(name='c', is_up=True)]
+        token_map = SimpleNamespace(
+            ring=[SimpleNamespace(value=token) for token in sorted(RING)],
+            get_replicas=lambda keyspace, token: self.hosts,
+        )
+        self.cluster = SimpleNamespace(metadata=SimpleNamespace(
+            partitioner=MURMUR3_PARTITIONER,
+            token_map=token_map,
+            keyspaces={self.keyspace: SimpleNamespace(tables={'listeners': SimpleNamespace(
+                columns=columns, partition_key=[columns['user_id']]
+            )})},
+        ))
+        self.rows = [(user_id, f'user{user_id}') for user_id in TOKENS]
+        self.requests = []
+
+    def prepare(self, cql):
+        return SimpleNamespace(bind=lambda values: SimpleNamespace(cql=cql, values=values, fetch_size=None))
+
+    def execute(self, bound, execution_profile=None, host=None):
+        start, end = bound.values
+        self.requests.append((start, end, host))
+        rows = [row for row in self.rows if start < TOKENS[row[0]] <= end]
+        if 'COUNT(*)' in bound.cql:
+            return FakeResult([(len(rows),)], 1)
+        return FakeResult(rows, bound.fetch_size)
+
+
+def test_token_ring_ranges_cover_every_token_once():
+    ranges = split_token_ring([100, -50, 7], splits=3)
+
+    assert ranges[0][0] == MIN_LONG
+    assert ranges[-1][1] == MAX_LONG
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+    assert all(start < end for start, end in ranges)
+    assert {-50, 7, 100} <= {end for _, end in ranges}
+    assert len(ranges) == 12
+
+
+def test_small_ranges_are_not_split_into_empty_parts():
+    ranges = split_token_ring([0, 2], splits=4)
+
+    assert [(start, end) for start, end in ranges if 0 <= start < 2] == [(0, 1), (1, 2)]
+    assert split_token_ring([], splits=1) == [(MIN_LONG, MAX_LONG)]
+
+
+def test_scanner_counts_and_exports_every_row_once(tmp_path):
+    session = FakeScanSession()
+    scanner = TokenRangeScanner(session, 'listeners', concurrency=3, splits=2, fetch_size=1)
+
+    assert scanner.count() == len(TOKENS)
+    # The lowest range starts at MIN_LONG, exclusive, and the highest ends at MAX_LONG, inclusive
+    assert min(start for start, _, _ in session.requests) == MIN_LONG
+    assert max(end for _, end, _ in session.requests) == MAX_LONG
+    assert all(host.is_up for _, _, host in session.requests)
+
+    path = tmp_path / 'listeners.csv'
+    assert scanner.export(path) == len(TOKENS)
+    with open(path, newline='', encoding='utf-8') as f:
+        header, *rows = list(csv.reader(f))
+    assert header == ['user_id', 'name']
+    assert sorted(rows, key=lambda row: int(row[0])) == [[str(user_id), name] for user_id, name in session.rows]
+
+
+def test_scanner_rejects_unknown_tables():
+    with pytest.raises(ValueError):
+        TokenRangeScanner(FakeScanSession(), 'missing')
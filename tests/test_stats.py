@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.connection import CassandraConnection
+from src.stats import RING_SIZE, merge_size_estimates
+
+
+def estimate(start, end, partitions, mean_size):
+    return SimpleNamespace(range_start=str(start), range_end=str(end),
+                           partitions_count=partitions, mean_partition_size=mean_size)
+
+
+class FakeStatsSession:
+    keyspace = 'music_streaming'
+
+    def __init__(self, rows):
+        host = SimpleNamespace(is_up=True)
+        self.cluster = SimpleNamespace(metadata=SimpleNamespace(
+            keyspaces={self.keyspace: SimpleNamespace(tables={'users_by_song': None})},
+            all_hosts=lambda: [host, host],
+            token_map=None,
+        ))
+        self.rows = rows
+        self.requests = 0
+
+    def execute_async(self, query, parameters=None, host=None):
+        self.requests += 1
+        return SimpleNamespace(result=lambda: self.rows.pop())
+
+
+def test_estimates_are_weighted_and_extrapolated_to_the_whole_ring():
+    quarter = RING_SIZE // 4
+    rows = [
+        estimate(0, quarter, 100, 200),
+        # Wraps past the end of the token space
+        estimate(2 ** 63 - quarter // 2, -(2 ** 63) + quarter // 2, 300, 100),
+    ]
+
+    assert merge_size_estimates(rows) == (800, 125, 0.5)
+    assert merge_size_estimates([estimate(5, 5, 10, 50)]) == (10, 50, 1.0)
+    assert merge_size_estimates([]) == (0, 0, 0.0)
+
+
+def test_table_stats_are_cached_until_the_ttl():
+    session = FakeStatsSession([[estimate(0, RING_SIZE // 2, 40, 10)], [estimate(RING_SIZE // 2, 0, 60, 10)]])
+    conn = CassandraConnection(stats_ttl=60)
+    conn.session = session
+
+    stats = conn.get_table_stats('users_by_song')
+    assert (stats.estimated_partitions, stats.estimated_bytes, stats.hosts) == (100, 1000, 2)
+    assert conn.get_table_stats('users_by_song') == stats
+    assert session.requests == 2
+    assert conn.get_table_stats('unknown') is None
@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from cassandra import InvalidRequest, OperationTimedOut
+
+from src.throttle import AdaptiveConcurrency, RateLimiter
+from src.writer import ConcurrentWriter
+from tests.fakes import FakeClock, FakeFuture
+
+
+def test_limit_grows_additively_under_target():
+    controller = AdaptiveConcurrency(initial=4, min_limit=1, max_limit=8, target_latency=0.05)
+    for _ in range(5):
+        controller.on_result(0, 0.01)
+
+    assert controller.limit == 5
+
+
+def test_congestion_backs_off_once_per_window():
+    clock = FakeClock()
+    clock.now = 10
+    controller = AdaptiveConcurrency(initial=16, min_limit=2, max_limit=64, target_latency=0.05, clock=clock)
+
+    controller.on_result(9.0, 0.2)
+    controller.on_result(9.5, 1.0, OperationTimedOut())
+    assert controller.limit == 8
+
+    controller.on_result(10.5, 0.01, OperationTimedOut())
+    controller.on_result(10.5, 0.01, InvalidRequest('bad value'))
+    assert controller.limit == 4
+    assert controller.decreases == 2
+
+
+def test_rate_limiter_sleeps_off_debt():
+    clock = FakeClock()
+    sleeps = []
+    limiter = RateLimiter(100, clock=clock, sleep=sleeps.append)
+
+    limiter.acquire(100)
+    limiter.acquire(50)
+
+    assert sleeps == [0.5]
+
+
+class TimeoutSession:
+    """Completes each write at once; writes time out while `overloaded` is set."""
+
+    def __init__(self):
+        self.overloaded = False
+
+    def execute_async(self, statement, parameters=None, **kwargs):
+        return FakeFuture(OperationTimedOut() if self.overloaded else None)
+
+
+def test_throughput_backs_off_under_timeouts_and_recovers():
+    clock = FakeClock()
+    limiter = RateLimiter(1000, clock=clock, sleep=lambda seconds: setattr(clock, 'now', clock.now + seconds))
+    controller = AdaptiveConcurrency(initial=8, min_limit=1, max_limit=8, target_latency=1.0,
+                                     rate_limiter=limiter)
+    session = TimeoutSession()
+    writer = ConcurrentWriter(session, controller=controller, rate_limiter=limiter)
+
+    def throughput(writes: int) -> float:
+        """Rows per simulated second over `writes` writes of 10 rows."""
+        start = clock.now
+        for _ in range(writes):
+            writer.submit('INSERT', (), 'users_by_song', rows=10)
+        writer.wait()
+        return writes * 10 / (clock.now - start)
+
+    # Spend the initial burst, so every phase runs at the current rate
+    limiter.acquire(limiter.capacity)
+    healthy = throughput(100)
+
+    session.overloaded = True
+    overloaded = throughput(20)
+    assert (controller.limit, limiter.rate) == (1, limiter.min_rate)
+
+    session.overloaded = False
+    throughput(300)
+    recovered = throughput(100)
+
+    assert healthy == pytest.approx(1000)
+    assert overloaded < healthy / 10
+    assert (controller.limit, limiter.rate) == (8, 1000)
+    assert recovered == pytest.approx(1000)